@@ -0,0 +1,133 @@
+import io
+
+import streamlit as st
+
+from utils.cache import memoizar
+from utils.exportacao import iniciar_exportacao, tarefa_exportacao
+from utils.translations import t
+
+def serializar_tabela(df, formato):
+    """
+    Conteúdo do arquivo de download de uma tabela.
+
+    Args:
+        df: Tabela a gravar (sem o índice)
+        formato: 'csv' (texto) ou 'parquet' (bytes)
+    """
+    if formato == 'parquet':
+        buffer = io.BytesIO()
+        try:
+            df.to_parquet(buffer, index=False)
+        except (TypeError, ValueError):
+            # Colunas de texto com valores de tipos misturados: gravadas como texto
+            buffer = io.BytesIO()
+            df.astype({coluna: 'string' for coluna in df.select_dtypes('object').columns}).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return df.to_csv(index=False, encoding='utf-8-sig')
+
+def botao_download(rotulo, df, nome_arquivo, chave, parametros=(), parquet=False, preparar_csv=None, help=None):
+    """
+    Botão de download de uma tabela, com o arquivo gerado só quando o usuário clica.
+
+    O arquivo é serializado no clique (numa thread separada do rerun) e guardado no cache
+    pela impressão digital dos dados, idioma, data de referência e parametros; os reruns
+    não serializam tabelas que ninguém baixa.
+
+    Args:
+        rotulo: Texto do botão de CSV
+        df: Tabela exibida; não deve ser alterada depois da chamada
+        nome_arquivo: Nome do arquivo sem extensão
+        chave: Identificador da tabela no cache (ex.: 'crises_detalhadas')
+        parametros: Tupla com o que mais define o conteúdo da tabela (filtros, métrica)
+        parquet: Se True, oferece também o download em Parquet (para tabelas grandes)
+        preparar_csv: Função aplicada à tabela antes de gravar o CSV (ex.: formatar datas)
+        help: Texto de ajuda do botão de CSV
+    """
+    # A sessão só é lida aqui, no rerun; a função de download roda em outra thread
+    impressao = st.session_state.get('impressao_dados')
+    contexto = (st.session_state.get('language'), st.session_state.get('data_fim'), *parametros)
+
+    def gerar(formato, preparar=None):
+        def conteudo():
+            return memoizar(
+                f'download_{chave}', impressao, (formato, contexto),
+                lambda: serializar_tabela(preparar(df) if preparar is not None else df, formato)
+            )
+        return conteudo
+
+    st.download_button(
+        label=rotulo,
+        data=gerar('csv', preparar_csv),
+        file_name=f'{nome_arquivo}.csv',
+        mime='text/csv',
+        help=help,
+        on_click='ignore'
+    )
+    if parquet:
+        st.download_button(
+            label=t('downloads.parquet'),
+            data=gerar('parquet'),
+            file_name=f'{nome_arquivo}.parquet',
+            mime='application/vnd.apache.parquet',
+            help=t('downloads.parquet_help'),
+            on_click='ignore'
+        )
+
+def exportacao_completa(tabelas, data_inicio, data_fim, manifesto, resultados_prontos=None):
+    """
+    Exportação de todas as tabelas das seções num ZIP, gerado em segundo plano.
+
+    O botão na sidebar inicia a geração numa thread (utils.exportacao); enquanto ela roda, só
+    o fragmento de progresso é atualizado e o resto do dashboard continua respondendo. A
+    tarefa é identificada pela impressão digital dos dados e pela data de referência.
+
+    Args:
+        tabelas: Tabelas de eventos do recorte (num pacote, só as de pacientes e de último evento)
+        data_inicio: Início do período das seções semanais
+        data_fim: Data de referência (as-of)
+        manifesto: dict com os parâmetros do recorte, gravado no manifest.json do ZIP
+        resultados_prontos: dict seção -> resultado já calculado (agregados de um pacote)
+    """
+    chave = (st.session_state.get('impressao_dados'), data_fim)
+    st.sidebar.markdown("---")
+    st.sidebar.markdown(f"### 📦 {t('downloads.export_all_title')}")
+    tarefa = tarefa_exportacao(chave)
+    if tarefa is None or tarefa['estado'] == 'erro':
+        if tarefa is not None:
+            st.sidebar.error(t('downloads.export_all_error', erro=tarefa['erro']))
+        if not st.sidebar.button(t('downloads.export_all'), help=t('downloads.export_all_help')):
+            return
+        tarefa = iniciar_exportacao(chave, tabelas, data_inicio, data_fim, manifesto, resultados_prontos)
+
+    if tarefa['estado'] != 'concluido':
+        with st.sidebar:
+            _progresso_exportacao(chave)
+        return
+
+    total_tabelas = sum(len(secao['tabelas']) for secao in tarefa['manifesto']['secoes'].values())
+    st.sidebar.caption(t('downloads.export_all_ready', tabelas=total_tabelas, data=data_fim.strftime('%d/%m/%Y')))
+    caminho = tarefa['caminho']
+
+    def conteudo():
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+
+    st.sidebar.download_button(
+        label=t('downloads.export_all_download'),
+        data=conteudo,
+        file_name=f"inspirar_agregados_{data_fim.strftime('%Y%m%d')}.zip",
+        mime='application/zip',
+        on_click='ignore'
+    )
+
+@st.fragment(run_every=1)
+def _progresso_exportacao(chave):
+    """Barra de progresso da exportação, atualizada a cada segundo sem rerun do dashboard."""
+    tarefa = tarefa_exportacao(chave)
+    if tarefa is None or tarefa['estado'] != 'executando':
+        # Terminou: um rerun completo troca a barra pelo botão de download
+        st.rerun()
+    st.progress(
+        tarefa['concluidas'] / tarefa['total'],
+        text=t('downloads.export_all_progress', secao=tarefa['secao'] or '', atual=tarefa['concluidas'], total=tarefa['total'])
+    )
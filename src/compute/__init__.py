@@ -0,0 +1 @@
+# Compute package: cálculos das seções, sem dependência do Streamlit
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from utils.datas import NAT_NS
+from utils.semanas import NS_DIA, agregar_por_semana, formatar_periodo_semana
+
+def calcular_atividades_semanais(df_atividades, data_inicio, data_fim):
+    """
+    Registros, usuários ativos e passos de cada semana (seg–dom) com atividade.
+
+    Returns:
+        DataFrame com Week, Average Records, Active Users, Total Steps, Period e
+        Average Steps per Active User (só semanas com usuários ativos)
+    """
+    df_semanas = agregar_por_semana(df_atividades, data_inicio, data_fim, coluna_soma='steps').rename(columns={
+        'week_number': 'Week',
+        'active_users': 'Active Users',
+        'soma': 'Total Steps'
+    })
+    df_semanas['Average Records'] = (
+        df_semanas['total'] / df_semanas['Active Users'].where(df_semanas['Active Users'] > 0)
+    ).fillna(0)
+    df_semanas = df_semanas[['Week', 'Average Records', 'Active Users', 'Total Steps']]
+
+    # Filtrar semanas com atividade
+    df_semanas = df_semanas[df_semanas['Active Users'] > 0].copy()
+
+    # Período legível
+    df_semanas['Period'] = df_semanas['Week'].apply(formatar_periodo_semana, args=(data_inicio,))
+    df_semanas['Average Steps per Active User'] = (
+        df_semanas['Total Steps'] / df_semanas['Active Users']
+    ).fillna(0).round(0).astype(int)
+    return df_semanas
+
+def ids_pacientes_validos(df_pacientes):
+    """IDs dos pacientes que podem ser escolhidos na análise individual."""
+    if 'id' not in df_pacientes.columns:
+        return []
+    return [id_p for id_p in df_pacientes['id'].tolist() if isinstance(id_p, str) and id_p and id_p != 'N/A']
+
+def intervalo_mes(ano, mes_num):
+    """Primeiro e último dia (00:00 UTC) do mês."""
+    inicio_mes = pd.Timestamp(f'{ano}-{mes_num:02d}-01').tz_localize('UTC')
+    if mes_num == 12:
+        fim_mes = pd.Timestamp(f'{ano+1}-01-01').tz_localize('UTC') - pd.Timedelta(days=1)
+    else:
+        fim_mes = pd.Timestamp(f'{ano}-{mes_num+1:02d}-01').tz_localize('UTC') - pd.Timedelta(days=1)
+    return inicio_mes, fim_mes
+
+def construir_passos_diarios(tabelas):
+    """
+    Passos de cada paciente por dia, numa matriz paciente x dia esparsa (formato CSR).
+
+    Montada uma vez por recorte: os passos das atividades são somados por (paciente, dia UTC
+    de 'ts') e ordenados por paciente e dia. A linha do paciente é indptr[linha]:indptr[linha + 1]
+    em dias/passos, então o gráfico de um paciente num mês é uma fatia, sem percorrer as atividades.
+
+    Returns:
+        dict com dia_zero (Timestamp UTC do primeiro dia com atividade, ou None), indptr
+        (int64, n_pacientes + 1), dias (int64, dias desde dia_zero, crescentes em cada linha),
+        passos (int64) e linhas (id do paciente -> linha; com ids repetidos vale a primeira)
+    """
+    df_pacientes = tabelas['pacientes']
+    df_atividades = tabelas['atividades']
+    n_pacientes = len(df_pacientes)
+
+    ns = df_atividades['ts'].dt.as_unit('ns').array.asi8
+    validos = ns != NAT_NS
+    dias = ns[validos] // NS_DIA
+    patient_idx = df_atividades['patient_idx'].to_numpy()[validos]
+    primeiro = int(dias.min()) if len(dias) else 0
+    n_dias = int(dias.max()) - primeiro + 1 if len(dias) else 1
+
+    # Uma chave por (paciente, dia): ordenada por paciente e, dentro dele, por dia
+    chaves, posicao_chave = np.unique(patient_idx * n_dias + (dias - primeiro), return_inverse=True)
+    passos = np.bincount(posicao_chave, weights=df_atividades['steps'].to_numpy()[validos], minlength=len(chaves))
+    linha_chave = chaves // n_dias
+
+    ids = df_pacientes['id'].tolist() if 'id' in df_pacientes.columns else []
+    return {
+        'dia_zero': pd.Timestamp(primeiro * NS_DIA, tz='UTC') if len(dias) else None,
+        'indptr': np.searchsorted(linha_chave, np.arange(n_pacientes + 1)).astype('int64'),
+        'dias': chaves % n_dias,
+        'passos': passos.astype('int64'),
+        'linhas': {id_p: linha for linha, id_p in reversed(list(enumerate(ids)))},
+    }
+
+def meses_com_atividade(serie, data_inicio, data_fim):
+    """
+    Meses (ano, mês) do primeiro ao último dia com atividade, limitados ao período de análise.
+
+    Returns:
+        Lista de tuplas (ano, mes) em ordem cronológica (vazia sem atividades no período)
+    """
+    if serie['dia_zero'] is None:
+        return []
+    primeiro = max(serie['dia_zero'] + pd.Timedelta(days=int(serie['dias'].min())), data_inicio)
+    ultimo = min(serie['dia_zero'] + pd.Timedelta(days=int(serie['dias'].max())), data_fim)
+    if ultimo < primeiro:
+        return []
+    meses = pd.period_range(primeiro.tz_localize(None), ultimo.tz_localize(None), freq='M')
+    return [(mes.year, mes.month) for mes in meses]
+
+def passos_diarios_paciente(serie, paciente_id, inicio_mes, fim_mes):
+    """
+    Passos de um paciente somados por dia do mês.
+
+    Args:
+        serie: Matriz de construir_passos_diarios
+        paciente_id: ID do paciente
+        inicio_mes: Primeiro dia do mês (00:00 UTC)
+        fim_mes: Último dia do mês (00:00 UTC; o dia inteiro entra)
+
+    Returns:
+        DataFrame com dia e passos, ou None se o paciente não estiver no recorte
+        (vazio se não houver atividades no período)
+    """
+    linha = serie['linhas'].get(paciente_id)
+    if linha is None:
+        return None
+    if serie['dia_zero'] is None:
+        return pd.DataFrame({'dia': pd.Series(dtype='int32'), 'passos': pd.Series(dtype='int64')})
+
+    # Fatia da linha do paciente e, dentro dela, dos dias do mês (busca binária)
+    inicio, fim = serie['indptr'][linha], serie['indptr'][linha + 1]
+    dias = serie['dias'][inicio:fim]
+    primeiro = (inicio_mes.normalize() - serie['dia_zero']).days
+    ultimo = (fim_mes.normalize() - serie['dia_zero']).days
+    de, ate = np.searchsorted(dias, [primeiro, ultimo + 1])
+    datas = serie['dia_zero'] + pd.to_timedelta(dias[de:ate], unit='D')
+    return pd.DataFrame({'dia': datas.day.astype('int32'), 'passos': serie['passos'][inicio:fim][de:ate]})
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from utils.datas import NAT_NS
+
+DIAS_ATIVIDADE_RECENTE = 45
+# Limites do controle da janela de atividade na seção
+DIAS_ATIVIDADE_MIN = 1
+DIAS_ATIVIDADE_MAX = 365
+
+def ultima_atividade(tabelas):
+    """Data (int64 em ns, NAT_NS sem registro) do último registro de cada paciente em qualquer funcionalidade."""
+    ultimo_evento = tabelas['ultimo_evento']
+    if ultimo_evento.shape[1] == 0:
+        return np.full(len(ultimo_evento), NAT_NS, dtype='int64')
+    return np.column_stack([ultimo_evento[coluna].dt.as_unit('ns').array.asi8 for coluna in ultimo_evento.columns]).max(axis=1)
+
+def pacientes_com_registro_recente(tabelas, data_limite):
+    """Marca os pacientes com algum registro de data >= data_limite em qualquer funcionalidade."""
+    return ultima_atividade(tabelas) >= data_limite.value
+
+def calcular_ativos(tabelas, data_fim, dias=DIAS_ATIVIDADE_RECENTE):
+    """
+    Pacientes ativos (algum uso nos últimos `dias` dias antes de data_fim).
+
+    Usa a tabela 'ultimo_evento' (data do último registro por funcionalidade), então
+    qualquer janela custa uma comparação por paciente.
+
+    Returns:
+        dict com is_ativo (array por paciente), n_ativos, n_inativos e
+        contagem_sexo (value_counts de gender entre os ativos)
+    """
+    data_limite = data_fim - pd.Timedelta(days=dias)
+    is_ativo = pacientes_com_registro_recente(tabelas, data_limite)
+    n_ativos = is_ativo.sum()
+    return {
+        'is_ativo': is_ativo,
+        'n_ativos': n_ativos,
+        'n_inativos': len(is_ativo) - n_ativos,
+        'contagem_sexo': tabelas['pacientes']['gender'][is_ativo].value_counts(),
+    }
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Faixas fixas de cada métrica; as demais usam quartis
+FAIXAS_METRICAS = {
+    # Faixas de idade: 0-20, 21-30, 31-40, 41-50, 51-60, 61-70, 71+
+    'Age': ([0, 20, 30, 40, 50, 60, 70, 100], ['0-20', '21-30', '31-40', '41-50', '51-60', '61-70', '71+']),
+    # Faixas de peso: 0-50, 51-60, 61-70, 71-80, 81-90, 91-100, 101+
+    'Weight (kg)': ([0, 50, 60, 70, 80, 90, 100, 200], ['0-50kg', '51-60kg', '61-70kg', '71-80kg', '81-90kg', '91-100kg', '101+kg']),
+    # Faixas de altura: 1.40-1.50, 1.51-1.60, 1.61-1.70, 1.71-1.80, 1.81-1.90, 1.91+
+    'Height (m)': ([1.40, 1.50, 1.60, 1.70, 1.80, 1.90, 2.20], ['1.40-1.50m', '1.51-1.60m', '1.61-1.70m', '1.71-1.80m', '1.81-1.90m', '1.91+m']),
+    # Faixas de IMC: <18.5, 18.5-24.9, 25-29.9, 30-34.9, 35-39.9, 40+
+    'BMI': ([0, 18.5, 25, 30, 35, 40, 100], ['<18.5', '18.5-24.9', '25-29.9', '30-34.9', '35-39.9', '40+']),
+}
+
+METRICAS_OPCIONAIS = {
+    'media_presc_semana': 'Average medications/week',
+    'media_diario_semana': 'Average diaries/week',
+    'media_atividade_semana': 'Average activities/week',
+    'percentual_acq': '% weeks with ACQ filled',
+}
+
+def preparar_metricas(df_recorte):
+    """
+    Acrescenta o IMC ao recorte e lista as métricas disponíveis.
+
+    Returns:
+        Tupla (df, metricas): cópia do recorte com a coluna imc e dict nome exibido -> coluna
+    """
+    metricas_numericas = {
+        'Age': 'age',
+        'Weight (kg)': 'weight',
+        'Height (m)': 'height',
+    }
+    df_recorte = df_recorte.copy()  # Evitar SettingWithCopyWarning
+    if 'imc' not in df_recorte.columns:
+        # Peso ou altura ausentes ou zerados não têm IMC
+        altura = df_recorte['height']
+        peso = df_recorte['weight']
+        validos = altura.notna() & peso.notna() & (altura != 0) & (peso != 0)
+        df_recorte['imc'] = (peso / altura ** 2).where(validos, np.nan)
+    metricas_numericas['BMI'] = 'imc'
+
+    # Removido ACQ inicial - não adequado para barplot
+    for col, nome in METRICAS_OPCIONAIS.items():
+        if col in df_recorte.columns:
+            metricas_numericas[nome] = col
+    return df_recorte, metricas_numericas
+
+def criar_faixas(valores, metrica_nome):
+    """Cria faixas apropriadas para cada tipo de métrica"""
+    valores_limpos = valores.dropna()
+    if len(valores_limpos) == 0:
+        return pd.DataFrame()
+
+    if metrica_nome in FAIXAS_METRICAS:
+        bins, labels = FAIXAS_METRICAS[metrica_nome]
+    else:
+        # Faixas genéricas baseadas em quartis
+        q25, q50, q75 = valores_limpos.quantile([0.25, 0.5, 0.75])
+        bins = [valores_limpos.min(), q25, q50, q75, valores_limpos.max()]
+        labels = ['Q1', 'Q2', 'Q3', 'Q4']
+
+    # Criar faixas
+    faixas = pd.cut(valores_limpos, bins=bins, labels=labels, include_lowest=True)
+    contagem = faixas.value_counts().sort_index()
+    percentual = (contagem / len(valores_limpos) * 100).round(1)
+
+    return pd.DataFrame({
+        'Range': contagem.index,
+        'Count': contagem.values,
+        'Percentage': percentual.values
+    })
+
+def tabela_individual(df_recorte, coluna):
+    """
+    Valores individuais da métrica, do maior para o menor, com sexo (em código) e idade.
+
+    Returns:
+        DataFrame com Value (ou Age, se a métrica for a idade), Gender, Patient ID e Age
+    """
+    colunas_tabela = [coluna, 'gender', 'id']
+    if coluna != 'age':
+        colunas_tabela.append('age')
+
+    df_tabela = df_recorte[colunas_tabela].copy()
+    df_tabela = df_tabela.dropna(subset=[coluna])
+
+    # Ordenar por valor ANTES da renomeação das colunas
+    df_tabela = df_tabela.sort_values(coluna, ascending=False)
+
+    # Renomear colunas para melhor legibilidade
+    df_tabela = df_tabela.rename(columns={
+        coluna: 'Value',
+        'gender': 'Gender',
+        'id': 'Patient ID'
+    })
+
+    # Adicionar coluna de idade se não for a métrica selecionada
+    if coluna != 'age':
+        df_tabela = df_tabela.rename(columns={'age': 'Age'})
+    else:
+        # Se a métrica selecionada é 'age', renomear para 'Age' também
+        df_tabela = df_tabela.rename(columns={'Value': 'Age'})
+
+    # Formatar valores numéricos
+    if 'Age' in df_tabela.columns:
+        df_tabela['Age'] = df_tabela['Age'].astype(int)
+    return df_tabela
+
+def calcular_distribuicao(df_recorte, coluna, metrica_nome):
+    """
+    Estatísticas, distribuição por faixas e valores individuais de uma métrica.
+
+    Args:
+        df_recorte: Recorte preparado por preparar_metricas
+        coluna: Coluna da métrica
+        metrica_nome: Nome exibido da métrica (define as faixas)
+
+    Returns:
+        dict com valores (sem zeros e ausentes), estatisticas, faixas e individual
+    """
+    valores_validos = df_recorte[coluna].replace(0, np.nan).dropna()
+    return {
+        'valores': valores_validos,
+        'estatisticas': {
+            'media': valores_validos.mean(),
+            'desvio': valores_validos.std(),
+            'mediana': valores_validos.median(),
+            'q1': valores_validos.quantile(0.25),
+            'q3': valores_validos.quantile(0.75),
+        },
+        'faixas': criar_faixas(valores_validos, metrica_nome),
+        'individual': tabela_individual(df_recorte, coluna),
+    }
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Faixas de duração (dias completos) e o código de cada uma (chave em sections.crises.duration_ranges)
+LIMITES_DURACAO = [-1, 2, 5, 10, 15, 30, float('inf')]
+FAIXAS_DURACAO = ['1_2', '3_5', '6_10', '11_15', '16_30', 'more_30']
+
+def _coluna_paciente(df_pacientes, coluna, padrao, patient_idx):
+    """Valores de uma coluna da tabela de pacientes para cada evento (padrão se a coluna não existir)."""
+    if coluna not in df_pacientes.columns:
+        return np.full(len(patient_idx), padrao, dtype=object)
+    return df_pacientes[coluna].fillna(padrao).to_numpy()[patient_idx]
+
+def calcular_crises(tabelas):
+    """
+    Indicadores gerais de crises e detalhamento das crises com início e fim válidos.
+
+    Returns:
+        dict com total_crises, total_pacientes, total_pacientes_com_crise, taxa_pacientes_crise
+        e crises (DataFrame paciente_id, gender, idade, duracao, data_inicio, data_fim e
+        faixa_duracao com os códigos de FAIXAS_DURACAO; None se não houver crises),
+        além de duracao (média, mediana, máximo e mínimo) e por_sexo ('male'/'female' ->
+        crises, duracao_media e pacientes, ou None) quando há crises válidas
+    """
+    df_pacientes = tabelas['pacientes']
+    total_crises = int(df_pacientes['total_crisis'].sum())
+    total_pacientes = len(df_pacientes)
+    total_pacientes_com_crise = int((df_pacientes['total_crisis'] > 0).sum())
+    dados = {
+        'total_crises': total_crises,
+        'total_pacientes': total_pacientes,
+        'total_pacientes_com_crise': total_pacientes_com_crise,
+        'taxa_pacientes_crise': (total_pacientes_com_crise / total_pacientes * 100) if total_pacientes > 0 else 0,
+        'crises': None,
+    }
+    if total_crises == 0:
+        return dados
+
+    # Processamento detalhado das crises: apenas crises com início e fim válidos
+    df_eventos = tabelas['crises'].dropna(subset=['ts', 'final_ts']).reset_index(drop=True)
+    patient_idx = df_eventos['patient_idx'].to_numpy()
+    df_crises = pd.DataFrame({
+        'paciente_id': df_eventos['patient_id'].to_numpy(),
+        'gender': _coluna_paciente(df_pacientes, 'gender', '', patient_idx),
+        'idade': _coluna_paciente(df_pacientes, 'age', 0, patient_idx),
+        # Duração da crise em dias completos
+        'duracao': (df_eventos['final_ts'] - df_eventos['ts']).dt.days,
+        'data_inicio': df_eventos['ts'],
+        'data_fim': df_eventos['final_ts']
+    })
+    df_crises['faixa_duracao'] = pd.cut(df_crises['duracao'], bins=LIMITES_DURACAO, labels=FAIXAS_DURACAO)
+    dados['crises'] = df_crises
+    if df_crises.empty:
+        return dados
+
+    dados['duracao'] = {
+        'media': df_crises['duracao'].mean(),
+        'mediana': df_crises['duracao'].median(),
+        'max': df_crises['duracao'].max(),
+        'min': df_crises['duracao'].min(),
+    }
+    dados['por_sexo'] = {}
+    for sexo in ['male', 'female']:
+        dados_sexo = df_crises[df_crises['gender'] == sexo]
+        dados['por_sexo'][sexo] = None if dados_sexo.empty else {
+            'crises': len(dados_sexo),
+            'duracao_media': dados_sexo['duracao'].mean(),
+            # Pacientes únicos por sexo
+            'pacientes': dados_sexo['paciente_id'].nunique(),
+        }
+    return dados
@@ -0,0 +1,26 @@
+from utils.semanas import agregar_por_semana, formatar_periodo_semana
+
+def calcular_diarios_semanais(df_diarios, data_inicio, data_fim):
+    """
+    Média de diários por usuário ativo em cada semana com uso.
+
+    Returns:
+        DataFrame com Week, Average Records, Active Users e Period (só semanas com usuários ativos)
+    """
+    df_semanas = agregar_por_semana(df_diarios, data_inicio, data_fim).rename(columns={
+        'week_number': 'Week',
+        'active_users': 'Active Users'
+    })
+
+    # Média de registros por usuário ativo em cada semana
+    df_semanas['Average Records'] = (
+        df_semanas['total'] / df_semanas['Active Users'].where(df_semanas['Active Users'] > 0)
+    ).fillna(0)
+    df_semanas = df_semanas[['Week', 'Average Records', 'Active Users']]
+
+    # Filtrar apenas semanas com usuários ativos
+    df_semanas = df_semanas[df_semanas['Active Users'] > 0].copy()
+
+    # Converter números de semana para períodos de data legíveis
+    df_semanas['Period'] = df_semanas['Week'].apply(formatar_periodo_semana, args=(data_inicio,))
+    return df_semanas
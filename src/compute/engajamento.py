@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from utils.atividade_diaria import contar_bits, dias_do_mapa, uniao_funcionalidades, uniao_janelas
+
+JANELA_SEMANA = 7
+JANELA_MES = 30
+
+def curva_engajamento(mapa, funcionalidades=None):
+    """
+    Usuários ativos diários, semanais e mensais de cada dia do mapa.
+
+    WAU e MAU são os pacientes distintos nos 7 e 30 dias terminados no dia (janelas móveis,
+    limitadas ao início do mapa); Stickiness é DAU / MAU em %.
+
+    Args:
+        mapa: Mapa de utils.atividade_diaria.construir_mapa_atividade
+        funcionalidades: Tabelas de eventos consideradas (padrão: todas)
+
+    Returns:
+        DataFrame com Date, DAU, WAU, MAU e Stickiness
+    """
+    diario = uniao_funcionalidades(mapa, funcionalidades)
+    dau = contar_bits(diario)
+    wau = contar_bits(uniao_janelas(diario, JANELA_SEMANA))
+    mau = contar_bits(uniao_janelas(diario, JANELA_MES))
+    stickiness = np.zeros(len(dau))
+    np.divide(dau * 100, mau, out=stickiness, where=mau > 0)
+    return pd.DataFrame({
+        'Date': dias_do_mapa(mapa),
+        'DAU': dau,
+        'WAU': wau,
+        'MAU': mau,
+        'Stickiness': stickiness,
+    })
+
+def calcular_engajamento(mapa):
+    """
+    Curvas de engajamento de todas as funcionalidades juntas e de cada uma.
+
+    Returns:
+        dict 'todas' -> curva com qualquer uso e tabela de eventos -> curva só dessa
+        funcionalidade (ver curva_engajamento)
+    """
+    curvas = {'todas': curva_engajamento(mapa)}
+    for nome in mapa['funcionalidades']:
+        curvas[nome] = curva_engajamento(mapa, [nome])
+    return curvas
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from utils.data_processing import COLUNAS_TOTAIS
+
+# Funcionalidades do ranking de uso e a coluna de total de cada uma
+FUNCIONALIDADES = {
+    'Symptom Diaries': 'total_symptom_diaries',
+    'ACQ (Asthma Control)': 'total_acqs',
+    'Physical Activities': 'total_activity_logs',
+    'Medications': 'total_prescriptions',
+    'Crisis Records': 'total_crisis',
+}
+
+def calcular_funcionalidades_geral(df_recorte):
+    """
+    Quantidade de funcionalidades usadas por paciente, ranking de uso e distribuição por gênero.
+
+    Returns:
+        dict com distribuicao (pacientes por número de funcionalidades), media, mediana, moda,
+        pacientes_ativos, pacientes_inativos, taxa_ativacao, ranking (DataFrame Position,
+        Feature, Users, Usage Rate, do mais para o menos usado) e contagem_sexo
+        (value_counts de gender, None se a coluna não existir)
+    """
+    total_pacientes = len(df_recorte)
+    n_funcionalidades = (df_recorte[list(COLUNAS_TOTAIS.values())] > 0).sum(axis=1)
+    moda = n_funcionalidades.mode()
+    pacientes_ativos = int((n_funcionalidades > 0).sum())
+
+    # Ordenar funcionalidades por uso
+    uso = {nome: (df_recorte[coluna] > 0).sum() for nome, coluna in FUNCIONALIDADES.items()}
+    func_ordenadas = dict(sorted(uso.items(), key=lambda x: x[1], reverse=True))
+    ranking = pd.DataFrame([
+        {
+            'Position': f"{i}",
+            'Feature': func_nome,
+            'Users': usuarios,
+            'Usage Rate': f"{(usuarios / total_pacientes) * 100 if total_pacientes > 0 else 0:.1f}%"
+        }
+        for i, (func_nome, usuarios) in enumerate(func_ordenadas.items(), 1)
+    ])
+
+    return {
+        'total_pacientes': total_pacientes,
+        'distribuicao': n_funcionalidades.value_counts().sort_index(),
+        'media': n_funcionalidades.mean(),
+        'mediana': n_funcionalidades.median(),
+        'moda': moda.iloc[0] if not moda.empty else 0,
+        'pacientes_ativos': pacientes_ativos,
+        'pacientes_inativos': total_pacientes - pacientes_ativos,
+        'taxa_ativacao': (pacientes_ativos / total_pacientes) * 100 if total_pacientes > 0 else 0,
+        'uso': func_ordenadas,
+        'ranking': ranking,
+        'contagem_sexo': df_recorte['gender'].value_counts(dropna=False) if 'gender' in df_recorte.columns else None,
+    }
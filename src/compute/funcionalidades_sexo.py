@@ -0,0 +1,50 @@
+from utils.data_processing import COLUNAS_TOTAIS
+
+FUNCIONALIDADES_NOMES = {
+    'symptomDiaries': 'Symptom Diaries',
+    'acqs': 'ACQ (Asthma Control)',
+    'activityLogs': 'Physical Activities',
+    'prescriptions': 'Medications',
+    'crisis': 'Crisis Records'
+}
+
+SEXOS = ['male', 'female']
+
+def calcular_funcionalidades_sexo(df_recorte):
+    """
+    Adesão a cada funcionalidade por sexo.
+
+    Returns:
+        dict com totais ('male'/'female' -> pacientes), por_funcionalidade (nome ->
+        sexo -> count, total e perc) e maior_diferenca (funcionalidade, sexo com maior
+        adesão e diferença em pontos percentuais, ou None se não houver diferença);
+        None se o recorte estiver vazio
+    """
+    if df_recorte.empty:
+        return None
+
+    totais = {sexo: int((df_recorte['gender'] == sexo).sum()) for sexo in SEXOS}
+    por_funcionalidade = {}
+    for func_key, func_nome in FUNCIONALIDADES_NOMES.items():
+        usou = df_recorte[COLUNAS_TOTAIS[func_key]] > 0
+        por_funcionalidade[func_nome] = {}
+        for sexo in SEXOS:
+            # Usuários do sexo que usaram a funcionalidade
+            count = int(((df_recorte['gender'] == sexo) & usou).sum())
+            por_funcionalidade[func_nome][sexo] = {
+                'count': count,
+                'total': totais[sexo],
+                'perc': (count / totais[sexo] * 100) if totais[sexo] > 0 else 0,
+            }
+
+    # Identificar funcionalidade com maior diferença de adesão
+    maior_diferenca = None
+    maior_diff = 0
+    for func_nome, dados in por_funcionalidade.items():
+        diff = abs(dados['male']['perc'] - dados['female']['perc'])
+        if diff > maior_diff:
+            maior_diff = diff
+            sexo = 'male' if dados['male']['perc'] > dados['female']['perc'] else 'female'
+            maior_diferenca = {'funcionalidade': func_nome, 'sexo': sexo, 'diferenca': diff}
+
+    return {'totais': totais, 'por_funcionalidade': por_funcionalidade, 'maior_diferenca': maior_diferenca}
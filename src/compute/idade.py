@@ -0,0 +1,30 @@
+def _estatisticas_idade(idades):
+    """Total, média, mediana, mínimo e máximo de uma série de idades (None se estiver vazia)."""
+    if idades.empty:
+        return None
+    return {
+        'total': len(idades),
+        'media': idades.mean(),
+        'mediana': idades.median(),
+        'min': idades.min(),
+        'max': idades.max(),
+    }
+
+def calcular_idade(df_recorte):
+    """
+    Distribuição de idade geral e por sexo.
+
+    Returns:
+        dict com idades (DataFrame age, gender para os histogramas), geral e por_sexo
+        ('male'/'female' -> estatísticas ou None); None se o recorte estiver vazio
+    """
+    if df_recorte.empty:
+        return None
+    return {
+        'idades': df_recorte[['age', 'gender']].copy(),
+        'geral': _estatisticas_idade(df_recorte['age']),
+        'por_sexo': {
+            sexo: _estatisticas_idade(df_recorte.loc[df_recorte['gender'] == sexo, 'age'])
+            for sexo in ['male', 'female']
+        },
+    }
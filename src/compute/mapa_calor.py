@@ -0,0 +1,62 @@
+import pandas as pd
+
+from utils.data_processing import COLUNAS_TOTAIS
+
+FUNCIONALIDADES_COLS = ['symptomDiaries', 'acqs', 'activityLogs', 'prescriptions', 'crisis']
+FUNCIONALIDADES_NOMES = ['Diaries', 'ACQ', 'Activities', 'Medications', 'Crises']
+
+# Grupos comparados, na ordem de exibição
+GRUPOS = ['general', 'male', 'female']
+
+def criar_matriz_correlacao(df_dados):
+    """Binariza o uso das funcionalidades e retorna a matriz de correlação."""
+    df_bin = pd.DataFrame()
+    for col in FUNCIONALIDADES_COLS:
+        df_bin[col] = (df_dados[COLUNAS_TOTAIS[col]] > 0).astype(int)
+    df_bin.columns = FUNCIONALIDADES_NOMES
+    return df_bin.corr()
+
+def _pares_correlacao(matriz, grupo):
+    """Correlação de cada par de funcionalidades (triângulo superior da matriz)."""
+    correlacoes = []
+    for i in range(len(matriz.columns)):
+        for j in range(i + 1, len(matriz.columns)):
+            correlacoes.append({
+                'grupo': grupo,
+                'funcionalidade_1': matriz.columns[i],
+                'funcionalidade_2': matriz.columns[j],
+                'correlacao': matriz.iloc[i, j]
+            })
+    return correlacoes
+
+def calcular_mapa_calor(df_recorte):
+    """
+    Matrizes de correlação do uso das funcionalidades: geral, masculino e feminino.
+
+    Returns:
+        dict com matrizes e pacientes (grupo -> matriz ou None / quantidade de pacientes;
+        os grupos de sexo precisam de mais de um paciente) e correlacoes (todos os pares dos
+        três grupos ordenados pela correlação absoluta; None se algum grupo não tiver matriz)
+    """
+    grupos = {
+        'general': df_recorte,
+        'male': df_recorte[df_recorte['gender'] == 'male'],
+        'female': df_recorte[df_recorte['gender'] == 'female'],
+    }
+    matrizes = {
+        grupo: criar_matriz_correlacao(df) if grupo == 'general' or len(df) > 1 else None
+        for grupo, df in grupos.items()
+    }
+
+    correlacoes = None
+    if all(matriz is not None for matriz in matrizes.values()):
+        todas = [par for grupo in GRUPOS for par in _pares_correlacao(matrizes[grupo], grupo)]
+        correlacoes = pd.DataFrame(todas)
+        correlacoes['correlacao_abs'] = correlacoes['correlacao'].abs()
+        correlacoes = correlacoes.sort_values('correlacao_abs', ascending=False)
+
+    return {
+        'matrizes': matrizes,
+        'pacientes': {grupo: len(df) for grupo, df in grupos.items()},
+        'correlacoes': correlacoes,
+    }
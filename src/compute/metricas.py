@@ -0,0 +1,16 @@
+def calcular_metricas(df_recorte):
+    """
+    Métricas principais do recorte.
+
+    Returns:
+        dict com total_cadastrados, perc_com_medicamento, perc_atividade e media_idade
+    """
+    total_cadastrados = df_recorte.shape[0]
+    total_com_medicamento = (df_recorte['total_prescriptions'] > 0).sum()
+    total_atividade = (df_recorte['total_activity_logs'] > 0).sum()
+    return {
+        'total_cadastrados': total_cadastrados,
+        'perc_com_medicamento': 100 * total_com_medicamento / len(df_recorte) if len(df_recorte) > 0 else 0,
+        'perc_atividade': 100 * total_atividade / len(df_recorte) if len(df_recorte) > 0 else 0,
+        'media_idade': df_recorte['age'].replace(0, None).mean(),
+    }
@@ -0,0 +1,147 @@
+import pandas as pd
+
+from utils.semanas import agregar_por_semana, contagem_paciente_semana, formatar_periodo_semana
+
+def _semanas_com_uso(df_eventos, data_inicio, data_fim, coluna_total):
+    """Totais semanais com usuários ativos, com o período legível de cada semana."""
+    df_semanas = agregar_por_semana(df_eventos, data_inicio, data_fim).rename(columns={
+        'week_number': 'Semana',
+        'total': coluna_total,
+        'active_users': 'Active Users'
+    })
+    df_semanas = df_semanas[df_semanas['Active Users'] > 0].copy()
+    df_semanas['Period'] = df_semanas['Semana'].apply(formatar_periodo_semana, args=(data_inicio,))
+    return df_semanas
+
+def calcular_prescricoes_semanais(tabelas, data_inicio, data_fim):
+    """
+    Agregados semanais de administrações e prescrições e tabela de validação.
+
+    Returns:
+        dict com administracoes_semanais, prescricoes_semanais (Semana, Total *, Active Users, Period),
+        administracoes_paciente_semana, prescricoes_paciente_semana e validacao
+    """
+    df_prescricoes = tabelas['prescricoes']
+    df_administracoes = tabelas['administracoes']
+    return {
+        'administracoes_semanais': _semanas_com_uso(df_administracoes, data_inicio, data_fim, 'Total Administrations'),
+        'prescricoes_semanais': _semanas_com_uso(df_prescricoes, data_inicio, data_fim, 'Total Prescriptions'),
+        'administracoes_paciente_semana': gerar_tabela_administrations_semana(df_administracoes, data_inicio, data_fim),
+        'prescricoes_paciente_semana': gerar_tabela_prescriptions_semana(df_prescricoes, data_inicio, data_fim),
+        'validacao': gerar_tabela_validacao_completa(df_prescricoes),
+    }
+
+def _contagens_paciente_semana(df_eventos, data_inicio, data_fim, coluna_total):
+    """
+    Conta os eventos de cada paciente em cada semana do período.
+    
+    Args:
+        df_eventos: Tabela de eventos com patient_idx, patient_id e ts
+        data_inicio: Start date of analysis period
+        data_fim: End date of analysis period
+        coluna_total: Nome da coluna com a contagem no resultado
+    
+    Returns:
+        DataFrame with columns: patient_id, week_period, week_number, <coluna_total>
+    """
+    contagens = contagem_paciente_semana(df_eventos, data_inicio, data_fim)
+    if contagens.empty:
+        return pd.DataFrame()
+    
+    # Um rótulo por semana distinta, em vez de formatar linha a linha
+    semanas = contagens['week_number'].unique()
+    rotulos = {semana: formatar_periodo_semana(semana, data_inicio) for semana in semanas}
+    
+    return pd.DataFrame({
+        'patient_id': contagens['patient_id'],
+        'week_period': contagens['week_number'].map(rotulos),
+        'week_number': contagens['week_number'],
+        coluna_total: contagens['count']
+    })
+
+def gerar_tabela_administrations_semana(df_administracoes, data_inicio, data_fim):
+    """
+    Generates a detailed table with administrations grouped by patient and week.
+    
+    Args:
+        df_administracoes: Administrations table (tabelas['administracoes'])
+        data_inicio: Start date of analysis period
+        data_fim: End date of analysis period
+    
+    Returns:
+        DataFrame with columns: patient_id, week_period, week_number, total_administrations
+    """
+    return _contagens_paciente_semana(df_administracoes, data_inicio, data_fim, 'total_administrations')
+
+def gerar_tabela_prescriptions_semana(df_prescricoes, data_inicio, data_fim):
+    """
+    Generates a detailed table with prescriptions grouped by patient and week.
+    
+    Args:
+        df_prescricoes: Prescriptions table (tabelas['prescricoes'])
+        data_inicio: Start date of analysis period
+        data_fim: End date of analysis period
+    
+    Returns:
+        DataFrame with columns: patient_id, week_period, week_number, total_prescriptions
+    """
+    return _contagens_paciente_semana(df_prescricoes, data_inicio, data_fim, 'total_prescriptions')
+
+def gerar_tabela_validacao_completa(df_prescricoes):
+    """
+    Generates a complete validation table with all prescriptions and their taken status.
+    
+    Args:
+        df_prescricoes: Prescriptions table (tabelas['prescricoes'])
+    
+    Returns:
+        DataFrame with columns: patient_id, prescription_date, prescription_id, taken
+    """
+    if df_prescricoes.empty:
+        return pd.DataFrame()
+    
+    # Verificar se a prescrição foi tomada (tem pelo menos uma administration)
+    df_validacao = pd.DataFrame({
+        'patient_id': df_prescricoes['patient_id'],
+        'prescription_date': df_prescricoes['ts'],
+        'prescription_id': df_prescricoes['prescription_id'],
+        'taken': df_prescricoes['n_administrations'] > 0
+    })
+    
+    # Ordenar por data de prescrição (mais antigas primeiro)
+    df_validacao = df_validacao.sort_values('prescription_date', na_position='last', kind='stable')
+    
+    return df_validacao
+
+def gerar_tabela_detalhada_semana(df_prescricoes, semana_num, data_inicio):
+    """
+    Generates a detailed table with medication records for a specific week.
+    
+    Args:
+        df_prescricoes: Prescriptions table (tabelas['prescricoes'])
+        semana_num: Week number to analyze
+        data_inicio: Start date of analysis period
+    
+    Returns:
+        DataFrame with columns: Patient_ID, Prescription_ID, Record_Date, Formatted_Date
+    """
+    # Calcular início e fim da semana
+    semana_data = data_inicio + pd.Timedelta(weeks=semana_num)
+    inicio_semana = semana_data - pd.Timedelta(days=semana_data.weekday())
+    fim_semana = inicio_semana + pd.Timedelta(days=6)
+    
+    # Normalizar timezone para UTC
+    if inicio_semana.tz is None:
+        inicio_semana = inicio_semana.tz_localize('UTC')
+    if fim_semana.tz is None:
+        fim_semana = fim_semana.tz_localize('UTC')
+    
+    # Verificar se a prescrição foi criada na semana analisada
+    na_semana = df_prescricoes[(df_prescricoes['ts'] >= inicio_semana) & (df_prescricoes['ts'] <= fim_semana)]
+    
+    return pd.DataFrame({
+        'Patient_ID': na_semana['patient_id'],
+        'Prescription_ID': na_semana['prescription_id'],
+        'Record_Date': na_semana['ts'],
+        'Formatted_Date': na_semana['ts'].dt.strftime('%d/%m/%Y %H:%M:%S')
+    }).reset_index(drop=True)
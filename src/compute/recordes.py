@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Métricas dos rankings, na ordem do seletor da seção
+METRICAS_RANKING = ['passos_dia', 'diarios_semana', 'administracoes_semana', 'acq_conclusao', 'idade_conta']
+
+def passos_por_paciente(df_pacientes, df_atividades):
+    """Total de passos de cada paciente, na ordem da tabela de pacientes."""
+    return np.bincount(
+        df_atividades['patient_idx'].to_numpy(),
+        weights=df_atividades['steps'].to_numpy(),
+        minlength=len(df_pacientes)
+    ).astype('int64')
+
+def _por_tempo(contagem, divisor, elegiveis):
+    """contagem / divisor onde elegível e contagem > 0; NaN nos demais (fora do ranking)."""
+    resultado = np.full(len(contagem), np.nan)
+    np.divide(contagem, divisor, out=resultado, where=elegiveis & (contagem > 0))
+    return resultado
+
+def metricas_engajamento(tabelas, data_coleta):
+    """
+    Métricas de engajamento de cada paciente, normalizadas pelo tempo de conta.
+
+    Todas saem de contagens por patient_idx (np.bincount) sobre as tabelas de eventos:
+    - passos_dia: passos totais / dias desde o cadastro
+    - diarios_semana e administracoes_semana: registros / semanas desde o cadastro
+    - acq_conclusao: ACQs respondidos (com média) / semanas iniciadas desde o cadastro, em % (até 100)
+    - idade_conta: dias desde o cadastro até data_coleta
+
+    Args:
+        tabelas: Tabelas de eventos do recorte
+        data_coleta: Data final da coleta (data de referência do upload)
+
+    Returns:
+        DataFrame na ordem da tabela de pacientes com id, data_cadastro, total_passos e as
+        colunas de METRICAS_RANKING; NaN onde o paciente não entra no ranking (conta sem data
+        ou sem nenhum dia até data_coleta, ou sem nenhum registro da métrica)
+    """
+    df_pacientes = tabelas['pacientes']
+    n_pacientes = len(df_pacientes)
+    passos = passos_por_paciente(df_pacientes, tabelas['atividades'])
+    diarios = np.bincount(tabelas['diarios']['patient_idx'].to_numpy(), minlength=n_pacientes)
+    administracoes = np.bincount(tabelas['administracoes']['patient_idx'].to_numpy(), minlength=n_pacientes)
+    df_acqs = tabelas['acqs']
+    respondidos = df_acqs['average'].notna().to_numpy()
+    acqs = np.bincount(df_acqs['patient_idx'].to_numpy()[respondidos], minlength=n_pacientes)
+
+    # Período em dias desde a criação da conta (contas sem data ficam de fora)
+    periodo_dias = (data_coleta - df_pacientes['createdAt']).dt.days.to_numpy(dtype='float64', na_value=np.nan)
+    com_periodo = periodo_dias > 0
+    semanas = periodo_dias / 7
+
+    return pd.DataFrame({
+        'id': df_pacientes['id'].to_numpy(),
+        'data_cadastro': df_pacientes['createdAt'].array,
+        'total_passos': passos,
+        'passos_dia': _por_tempo(passos, periodo_dias, com_periodo),
+        'diarios_semana': _por_tempo(diarios, semanas, com_periodo),
+        'administracoes_semana': _por_tempo(administracoes, semanas, com_periodo),
+        'acq_conclusao': np.minimum(_por_tempo(acqs * 100, np.ceil(semanas), com_periodo), 100),
+        'idade_conta': np.where(com_periodo, periodo_dias, np.nan),
+    })
+
+def ranking_top_k(df_metricas, k, metricas=METRICAS_RANKING):
+    """
+    Os k pacientes com os maiores valores de cada métrica, todas numa mesma passada.
+
+    Uma seleção parcial (np.partition) sobre a matriz paciente x métrica dá o k-ésimo maior
+    valor de cada métrica sem ordenar a tabela; só os k selecionados são ordenados. Empates
+    no limiar são resolvidos pela ordem da tabela (o primeiro paciente entra), então o
+    primeiro colocado é o mesmo de um argmax.
+
+    Args:
+        df_metricas: Tabela de metricas_engajamento
+        k: Quantidade de pacientes por ranking
+        metricas: Colunas ranqueadas
+
+    Returns:
+        dict métrica -> DataFrame com posicao e as colunas de df_metricas dos selecionados,
+        do maior para o menor valor (menos de k linhas se faltarem pacientes com valor)
+    """
+    valores = df_metricas[metricas].to_numpy(dtype='float64', na_value=np.nan)
+    n_pacientes = len(valores)
+    k = min(k, n_pacientes)
+    if k <= 0:
+        return {metrica: df_metricas.iloc[:0].assign(posicao=pd.Series(dtype='int64')) for metrica in metricas}
+    valores = np.where(np.isnan(valores), -np.inf, valores)
+
+    limiares = np.partition(valores, n_pacientes - k, axis=0)[n_pacientes - k]
+    acima = valores > limiares
+    iguais = valores == limiares
+    vagas = k - acima.sum(axis=0)
+    selecionados = (acima | (iguais & (np.cumsum(iguais, axis=0) <= vagas))) & np.isfinite(valores)
+
+    rankings = {}
+    for coluna, metrica in enumerate(metricas):
+        linhas = np.flatnonzero(selecionados[:, coluna])
+        linhas = linhas[np.lexsort((linhas, -valores[linhas, coluna]))]
+        ranking = df_metricas.iloc[linhas].reset_index(drop=True)
+        ranking.insert(0, 'posicao', np.arange(1, len(linhas) + 1))
+        rankings[metrica] = ranking
+    return rankings
+
+def calcular_recordes(tabelas, data_coleta):
+    """
+    Paciente mais ativo (maior média diária de passos desde o cadastro) e estatísticas gerais.
+
+    Args:
+        tabelas: Tabelas de eventos do recorte
+        data_coleta: Data final da coleta (data de referência do upload)
+
+    Returns:
+        dict com mais_ativo (dict ou None), passos (totais dos pacientes com algum passo) e
+        metricas (metricas_engajamento, base dos rankings)
+    """
+    df_metricas = metricas_engajamento(tabelas, data_coleta)
+
+    # O mais ativo é o primeiro do ranking de passos por dia
+    mais_ativo = None
+    primeiro = ranking_top_k(df_metricas, 1, ['passos_dia'])['passos_dia']
+    if len(primeiro) > 0:
+        melhor = primeiro.iloc[0]
+        mais_ativo = {
+            'id': melhor['id'],
+            'data_cadastro': melhor['data_cadastro'],
+            'total_passos': int(melhor['total_passos']),
+            'periodo_dias': int(melhor['idade_conta']),
+            'media_diaria': float(melhor['passos_dia'])
+        }
+
+    passos = df_metricas['total_passos'].to_numpy()
+    return {'mais_ativo': mais_ativo, 'passos': passos[passos > 0], 'metricas': df_metricas}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+def primeiros_acqs(df_acqs):
+    """Primeiro ACQ válido (score entre 0 e 6) de cada paciente."""
+    # Coletar apenas o primeiro ACQ de cada paciente: ordem cronológica (mais antigo primeiro),
+    # ACQs sem data interpretável por último, como na ordenação original por texto
+    primeiros = df_acqs.sort_values(['patient_idx', 'ts'], na_position='last', kind='stable')
+    primeiros = primeiros.drop_duplicates('patient_idx', keep='first')
+    
+    # Validar se o score está na faixa esperada (0-6 para ACQ)
+    return primeiros[primeiros['average'].between(0, 6)].reset_index(drop=True)
+
+def calcular_status_acq(tabelas):
+    """
+    Taxa de preenchimento do ACQ e primeiro ACQ válido de cada paciente.
+
+    Returns:
+        dict com total_pacientes, pacientes_com_acq, pacientes_sem_acq, taxa_preenchimento,
+        scores e status dos primeiros ACQs, estatisticas (média, desvio, mediana, quartis),
+        contagem_status (sem 'N/A') e detalhes (uma linha por paciente, ordenada pela data
+        do primeiro ACQ, com Gender em código)
+    """
+    df_pacientes = tabelas['pacientes']
+    
+    # Contadores para taxa de preenchimento
+    total_pacientes = len(df_pacientes)
+    pacientes_com_acq = int((df_pacientes['total_acqs'] > 0).sum())
+    
+    primeiros = primeiros_acqs(tabelas['acqs'])
+    
+    # Normalizar o status para consistência
+    status = primeiros['control_status'].fillna('N/A').astype(str).str.strip()
+    scores = primeiros['average'].tolist()
+    status_validos = status.where(status != '', 'N/A').tolist()
+    
+    # Detalhes de cada paciente para a tabela
+    patient_idx = primeiros['patient_idx'].to_numpy()
+    gender_raw = df_pacientes['gender'].fillna('').to_numpy()[patient_idx] if 'gender' in df_pacientes.columns else np.full(len(patient_idx), '', dtype=object)
+    idades = df_pacientes['age'].to_numpy()[patient_idx] if 'age' in df_pacientes.columns else np.full(len(patient_idx), 'N/A', dtype=object)
+    detalhes = pd.DataFrame({
+        'Patient ID': primeiros['patient_id'],
+        'Age': idades,
+        'Gender': gender_raw,
+        'First ACQ Date': primeiros['ts'],
+        'ACQ Score': [f"{score:.2f}" for score in scores],
+        'Status': status,
+        'Total ACQs': df_pacientes['total_acqs'].to_numpy()[patient_idx]
+    })
+    # Ordenar por data do primeiro ACQ e formatar a data para exibição
+    detalhes = detalhes.sort_values('First ACQ Date', ascending=True)
+    detalhes['First ACQ Date'] = detalhes['First ACQ Date'].dt.strftime('%d/%m/%Y %H:%M')
+    
+    df_acq = pd.DataFrame({'score': scores, 'status': status_validos})
+    valores_validos = df_acq['score'].dropna()
+    
+    return {
+        'total_pacientes': total_pacientes,
+        'pacientes_com_acq': pacientes_com_acq,
+        'pacientes_sem_acq': total_pacientes - pacientes_com_acq,
+        'taxa_preenchimento': (pacientes_com_acq / total_pacientes * 100) if total_pacientes > 0 else 0,
+        'scores': df_acq,
+        'estatisticas': {
+            'media': valores_validos.mean(),
+            'desvio': valores_validos.std(),
+            'mediana': valores_validos.median(),
+            'q1': valores_validos.quantile(0.25),
+            'q3': valores_validos.quantile(0.75),
+        },
+        # Apenas status válidos para o gráfico de pizza
+        'contagem_status': df_acq.loc[df_acq['status'] != 'N/A', 'status'].value_counts(),
+        'detalhes': detalhes,
+    }
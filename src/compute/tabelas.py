@@ -0,0 +1,18 @@
+COLUNAS_EXIBICAO = [
+    'id', 'age', 'gender', 'height', 'weight',
+    'total_symptom_diaries', 'total_acqs', 'total_activity_logs',
+    'total_prescriptions', 'total_crisis'
+]
+
+def faixa_idades(df_recorte):
+    """Idade mínima e máxima do recorte (0-100 se estiver vazio)."""
+    if df_recorte.empty:
+        return 0, 100
+    return int(df_recorte['age'].min()), int(df_recorte['age'].max())
+
+def filtrar_por_idade(df_recorte, idade_min, idade_max):
+    """Pacientes com idade no intervalo, apenas com as colunas exibidas na tabela."""
+    # Contagens de registros por funcionalidade já vêm da tabela de pacientes (total_*)
+    df_idade = df_recorte[df_recorte['age'].between(idade_min, idade_max)]
+    colunas_disponiveis = [c for c in COLUNAS_EXIBICAO if c in df_idade.columns]
+    return df_idade[colunas_disponiveis].copy()
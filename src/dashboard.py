@@ -6,10 +6,16 @@ from datetime import datetime, timedelta
 from dateutil import parser
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.data_processing import carregar_json, processar_datas, filtrar_pacientes_marco_2025, DATA_LIMITE_MARCO_2025
+from utils.data_processing import iterar_pacientes_export, construir_tabelas_eventos, fontes_passos, indice_criacao, mascara_intervalo_criacao, recortar_tabelas, DATA_LIMITE_MARCO_2025
+from utils.cache import impressao_digital, impressao_recorte, memoizar
+from utils.snapshots import snapshots_disponiveis, carregar_snapshot, salvar_snapshot
+from utils.pacotes import eh_pacote, carregar_pacote, SECOES_PACOTE
+from utils.instrumentacao import Medidor, instrumentacao_ativa, tamanho_entrada
 from utils.translations import t
+from components.downloads import exportacao_completa
 from sections.metricas import mostrar_metricas
 from sections.ativos import mostrar_ativos
+from sections.engajamento import mostrar_engajamento
 from sections.idade import mostrar_idade
 from sections.crises import mostrar_crises
 from sections.funcionalidades_geral import mostrar_funcionalidades_geral
@@ -56,53 +62,249 @@ st.title(t('dashboard.title'))
 st.markdown(f"<small>{t('dashboard.subtitle')}</small>", unsafe_allow_html=True)
 st.markdown("---")
 
-uploaded_file = st.sidebar.file_uploader(t('dashboard.upload_file'), type=["json"])
+uploaded_file = st.sidebar.file_uploader(t('dashboard.upload_file'), type=["json", "zip"], help=t('dashboard.upload_file_help'))
+usar_snapshots = snapshots_disponiveis() and st.sidebar.checkbox(
+    t('dashboard.use_snapshots'), value=False, help=t('dashboard.use_snapshots_help'), key='usar_snapshots'
+)
+
+def ingerir_export(arquivo):
+    """Lê o JSON enviado e monta as tabelas de eventos de todos os pacientes (antes do recorte)."""
+    # Leitura em streaming: um paciente por vez, sem manter a árvore JSON inteira em memória
+    arquivo.seek(0)
+    pacientes = (paciente for paciente in iterar_pacientes_export(arquivo) if isinstance(paciente, dict))
+
+    # Ingestão: achatar os registros de cada paciente em tabelas colunares (datas já convertidas)
+    # As seções recebem essas tabelas e não percorrem mais os dicionários aninhados
+    tabelas = construir_tabelas_eventos(pacientes)
+    return {
+        'total_pacientes': len(tabelas['pacientes']),
+        'tabelas': tabelas
+    }
+
+def carregar_dados(arquivo, impressao, usar_snapshots):
+    """Ingestão do export, reaproveitando o snapshot local quando a opção estiver ligada."""
+    if usar_snapshots:
+        dados = carregar_snapshot(impressao)
+        if dados is not None:
+            dados['origem'] = 'snapshot'
+            return dados
+    dados = ingerir_export(arquivo)
+    dados['origem'] = 'json'
+    return dados
+
+def selecionar_coorte(indice, impressao):
+    """
+    Controle na sidebar do intervalo de criação das contas (coorte de cadastro).
+    
+    O padrão é o recorte do estudo (a partir de 01/03/2025 até o último cadastro).
+    
+    Returns:
+        Tupla (data_inicio, data_fim) em UTC; data_fim é inclusiva (fim do dia) ou None
+    """
+    if len(indice['ns']) == 0:
+        return DATA_LIMITE_MARCO_2025, None
+    limite = DATA_LIMITE_MARCO_2025.date()
+    primeira = min(pd.Timestamp(indice['ns'][0], tz='UTC').date(), limite)
+    ultima = max(pd.Timestamp(indice['ns'][-1], tz='UTC').date(), limite)
+    
+    st.sidebar.markdown("---")
+    st.sidebar.markdown(f"### 👥 {t('dashboard.cohort_title')}")
+    intervalo = st.sidebar.date_input(
+        t('dashboard.cohort_range'),
+        value=(limite, ultima),
+        min_value=primeira,
+        max_value=ultima,
+        format='DD/MM/YYYY',
+        help=t('dashboard.cohort_help'),
+        key=f'coorte_{impressao}'
+    )
+    # Enquanto o usuário escolhe o intervalo, o widget devolve só a data inicial
+    inicio = intervalo[0] if intervalo else limite
+    fim = intervalo[1] if len(intervalo) > 1 else ultima
+    return pd.Timestamp(inicio, tz='UTC'), pd.Timestamp(fim, tz='UTC') + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+
+def capturar_data_referencia(dados, impressao):
+    """
+    Data de referência (as-of) do upload, capturada uma única vez por arquivo na sessão.
+    
+    Fica no session_state, fora do cache de agregados: se a ingestão sair do cache (ou nem
+    couber no orçamento) e for refeita, a data não muda e os agregados continuam no cache.
+    Um snapshot traz a data da primeira ingestão do export, que tem prioridade.
+    """
+    chave = f'data_capturada_{impressao}'
+    if chave not in st.session_state:
+        st.session_state[chave] = dados.get('data_referencia') or pd.Timestamp.now(tz='UTC')
+    return st.session_state[chave]
+
+def selecionar_data_referencia(data_capturada, impressao):
+    """
+    Mostra na sidebar a data de referência (as-of) do upload, com a opção de substituí-la.
+    
+    A data de referência é o "hoje" de todas as análises (pacientes ativos, recordes e
+    semanas analisadas). Ela é capturada uma vez por upload (capturar_data_referencia) para
+    que os resultados não mudem a cada rerun e possam ser guardados no cache.
+    
+    Returns:
+        Timestamp UTC: a data capturada ou, se o usuário escolher outra data, o fim desse dia
+    """
+    st.sidebar.markdown("---")
+    st.sidebar.markdown(f"### 🕒 {t('dashboard.as_of_title')}")
+    st.sidebar.caption(t('dashboard.as_of_captured', data=data_capturada.strftime('%d/%m/%Y %H:%M UTC')))
+    data_escolhida = st.sidebar.date_input(
+        t('dashboard.as_of_override'),
+        value=None,
+        min_value=DATA_LIMITE_MARCO_2025.date(),
+        format='DD/MM/YYYY',
+        help=t('dashboard.as_of_help'),
+        key=f'data_referencia_{impressao}'
+    )
+    if data_escolhida is None:
+        return data_capturada
+    return pd.Timestamp(data_escolhida, tz='UTC') + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+
+def aba_aberta(aba):
+    """
+    Indica se o conteúdo da aba deve ser executado neste rerun.
+
+    Com as abas rastreando estado, só a aba selecionada tem open=True; sem rastreamento
+    (open é None) todas as abas executam, como no st.tabs tradicional.
+    """
+    return getattr(aba, 'open', None) is not False
+
+# Instrumentação opcional (?perfil=1 ou INSPIRAR_PERFIL=1): tempo, CPU e memória de cada etapa
+medidor = Medidor(instrumentacao_ativa())
 
 if uploaded_file:
     try:
-        data = carregar_json(uploaded_file)
-        if not isinstance(data, dict) or 'data' not in data or 'result' not in data['data']:
-            error_msg = t('dashboard.error_processing').format(error="Invalid structure")
-            raise ValueError(error_msg)
-        pacientes = data['data']['result']
-        df = processar_datas(pd.DataFrame(pacientes), 'createdAt')
-
-        # CRÍTICO: Filtrar pacientes criados a partir de 01/03/2025
-        # Este filtro é aplicado UMA VEZ aqui e TODAS as seções recebem dados já filtrados
-        # Garante que todos os gráficos considerem apenas contas criadas a partir de março/2025
-        pacientes_antes = len(pacientes)
-        df_filtrado = filtrar_pacientes_marco_2025(df, 'createdAt')
-        pacientes_recorte = filtrar_pacientes_marco_2025(pacientes, 'createdAt')
-        pacientes_depois = len(pacientes_recorte)
+        # Impressão digital do conteúdo: calculada uma vez por upload (file_id) e usada
+        # como chave do cache, para que os reruns não releiam nem reprocessem o JSON
+        arquivo_id = getattr(uploaded_file, 'file_id', None)
+        if arquivo_id is None or st.session_state.get('arquivo_id') != arquivo_id:
+            st.session_state['impressao_arquivo'] = impressao_digital(uploaded_file.getvalue())
+            st.session_state['arquivo_id'] = arquivo_id
+        impressao = st.session_state['impressao_arquivo']
+
+        if eh_pacote(uploaded_file):
+            # Pacote de agregados pré-calculados (tools.agregados --pacote): só exibição
+            with medidor.medir('ingestao', bytes_arquivo=getattr(uploaded_file, 'size', None)):
+                pacote = memoizar('pacote', impressao, (), lambda: carregar_pacote(uploaded_file))
+            manifesto = pacote['manifesto']
+            # Os resultados das seções que dependem dos registros de eventos vêm prontos e valem
+            # só para esta sessão; as demais são calculadas a partir do resumo por paciente.
+            # A chave dos agregados é a do próprio pacote, para que nada calculado aqui se
+            # misture no cache com um upload do export original (mesmo arquivo e coorte)
+            impressao_dados = f'pacote:{impressao}'
+            impressao_origem = manifesto['impressao_dados']
+            resultados_sessao = {nome_calculo: pacote['agregados'][secao] for secao, nome_calculo in SECOES_PACOTE.items()}
+            tabelas = {'pacientes': pacote['pacientes'], 'ultimo_evento': pacote['ultimo_evento']}
+            coorte_inicio = pd.Timestamp(manifesto['coorte_inicio'])
+            coorte_fim = pd.Timestamp(manifesto['coorte_fim']) if manifesto['coorte_fim'] else None
+            data_fim = pd.Timestamp(manifesto['data_fim'])
+            pacientes_antes = manifesto['total_pacientes_export']
+            total_fallback = manifesto['datas_fallback']
+            total_falhas = manifesto['datas_falhas']
+            origem_passos = manifesto['fontes_passos']
+            resultados_prontos = pacote['agregados']
+            origem = 'pacote'
+        else:
+            with medidor.medir('ingestao', bytes_arquivo=getattr(uploaded_file, 'size', None)):
+                dados = memoizar('ingestao', impressao, (), lambda: carregar_dados(uploaded_file, impressao, usar_snapshots))
+            data_capturada = capturar_data_referencia(dados, impressao)
+            if usar_snapshots and dados['origem'] == 'json':
+                # Também cobre o caso de a opção ser ligada depois de o arquivo já estar em memória
+                salvar_snapshot(impressao, dict(dados, data_referencia=data_capturada))
+
+            # CRÍTICO: Filtrar pacientes pela coorte de cadastro (padrão: criados a partir de 01/03/2025)
+            # Este filtro é aplicado UMA VEZ aqui e TODAS as seções recebem dados já filtrados
+            # O índice ordenado por 'createdAt' transforma cada mudança de intervalo em busca binária + fatia
+            with medidor.medir('indice_criacao', linhas_entrada=dados['total_pacientes']):
+                indice = memoizar('indice_criacao', impressao, (), lambda: indice_criacao(dados['tabelas']['pacientes']['createdAt']))
+            coorte_inicio, coorte_fim = selecionar_coorte(indice, impressao)
+            with medidor.medir('recorte', linhas_entrada=tamanho_entrada(dados['tabelas'])):
+                tabelas = memoizar('recorte', impressao, (coorte_inicio, coorte_fim), lambda: recortar_tabelas(
+                    dados['tabelas'], mascara_intervalo_criacao(indice, coorte_inicio, coorte_fim)
+                ))
+            # Impressão digital dos dados vistos pelas seções (arquivo + coorte): chave dos agregados no cache
+            impressao_dados = impressao_origem = impressao_recorte(impressao, coorte_inicio, coorte_fim)
+            # Data final = data de referência do upload (ou a escolhida na sidebar)
+            data_fim = selecionar_data_referencia(data_capturada, impressao)
+            pacientes_antes = dados['total_pacientes']
+            relatorio_datas = tabelas['relatorio_datas']
+            total_fallback = int(relatorio_datas['fallback'].sum())
+            total_falhas = int(relatorio_datas['falhas'].sum())
+            origem_passos = fontes_passos(tabelas['relatorio_passos'])
+            resultados_prontos = resultados_sessao = None
+            origem = dados['origem']
+
+        st.session_state['impressao_dados'] = impressao_dados
+        st.session_state['resultados_pacote'] = resultados_sessao
+        df_filtrado = tabelas['pacientes']
+        pacientes_depois = len(df_filtrado)
         pacientes_removidos = pacientes_antes - pacientes_depois
 
         # Informação sobre o filtro aplicado
-        st.info(f"📊 {t('dashboard.total_patients')}: {pacientes_depois} ({t('dashboard.accounts_from')})")
+        texto_coorte = t('dashboard.accounts_between',
+                         inicio=coorte_inicio.strftime('%d/%m/%Y'),
+                         fim=coorte_fim.strftime('%d/%m/%Y') if coorte_fim is not None else '...')
+        st.info(f"📊 {t('dashboard.total_patients')}: {pacientes_depois} ({texto_coorte})")
         
-        # Período de extração: data inicial fixa (01/03/2025), data final = hoje (momento do upload)
+        # Período de extração: data inicial fixa (01/03/2025), data final = data de referência
         data_inicio = pd.Timestamp('2025-03-01').tz_localize('UTC')
-        data_fim = pd.Timestamp.now(tz='UTC')
         periodo_texto = f"março/2025 - {data_fim.strftime('%d/%m/%Y')}"
         
         # Armazenar informações do período no session_state para uso nas seções
         st.session_state['periodo_texto'] = periodo_texto
         st.session_state['data_inicio'] = data_inicio
         st.session_state['data_fim'] = data_fim
+        st.session_state['fontes_passos'] = origem_passos
         
         # Card informativo do período e filtro na sidebar
         st.sidebar.markdown("---")
         st.sidebar.markdown(f"### 📅 {t('dashboard.period_extraction')}")
         st.sidebar.success(f"📊 {t('dashboard.period')}: {periodo_texto}")
-        st.sidebar.info(f"📅 {t('dashboard.data_extracted')}")
+        st.sidebar.info(f"📅 {t('dashboard.data_extracted', fim=data_fim.strftime('%d/%m/%Y'))}")
+        
+        if origem == 'snapshot':
+            st.sidebar.caption(f"⚡ {t('dashboard.snapshot_loaded')}")
+        elif origem == 'pacote':
+            gerado_em = pd.Timestamp(manifesto['gerado_em']).strftime('%d/%m/%Y %H:%M UTC')
+            st.sidebar.caption(f"📦 {t('dashboard.bundle_loaded', data=gerado_em)}")
+        
+        # Datas que não vieram no formato ISO do export (apenas se houver)
+        if total_fallback > 0 or total_falhas > 0:
+            st.sidebar.markdown("---")
+            st.sidebar.markdown(f"### 🗓️ {t('dashboard.dates_quality')}")
+            if total_fallback > 0:
+                st.sidebar.info(t('dashboard.dates_fallback', count=total_fallback))
+            if total_falhas > 0:
+                st.sidebar.warning(t('dashboard.dates_failed', count=total_falhas))
+        
+        # Exportação completa: ZIP com as tabelas de todas as seções, gerado em segundo plano
+        exportacao_completa(tabelas, data_inicio, data_fim, {
+            'impressao_arquivo': impressao,
+            'impressao_dados': impressao_origem,
+            'origem': origem,
+            'coorte_inicio': coorte_inicio.isoformat(),
+            'coorte_fim': coorte_fim.isoformat() if coorte_fim is not None else None,
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'total_pacientes_export': pacientes_antes,
+            'total_pacientes_recorte': pacientes_depois,
+            'datas_fallback': total_fallback,
+            'datas_falhas': total_falhas,
+            'fontes_passos': origem_passos,
+        }, resultados_prontos)
         
         # Log sobre o filtro aplicado (apenas se houver pacientes removidos)
         if pacientes_removidos > 0:
             st.sidebar.markdown("---")
             st.sidebar.markdown("### 🔍 Filtro de Pacientes")
-            st.sidebar.success(f"✅ **{pacientes_depois}** pacientes incluídos\n(contas criadas a partir de 01/03/2025)")
-            st.sidebar.info(f"ℹ️ **{pacientes_removidos}** pacientes excluídos\n(criados antes de 01/03/2025)")
+            st.sidebar.success(f"✅ **{pacientes_depois}** pacientes incluídos\n({texto_coorte})")
+            st.sidebar.info(f"ℹ️ **{pacientes_removidos}** pacientes excluídos\n(criados fora do intervalo selecionado)")
 
         # Criar estrutura de abas para organizar as seções
+        # Abas com estado (on_change='rerun'): a cada rerun só as seções da aba aberta executam;
+        # as demais são calculadas na primeira visita e depois servidas pelo cache (memoizar)
         tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
             t('dashboard.tabs.overview'), 
             t('dashboard.tabs.demographics'), 
@@ -110,39 +312,48 @@ if uploaded_file:
             t('dashboard.tabs.diaries'), 
             t('dashboard.tabs.advanced'),
             t('dashboard.tabs.details')
-        ])
+        ], key='aba_ativa', on_change='rerun')
+        
+        if aba_aberta(tab1):
+            with tab1:
+                st.markdown(f"### {t('dashboard.tab_titles.overview')}")
+                medidor.executar(mostrar_metricas, df_filtrado)
+                medidor.executar(mostrar_ativos, tabelas)
+                medidor.executar(mostrar_engajamento, tabelas)
+                medidor.executar(mostrar_idade, df_filtrado)
         
-        with tab1:
-            st.markdown(f"### {t('dashboard.tab_titles.overview')}")
-            mostrar_metricas(df_filtrado)
-            mostrar_ativos(df_filtrado)
-            mostrar_idade(df_filtrado)
+        if aba_aberta(tab2):
+            with tab2:
+                st.markdown(f"### {t('dashboard.tab_titles.demographics')}")
+                medidor.executar(mostrar_barplot_metricas, df_filtrado)
+                medidor.executar(mostrar_crises, tabelas)
         
-        with tab2:
-            st.markdown(f"### {t('dashboard.tab_titles.demographics')}")
-            mostrar_barplot_metricas(df_filtrado, pacientes_recorte)
-            mostrar_crises(pacientes_recorte)
+        if aba_aberta(tab3):
+            with tab3:
+                st.markdown(f"### {t('dashboard.tab_titles.medications')}")
+                medidor.executar(mostrar_prescricoes_semanais, tabelas)
+                medidor.executar(mostrar_status_acq, tabelas)
         
-        with tab3:
-            st.markdown(f"### {t('dashboard.tab_titles.medications')}")
-            mostrar_prescricoes_semanais(pacientes_recorte)
-            mostrar_status_acq(pacientes_recorte)
+        if aba_aberta(tab4):
+            with tab4:
+                st.markdown(f"### {t('dashboard.tab_titles.diaries')}")
+                medidor.executar(mostrar_diarios_semanais, tabelas)
+                medidor.executar(mostrar_atividades_semanais, tabelas)
+                medidor.executar(mostrar_recordes, tabelas)
         
-        with tab4:
-            st.markdown(f"### {t('dashboard.tab_titles.diaries')}")
-            mostrar_diarios_semanais(pacientes_recorte)
-            mostrar_atividades_semanais(pacientes_recorte)
-            mostrar_recordes(pacientes_recorte)
+        if aba_aberta(tab5):
+            with tab5:
+                st.markdown(f"### {t('dashboard.tab_titles.advanced')}")
+                medidor.executar(mostrar_funcionalidades_geral, df_filtrado)
+                medidor.executar(mostrar_funcionalidades_sexo, df_filtrado)
+                medidor.executar(mostrar_mapa_calor, df_filtrado)
         
-        with tab5:
-            st.markdown(f"### {t('dashboard.tab_titles.advanced')}")
-            mostrar_funcionalidades_geral(df_filtrado)
-            mostrar_funcionalidades_sexo(df_filtrado)
-            mostrar_mapa_calor(df_filtrado)
+        if aba_aberta(tab6):
+            with tab6:
+                st.markdown(f"### {t('dashboard.tab_titles.details')}")
+                medidor.executar(mostrar_tabelas, df_filtrado)
         
-        with tab6:
-            st.markdown(f"### {t('dashboard.tab_titles.details')}")
-            mostrar_tabelas(df_filtrado, pacientes_recorte)
+        medidor.mostrar_painel(impressao=impressao, pacientes_recorte=pacientes_depois)
     except Exception as e:
         error_msg = t('dashboard.error_processing', error=str(e))
         st.error(error_msg)
@@ -1,38 +1,29 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+from compute.barplot_metricas import preparar_metricas, calcular_distribuicao
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS, SECONDARY_DARKER, PRIMARY_DARKER
 from utils.translations import t
+from components.downloads import botao_download
 
-def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
+def mostrar_barplot_metricas(df_recorte):
     st.subheader(t('sections.barplot_metricas.title'))
     
-    metricas_numericas = {
-        'Age': 'age',
-        'Weight (kg)': 'weight',
-        'Height (m)': 'height',
-    }
-    
-    df_recorte = df_recorte.copy()  # Evitar SettingWithCopyWarning
-    
-    if 'imc' not in df_recorte.columns:
-        df_recorte['imc'] = df_recorte.apply(lambda row: row['weight'] / (row['height'] ** 2) if row['height'] and row['weight'] else np.nan, axis=1)
-    metricas_numericas['BMI'] = 'imc'
+    # Recorte com IMC e métricas disponíveis
+    df_metricas, metricas_numericas = memoizar(
+        'barplot_metricas', st.session_state.get('impressao_dados'), (), lambda: preparar_metricas(df_recorte)
+    )
     
-    # Removido ACQ inicial - não adequado para barplot
+    _distribuicao_metrica(df_metricas, metricas_numericas)
     
-    for col in ['media_presc_semana', 'media_diario_semana', 'media_atividade_semana', 'percentual_acq']:
-        if col in df_recorte.columns:
-            nome = {
-                'media_presc_semana': 'Average medications/week',
-                'media_diario_semana': 'Average diaries/week',
-                'media_atividade_semana': 'Average activities/week',
-                'percentual_acq': '% weeks with ACQ filled',
-            }[col]
-            metricas_numericas[nome] = col
+    # Pirâmide etária removida
     
+    st.markdown('---')
+
+@st.fragment
+def _distribuicao_metrica(df_metricas, metricas_numericas):
+    """Seletor de métrica e distribuição; trocar a métrica reexecuta só este fragmento."""
     metrica_escolhida = st.selectbox(
         t('sections.barplot_metricas.select_metric'),
         list(metricas_numericas.keys()),
@@ -40,14 +31,19 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
     )
     
     coluna = metricas_numericas[metrica_escolhida]
-    valores_validos = df_recorte[coluna].replace(0, np.nan).dropna()
+    distribuicao = memoizar(
+        'distribuicao_metrica', st.session_state.get('impressao_dados'), (coluna, metrica_escolhida),
+        lambda: calcular_distribuicao(df_metricas, coluna, metrica_escolhida)
+    )
+    valores_validos = distribuicao['valores']
     
     # Estatísticas descritivas
+    estatisticas = distribuicao['estatisticas']
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric(t('sections.barplot_metricas.mean'), f'{valores_validos.mean():.2f}')
-    col2.metric(t('sections.barplot_metricas.std_deviation'), f'{valores_validos.std():.2f}')
-    col3.metric(t('sections.barplot_metricas.median'), f'{valores_validos.median():.2f}')
-    col4.metric(t('sections.barplot_metricas.iqr'), f'{valores_validos.quantile(0.25):.2f} - {valores_validos.quantile(0.75):.2f}')
+    col1.metric(t('sections.barplot_metricas.mean'), f"{estatisticas['media']:.2f}")
+    col2.metric(t('sections.barplot_metricas.std_deviation'), f"{estatisticas['desvio']:.2f}")
+    col3.metric(t('sections.barplot_metricas.median'), f"{estatisticas['mediana']:.2f}")
+    col4.metric(t('sections.barplot_metricas.iqr'), f"{estatisticas['q1']:.2f} - {estatisticas['q3']:.2f}")
     
     st.markdown(f"### {t('sections.barplot_metricas.percentage_distribution', metric=metrica_escolhida)}")
     
@@ -55,49 +51,8 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
     col_grafico, col_tabela = st.columns([3, 2])
     
     with col_grafico:
-        # Criar faixas/intervalos para a métrica
-        def criar_faixas(valores, metrica_nome):
-            """Cria faixas apropriadas para cada tipo de métrica"""
-            valores_limpos = valores.dropna()
-            if len(valores_limpos) == 0:
-                return pd.DataFrame()
-            
-            if metrica_nome == 'Age':
-                # Faixas de idade: 0-20, 21-30, 31-40, 41-50, 51-60, 61-70, 71+
-                bins = [0, 20, 30, 40, 50, 60, 70, 100]
-                labels = ['0-20', '21-30', '31-40', '41-50', '51-60', '61-70', '71+']
-            elif metrica_nome == 'Weight (kg)':
-                # Faixas de peso: 0-50, 51-60, 61-70, 71-80, 81-90, 91-100, 101+
-                bins = [0, 50, 60, 70, 80, 90, 100, 200]
-                labels = ['0-50kg', '51-60kg', '61-70kg', '71-80kg', '81-90kg', '91-100kg', '101+kg']
-            elif metrica_nome == 'Height (m)':
-                # Faixas de altura: 1.40-1.50, 1.51-1.60, 1.61-1.70, 1.71-1.80, 1.81-1.90, 1.91+
-                bins = [1.40, 1.50, 1.60, 1.70, 1.80, 1.90, 2.20]
-                labels = ['1.40-1.50m', '1.51-1.60m', '1.61-1.70m', '1.71-1.80m', '1.81-1.90m', '1.91+m']
-            elif metrica_nome == 'BMI':
-                # Faixas de IMC: <18.5, 18.5-24.9, 25-29.9, 30-34.9, 35-39.9, 40+
-                bins = [0, 18.5, 25, 30, 35, 40, 100]
-                labels = ['<18.5', '18.5-24.9', '25-29.9', '30-34.9', '35-39.9', '40+']
-            # Removido ACQ - não adequado para barplot
-            else:
-                # Faixas genéricas baseadas em quartis
-                q25, q50, q75 = valores_limpos.quantile([0.25, 0.5, 0.75])
-                bins = [valores_limpos.min(), q25, q50, q75, valores_limpos.max()]
-                labels = [f'Q1', f'Q2', f'Q3', f'Q4']
-            
-            # Criar faixas
-            faixas = pd.cut(valores_limpos, bins=bins, labels=labels, include_lowest=True)
-            contagem = faixas.value_counts().sort_index()
-            percentual = (contagem / len(valores_limpos) * 100).round(1)
-            
-            return pd.DataFrame({
-                'Range': contagem.index,
-                'Count': contagem.values,
-                'Percentage': percentual.values
-            })
-        
-        # Criar dados para o gráfico de barras
-        df_faixas = criar_faixas(valores_validos, metrica_escolhida)
+        # Distribuição por faixas/intervalos da métrica
+        df_faixas = distribuicao['faixas']
         
         if not df_faixas.empty:
             # Gráfico de barras com paleta escura e contorno
@@ -136,7 +91,7 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
                 )
             )
             
-            st.plotly_chart(fig_bar, use_container_width=True, height=400)
+            st.plotly_chart(fig_bar, width='stretch', height=400)
         else:
             st.warning(t('sections.barplot_metricas.no_data'))
     
@@ -148,7 +103,7 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
             # Exibir tabela de distribuição
             st.dataframe(
                 df_faixas,
-                use_container_width=True,
+                width='stretch',
                 column_config={
                     "Range": st.column_config.TextColumn("Range", width="medium"),
                     "Count": st.column_config.NumberColumn("Patients", width="small"),
@@ -163,12 +118,12 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
             st.markdown(f"• Least common range: {df_faixas.loc[df_faixas['Percentage'].idxmin(), 'Range']} ({df_faixas['Percentage'].min():.1f}%)")
             
             # Botão de download da distribuição
-            csv_faixas = df_faixas.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="📥 Download Distribution (CSV)",
-                data=csv_faixas,
-                file_name=f"distribuicao_{metrica_escolhida.replace(' ', '_')}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            botao_download(
+                "📥 Download Distribution (CSV)",
+                df_faixas,
+                f"distribuicao_{metrica_escolhida.replace(' ', '_')}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+                'distribuicao',
+                parametros=(metrica_escolhida,)
             )
         else:
             st.warning("Insufficient data to show distribution.")
@@ -178,45 +133,17 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
         
         # Tabela detalhada com dados individuais (colapsável)
         with st.expander("View individual patient data"):
-            # Criar DataFrame para a tabela detalhada
-            colunas_tabela = [coluna, 'gender', 'id']
-            if coluna != 'age':
-                colunas_tabela.append('age')
-            
-            df_tabela = df_recorte[colunas_tabela].copy()
-            df_tabela = df_tabela.dropna(subset=[coluna])
-            
-            # Ordenar por valor ANTES da renomeação das colunas
-            df_tabela = df_tabela.sort_values(coluna, ascending=False)
-            
-            # Renomear colunas para melhor legibilidade
-            df_tabela = df_tabela.rename(columns={
-                coluna: 'Value',
-                'gender': 'Gender',
-                'id': 'Patient ID'
-            })
-            
-            # Adicionar coluna de idade se não for a métrica selecionada
-            if coluna != 'age':
-                df_tabela = df_tabela.rename(columns={'age': 'Age'})
-            else:
-                # Se a métrica selecionada é 'age', renomear para 'Age' também
-                df_tabela = df_tabela.rename(columns={'Value': 'Age'})
-            
-            # Mapear códigos de gênero
+            # Valores individuais, com o sexo no idioma atual
+            df_tabela = distribuicao['individual'].copy()
             df_tabela['Gender'] = df_tabela['Gender'].map({
                 'male': t('sections.ativos.male'),
                 'female': t('sections.ativos.female')
             })
             
-            # Formatar valores numéricos
-            if 'Age' in df_tabela.columns:
-                df_tabela['Age'] = df_tabela['Age'].astype(int)
-            
             # Exibir tabela
             st.dataframe(
                 df_tabela,
-                use_container_width=True,
+                width='stretch',
                 column_config={
                     "Patient ID": st.column_config.TextColumn("Patient ID", width="medium"),
                     "Value": st.column_config.NumberColumn("Value", format="%.2f", width="medium"),
@@ -226,14 +153,10 @@ def mostrar_barplot_metricas(df_recorte, pacientes_recorte):
             )
             
             # Botão de download dos dados individuais
-            csv = df_tabela.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="📥 Download Individual Data (CSV)",
-                data=csv,
-                file_name=f"dados_individuais_{metrica_escolhida.replace(' ', '_')}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            botao_download(
+                "📥 Download Individual Data (CSV)",
+                df_tabela,
+                f"dados_individuais_{metrica_escolhida.replace(' ', '_')}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+                'dados_individuais',
+                parametros=(metrica_escolhida,)
             )
-    
-    # Pirâmide etária removida
-    
-    st.markdown('---') 
\ No newline at end of file
@@ -1,20 +1,25 @@
 import streamlit as st
 import pandas as pd
-from dateutil import parser
-from collections import Counter
 import plotly.express as px
-import numpy as np
+from compute.crises import calcular_crises, FAIXAS_DURACAO
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS
 from utils.translations import t
+from components.downloads import botao_download
 
-def mostrar_crises(pacientes_recorte):
+def mostrar_crises(tabelas):
     st.info(t('sections.crises.description'))
     
+    dados = memoizar(
+        'crises', st.session_state.get('impressao_dados'), (),
+        lambda: calcular_crises(tabelas),
+        prontos=st.session_state.get('resultados_pacote')
+    )
+    
     # Análise geral de crises
-    total_crises = sum([len(p.get('crisis', [])) for p in pacientes_recorte])
-    total_pacientes = len(pacientes_recorte)
-    total_pacientes_com_crise = sum([1 for p in pacientes_recorte if len(p.get('crisis', [])) > 0])
-    taxa_pacientes_crise = (total_pacientes_com_crise / total_pacientes * 100) if total_pacientes > 0 else 0
+    total_crises = dados['total_crises']
+    total_pacientes_com_crise = dados['total_pacientes_com_crise']
+    taxa_pacientes_crise = dados['taxa_pacientes_crise']
     
     # Métricas principais
     col1, col2, col3, col4 = st.columns(4)
@@ -33,68 +38,20 @@ def mostrar_crises(pacientes_recorte):
         st.markdown('---')
         return
     
-    # Processamento detalhado das crises
-    dados_crises = []
-    medicamentos_crises = []
-    
-    for paciente in pacientes_recorte:
-        gender_paciente = paciente.get('gender', '')
-        idade_paciente = paciente.get('age', 0)
-        
-        for crise in paciente.get('crisis', []):
-            try:
-                # Calcular duração da crise
-                ini = parser.parse(crise.get('initialUsageDate'))
-                fim = parser.parse(crise.get('finalUsageDate'))
-                duracao = (fim - ini).days
-                
-                # Dados da crise
-                dados_crises.append({
-                    'paciente_id': paciente.get('id', 'N/A'),
-                    'gender': gender_paciente,
-                    'idade': idade_paciente,
-                    'duracao': duracao,
-                    'data_inicio': ini,
-                    'data_fim': fim
-                })
-                
-                # Medicamentos utilizados durante a crise
-                medicamentos = crise.get('medications', [])
-                for med in medicamentos:
-                    nome_med = med.get('name', 'Unspecified medication')
-                    medicamentos_crises.append({
-                        'paciente_id': paciente.get('id', 'N/A'),
-                        'gender': gender_paciente,
-                        'duracao_crise': duracao,
-                        'medicamento': nome_med
-                    })
-            except Exception as e:
-                continue
-    
-    if not dados_crises:
+    if dados['crises'].empty:
         st.warning(t('sections.crises.unable_to_process'))
         st.markdown('---')
         return
     
-    df_crises = pd.DataFrame(dados_crises)
-    df_medicamentos = pd.DataFrame(medicamentos_crises) if medicamentos_crises else pd.DataFrame()
+    # Rótulos traduzidos das faixas de duração
+    labels = [t(f'sections.crises.duration_ranges.{faixa}') for faixa in FAIXAS_DURACAO]
+    df_crises = dados['crises'].copy()
+    df_crises['faixa_duracao'] = df_crises['faixa_duracao'].cat.rename_categories(labels)
     
     # --- SEÇÃO 1: Distribuição por Duração ---
     st.markdown("---")
     st.subheader(t('sections.crises.distribution_by_duration'))
     
-    # Definir faixas de duração
-    bins = [-1, 2, 5, 10, 15, 30, float('inf')]
-    labels = [
-        t('sections.crises.duration_ranges.1_2'),
-        t('sections.crises.duration_ranges.3_5'),
-        t('sections.crises.duration_ranges.6_10'),
-        t('sections.crises.duration_ranges.11_15'),
-        t('sections.crises.duration_ranges.16_30'),
-        t('sections.crises.duration_ranges.more_30')
-    ]
-    df_crises['faixa_duracao'] = pd.cut(df_crises['duracao'], bins=bins, labels=labels)
-    
     col_grafico1, col_stats1 = st.columns([2, 1])
     
     with col_grafico1:
@@ -115,20 +72,16 @@ def mostrar_crises(pacientes_recorte):
             xaxis_title=t('charts.labels.number_of_crises'),
             yaxis_title=t('charts.labels.duration_range')
         )
-        st.plotly_chart(fig_duracao, use_container_width=True, height=400)
+        st.plotly_chart(fig_duracao, width='stretch', height=400)
     
     with col_stats1:
         st.markdown(f"**{t('sections.crises.duration_statistics')}**")
         
-        duracao_media = df_crises['duracao'].mean()
-        duracao_mediana = df_crises['duracao'].median()
-        duracao_max = df_crises['duracao'].max()
-        duracao_min = df_crises['duracao'].min()
-        
-        st.metric(t('sections.crises.average_duration'), f"{duracao_media:.1f} {t('sections.crises.days')}")
-        st.metric(t('sections.crises.median'), f"{duracao_mediana:.0f} {t('sections.crises.days')}")
-        st.metric(t('sections.crises.maximum_duration'), f"{duracao_max} {t('sections.crises.days')}")
-        st.metric(t('sections.crises.minimum_duration'), f"{duracao_min} {t('sections.crises.days')}")
+        duracao = dados['duracao']
+        st.metric(t('sections.crises.average_duration'), f"{duracao['media']:.1f} {t('sections.crises.days')}")
+        st.metric(t('sections.crises.median'), f"{duracao['mediana']:.0f} {t('sections.crises.days')}")
+        st.metric(t('sections.crises.maximum_duration'), f"{duracao['max']} {t('sections.crises.days')}")
+        st.metric(t('sections.crises.minimum_duration'), f"{duracao['min']} {t('sections.crises.days')}")
         
         st.markdown(f"**{t('sections.crises.distribution_by_range')}**")
         for faixa, count in faixas_count.items():
@@ -173,32 +126,26 @@ def mostrar_crises(pacientes_recorte):
                 legend_title=t('tables.sex'),
                 xaxis=dict(tickangle=45)
             )
-            st.plotly_chart(fig_sexo_duracao, use_container_width=True, height=400)
+            st.plotly_chart(fig_sexo_duracao, width='stretch', height=400)
         
         with col_sexo_stats:
             st.markdown(f"**{t('sections.crises.statistics_by_sex')}**")
             
             # Análise por sexo
-            for sexo_key in [t('sections.ativos.male'), t('sections.ativos.female')]:
-                dados_sexo = df_crises_gender[df_crises_gender['Sexo'] == sexo_key]
+            for sexo in ['male', 'female']:
+                dados_sexo = dados['por_sexo'][sexo]
                 
-                if not dados_sexo.empty:
-                    num_crises = len(dados_sexo)
-                    duracao_media_sexo = dados_sexo['duracao'].mean()
-                    
-                    st.markdown(f"**{sexo_key}:**")
-                    st.markdown(f"• {t('sections.crises.crises')}: {num_crises}")
-                    st.markdown(f"• {t('sections.crises.average_duration_sex')}: {duracao_media_sexo:.1f} {t('sections.crises.days')}")
-                    
-                    # Pacientes únicos por sexo
-                    pacientes_unicos = dados_sexo['paciente_id'].nunique()
-                    st.markdown(f"• {t('sections.crises.patients')}: {pacientes_unicos}")
+                if dados_sexo is not None:
+                    st.markdown(f"**{t(f'sections.ativos.{sexo}')}:**")
+                    st.markdown(f"• {t('sections.crises.crises')}: {dados_sexo['crises']}")
+                    st.markdown(f"• {t('sections.crises.average_duration_sex')}: {dados_sexo['duracao_media']:.1f} {t('sections.crises.days')}")
+                    st.markdown(f"• {t('sections.crises.patients')}: {dados_sexo['pacientes']}")
                     st.markdown("---")
             
             # Comparação geral
             st.markdown(f"**{t('sections.crises.comparison')}**")
-            crises_masc = len(df_crises_gender[df_crises_gender['Sexo'] == t('sections.ativos.male')])
-            crises_fem = len(df_crises_gender[df_crises_gender['Sexo'] == t('sections.ativos.female')])
+            crises_masc = dados['por_sexo']['male']['crises'] if dados['por_sexo']['male'] else 0
+            crises_fem = dados['por_sexo']['female']['crises'] if dados['por_sexo']['female'] else 0
             total_crises_sexo = crises_masc + crises_fem
             
             if total_crises_sexo > 0:
@@ -234,7 +181,7 @@ def mostrar_crises(pacientes_recorte):
     
     st.dataframe(
         df_exibicao,
-        use_container_width=True,
+        width='stretch',
         column_config={
             t('tables.patient_id'): st.column_config.TextColumn(t('tables.patient_id'), width="medium"),
             t('tables.sex'): st.column_config.TextColumn(t('tables.sex'), width="small"),
@@ -246,13 +193,13 @@ def mostrar_crises(pacientes_recorte):
         }
     )
     
-    # Download dos dados completos
-    csv_crises = df_exibicao.to_csv(index=False, encoding='utf-8-sig')
-    st.download_button(
-        label=t('sections.crises.download_complete'),
-        data=csv_crises,
-        file_name=f"crises_detalhadas_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv"
+    # Download dos dados completos (gerado só no clique)
+    botao_download(
+        t('sections.crises.download_complete'),
+        df_exibicao,
+        f"crises_detalhadas_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+        'crises_detalhadas',
+        parquet=True
     )
     
     st.markdown('---') 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from compute.engajamento import calcular_engajamento
+from utils.atividade_diaria import construir_mapa_atividade, pacientes_ativos_intervalo
+from utils.cache import memoizar
+from utils.colors import CHART_COLORS
+from utils.translations import t
+from components.downloads import botao_download
+
+def mostrar_engajamento(tabelas):
+    st.subheader(t('sections.engajamento.title'))
+    st.markdown(t('sections.engajamento.description'))
+
+    # Período fixo de extração dos dados
+    data_inicio = pd.Timestamp('2025-03-01').tz_localize('UTC')
+    data_fim = st.session_state.get('data_fim', pd.Timestamp.now(tz='UTC'))
+    impressao = st.session_state.get('impressao_dados')
+
+    def mapa():
+        # Bitmaps diários por funcionalidade: montados uma vez por recorte e período
+        return memoizar(
+            'mapa_atividade', impressao, (data_inicio, data_fim.normalize()),
+            lambda: construir_mapa_atividade(tabelas, data_inicio, data_fim)
+        )
+
+    # Curvas de todas as funcionalidades (num pacote, vêm prontas)
+    curvas = memoizar(
+        'engajamento', impressao, (data_inicio, data_fim.normalize()),
+        lambda: calcular_engajamento(mapa()),
+        prontos=st.session_state.get('resultados_pacote')
+    )
+    _curvas_engajamento(curvas, mapa if 'diarios' in tabelas else None, data_inicio, data_fim)
+    st.markdown('---')
+
+@st.fragment
+def _curvas_engajamento(curvas, mapa, data_inicio, data_fim):
+    """Escolha da funcionalidade, curvas e contagem por intervalo; só este fragmento reexecuta."""
+    funcionalidade = st.selectbox(
+        t('sections.engajamento.feature'),
+        list(curvas),
+        format_func=lambda nome: t(f'sections.engajamento.features.{nome}'),
+        help=t('sections.engajamento.feature_help')
+    )
+    df_curva = curvas[funcionalidade]
+    if df_curva.empty:
+        return
+
+    ultimo = df_curva.iloc[-1]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(t('sections.engajamento.dau'), int(ultimo['DAU']))
+    col2.metric(t('sections.engajamento.wau'), int(ultimo['WAU']))
+    col3.metric(t('sections.engajamento.mau'), int(ultimo['MAU']))
+    col4.metric(t('sections.engajamento.stickiness_average'), f"{df_curva['Stickiness'].mean():.1f}%")
+
+    nomes_curvas = {'DAU': t('sections.engajamento.dau'), 'WAU': t('sections.engajamento.wau'), 'MAU': t('sections.engajamento.mau')}
+    df_linhas = df_curva.melt(id_vars='Date', value_vars=list(nomes_curvas), var_name='Curve', value_name='Users')
+    df_linhas['Curve'] = df_linhas['Curve'].map(nomes_curvas)
+    fig_curvas = px.line(
+        df_linhas,
+        x='Date',
+        y='Users',
+        color='Curve',
+        title=t('sections.engajamento.curves_title'),
+        color_discrete_sequence=[CHART_COLORS[2], CHART_COLORS[3], CHART_COLORS[0]],
+        labels={'Date': t('sections.engajamento.date'), 'Users': t('sections.engajamento.users'), 'Curve': ''}
+    )
+    fig_curvas.update_layout(
+        height=400,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig_curvas, width='stretch', height=400)
+
+    fig_stickiness = px.line(
+        df_curva,
+        x='Date',
+        y='Stickiness',
+        title=t('sections.engajamento.stickiness_title'),
+        color_discrete_sequence=[CHART_COLORS[4]],
+        labels={'Date': t('sections.engajamento.date'), 'Stickiness': t('sections.engajamento.stickiness')}
+    )
+    fig_stickiness.update_layout(
+        height=300,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig_stickiness, width='stretch', height=300)
+
+    botao_download(
+        t('sections.engajamento.download_csv'),
+        df_curva.assign(Date=df_curva['Date'].dt.strftime('%Y-%m-%d')),
+        f"engajamento_{funcionalidade}_{data_fim.strftime('%Y%m%d')}",
+        'engajamento',
+        parametros=(funcionalidade,)
+    )
+
+    # Pacientes distintos num intervalo livre: união dos bitmaps dos dias
+    st.markdown(f"**{t('sections.engajamento.range_title')}**")
+    if mapa is None:
+        # Pacote de agregados: os bitmaps precisam dos registros de cada paciente
+        st.info(t('sections.engajamento.range_unavailable'))
+        return
+    intervalo = st.date_input(
+        t('sections.engajamento.range_label'),
+        value=(max(data_inicio, data_fim - pd.Timedelta(days=29)).date(), data_fim.date()),
+        min_value=data_inicio.date(),
+        max_value=data_fim.date(),
+        help=t('sections.engajamento.range_help')
+    )
+    if len(intervalo) != 2:
+        # Intervalo ainda sendo escolhido (só a primeira data)
+        return
+    inicio, fim = (pd.Timestamp(dia, tz='UTC') for dia in intervalo)
+    funcionalidades = None if funcionalidade == 'todas' else [funcionalidade]
+    ativos = pacientes_ativos_intervalo(mapa(), inicio, fim, funcionalidades)
+    st.metric(t('sections.engajamento.range_result'), int(ativos.sum()))
@@ -1,9 +1,11 @@
 import streamlit as st
 import plotly.express as px
-import numpy as np
 import pandas as pd
+from compute.funcionalidades_geral import calcular_funcionalidades_geral
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS
 from utils.translations import t
+from components.downloads import botao_download
 
 def mostrar_funcionalidades_geral(df_recorte):
     st.markdown(t('sections.funcionalidades_geral.description'))
@@ -12,18 +14,12 @@ def mostrar_funcionalidades_geral(df_recorte):
     st.subheader(t('sections.funcionalidades_geral.distribution_title'))
     st.info(t('sections.funcionalidades_geral.distribution_info'))
     
-    def conta_funcionalidades(row):
-        return sum([
-            isinstance(row['symptomDiaries'], list) and len(row['symptomDiaries']) > 0,
-            isinstance(row['acqs'], list) and len(row['acqs']) > 0,
-            isinstance(row['activityLogs'], list) and len(row['activityLogs']) > 0,
-            isinstance(row['prescriptions'], list) and len(row['prescriptions']) > 0,
-            isinstance(row['crisis'], list) and len(row['crisis']) > 0
-        ])
-    
-    df_recorte = df_recorte.copy()  # Evitar SettingWithCopyWarning
-    df_recorte['n_funcionalidades'] = df_recorte.apply(conta_funcionalidades, axis=1)
-    dist_funcionalidades = df_recorte['n_funcionalidades'].value_counts().sort_index()
+    dados = memoizar(
+        'funcionalidades_geral', st.session_state.get('impressao_dados'), (),
+        lambda: calcular_funcionalidades_geral(df_recorte)
+    )
+    dist_funcionalidades = dados['distribuicao']
+    total_pacientes = dados['total_pacientes']
     
     # Layout lado a lado: gráfico e estatísticas
     col_grafico, col_stats = st.columns([2, 1])
@@ -42,36 +38,27 @@ def mostrar_funcionalidades_geral(df_recorte):
             xaxis_title=t('sections.funcionalidades_geral.number_of_features'),
             yaxis_title=t('sections.funcionalidades_geral.number_of_patients')
         )
-        st.plotly_chart(fig_func_count, use_container_width=True, height=400)
+        st.plotly_chart(fig_func_count, width='stretch', height=400)
     
     with col_stats:
         st.markdown(f"**{t('sections.funcionalidades_geral.usage_statistics')}**")
         
-        # Calcular estatísticas
-        media_func = df_recorte['n_funcionalidades'].mean()
-        mediana_func = df_recorte['n_funcionalidades'].median()
-        moda_func = df_recorte['n_funcionalidades'].mode().iloc[0] if not df_recorte['n_funcionalidades'].mode().empty else 0
-        
-        st.metric(t('sections.funcionalidades_geral.average_features'), f"{media_func:.1f}")
-        st.metric(t('sections.funcionalidades_geral.median'), f"{mediana_func:.0f}")
-        st.metric(t('sections.funcionalidades_geral.mode_most_common'), f"{moda_func:.0f}")
+        st.metric(t('sections.funcionalidades_geral.average_features'), f"{dados['media']:.1f}")
+        st.metric(t('sections.funcionalidades_geral.median'), f"{dados['mediana']:.0f}")
+        st.metric(t('sections.funcionalidades_geral.mode_most_common'), f"{dados['moda']:.0f}")
         
         # Distribuição percentual
         st.markdown(f"**{t('sections.funcionalidades_geral.distribution')}**")
         for n_func, count in dist_funcionalidades.items():
-            perc = (count / len(df_recorte)) * 100
+            perc = (count / total_pacientes) * 100
             st.markdown(f"• **{n_func} {t('sections.funcionalidades_geral.features')}:** {count} {t('sections.funcionalidades_geral.patients')} ({perc:.1f}%)")
         
         # Pacientes ativos vs inativos
-        pacientes_ativos = len(df_recorte[df_recorte['n_funcionalidades'] > 0])
-        pacientes_inativos = len(df_recorte[df_recorte['n_funcionalidades'] == 0])
-        
         st.markdown("---")
         st.markdown(f"**{t('sections.funcionalidades_geral.general_summary')}**")
-        st.markdown(f"• **{t('sections.funcionalidades_geral.active')}:** {pacientes_ativos} {t('sections.funcionalidades_geral.patients')}")
-        st.markdown(f"• **{t('sections.funcionalidades_geral.inactive')}:** {pacientes_inativos} {t('sections.funcionalidades_geral.patients')}")
-        taxa_ativacao = (pacientes_ativos / len(df_recorte)) * 100 if len(df_recorte) > 0 else 0
-        st.markdown(f"• **{t('sections.funcionalidades_geral.activation_rate')}:** {taxa_ativacao:.1f}%")
+        st.markdown(f"• **{t('sections.funcionalidades_geral.active')}:** {dados['pacientes_ativos']} {t('sections.funcionalidades_geral.patients')}")
+        st.markdown(f"• **{t('sections.funcionalidades_geral.inactive')}:** {dados['pacientes_inativos']} {t('sections.funcionalidades_geral.patients')}")
+        st.markdown(f"• **{t('sections.funcionalidades_geral.activation_rate')}:** {dados['taxa_ativacao']:.1f}%")
     
     st.markdown('---')
 
@@ -79,22 +66,13 @@ def mostrar_funcionalidades_geral(df_recorte):
     st.subheader(t('sections.funcionalidades_geral.most_used_title'))
     st.info(t('sections.funcionalidades_geral.most_used_info'))
     
-    # Calcular uso de cada funcionalidade
-    funcionalidades = {
-        'Symptom Diaries': df_recorte['symptomDiaries'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False).sum(),
-        'ACQ (Asthma Control)': df_recorte['acqs'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False).sum(),
-        'Physical Activities': df_recorte['activityLogs'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False).sum(),
-        'Medications': df_recorte['prescriptions'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False).sum(),
-        'Crisis Records': df_recorte['crisis'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False).sum()
-    }
+    # Funcionalidades ordenadas por uso
+    func_ordenadas = dados['uso']
     
     # Layout lado a lado: gráfico e tabela
     col_ranking, col_tabela = st.columns([2, 1])
     
     with col_ranking:
-        # Ordenar funcionalidades por uso
-        func_ordenadas = dict(sorted(funcionalidades.items(), key=lambda x: x[1], reverse=True))
-        
         fig_funcionalidades = px.bar(
             x=list(func_ordenadas.values()),
             y=list(func_ordenadas.keys()),
@@ -110,29 +88,17 @@ def mostrar_funcionalidades_geral(df_recorte):
             yaxis_title="Features",
             showlegend=False
         )
-        st.plotly_chart(fig_funcionalidades, use_container_width=True, height=400)
+        st.plotly_chart(fig_funcionalidades, width='stretch', height=400)
     
     with col_tabela:
         st.markdown("**Detailed Data:**")
         
-        # Criar tabela com ranking
-        tabela_ranking = []
-        total_pacientes = len(df_recorte)
-        
-        for i, (func_nome, usuarios) in enumerate(func_ordenadas.items(), 1):
-            taxa_uso = (usuarios / total_pacientes) * 100 if total_pacientes > 0 else 0
-            tabela_ranking.append({
-                'Position': f"{i}",
-                'Feature': func_nome,
-                'Users': usuarios,
-                'Usage Rate': f"{taxa_uso:.1f}%"
-            })
-        
-        df_ranking = pd.DataFrame(tabela_ranking)
+        # Tabela com ranking
+        df_ranking = dados['ranking']
         
         st.dataframe(
             df_ranking,
-            use_container_width=True,
+            width='stretch',
             column_config={
                 "Position": st.column_config.TextColumn("Pos.", width="small"),
                 "Feature": st.column_config.TextColumn("Feature", width="large"),
@@ -159,12 +125,11 @@ def mostrar_funcionalidades_geral(df_recorte):
             st.markdown(f"• **Difference:** {diferenca:.1f}%")
         
         # Botão de download
-        csv_ranking = df_ranking.to_csv(index=False, encoding='utf-8-sig')
-        st.download_button(
-            label="📥 Download Ranking (CSV)",
-            data=csv_ranking,
-            file_name=f"ranking_funcionalidades_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
+        botao_download(
+            "📥 Download Ranking (CSV)",
+            df_ranking,
+            f"ranking_funcionalidades_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+            'ranking_funcionalidades'
         )
     
     st.markdown('---')
@@ -173,9 +138,9 @@ def mostrar_funcionalidades_geral(df_recorte):
     st.subheader('General Distribution by Gender')
     st.markdown('Summary view of patient distribution by gender.')
     
-    if 'gender' in df_recorte.columns:
-        # Calcular distribuição por gênero
-        gender_counts = df_recorte['gender'].value_counts(dropna=False)
+    if dados['contagem_sexo'] is not None:
+        # Distribuição por gênero
+        gender_counts = dados['contagem_sexo']
         gender_mapping = {'male': t('sections.ativos.male'), 'female': t('sections.ativos.female')}
         
         # Layout lado a lado: gráfico de pizza e métricas
@@ -195,12 +160,11 @@ def mostrar_funcionalidades_geral(df_recorte):
                 height=400,
                 margin=dict(l=50, r=50, t=80, b=50)
             )
-            st.plotly_chart(fig_gender, use_container_width=True, height=400)
+            st.plotly_chart(fig_gender, width='stretch', height=400)
         
         with col_metricas:
             st.markdown("**Detailed Distribution:**")
             
-            total_pacientes = len(df_recorte)
             for gender_code, count in gender_counts.items():
                 gender_name = gender_mapping.get(gender_code, str(gender_code))
                 percentage = (count / total_pacientes) * 100 if total_pacientes > 0 else 0
@@ -217,11 +181,11 @@ def mostrar_funcionalidades_geral(df_recorte):
             # Mostrar proporção masculino/feminino
             masculino = gender_counts.get('male', 0)
             feminino = gender_counts.get('female', 0)
-            total_pacientes = masculino + feminino
+            total_masc_fem = masculino + feminino
             
-            if total_pacientes > 0:
-                prop_masc = (masculino / total_pacientes) * 100
-                prop_fem = (feminino / total_pacientes) * 100
+            if total_masc_fem > 0:
+                prop_masc = (masculino / total_masc_fem) * 100
+                prop_fem = (feminino / total_masc_fem) * 100
                 st.markdown(f"• **M/F Proportion:** {prop_masc:.1f}% / {prop_fem:.1f}%")
     else:
         st.warning('Field "gender" not found in data.')
@@ -1,60 +1,30 @@
 import streamlit as st
 import plotly.express as px
-import numpy as np
 import pandas as pd
+from compute.funcionalidades_sexo import calcular_funcionalidades_sexo
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS
 from utils.translations import t
+from components.downloads import botao_download
 
 def mostrar_funcionalidades_sexo(df_recorte):
     st.info(t('sections.funcionalidades_sexo.description'))
     
-    # Copiar dados para análise por gênero
-    df_gender = df_recorte.copy()
+    dados_sexo = memoizar(
+        'funcionalidades_sexo', st.session_state.get('impressao_dados'), (),
+        lambda: calcular_funcionalidades_sexo(df_recorte)
+    )
     
-    if not df_gender.empty:
-        # Mapear códigos para nomes completos
-        df_gender['Sexo'] = df_gender['gender'].map({
-            'male': t('sections.ativos.male'),
-            'female': t('sections.ativos.female')
-        })
-        
-        # Calcular uso de funcionalidades por sexo
-        funcionalidades_sexo = {}
-        funcionalidades_nomes = {
-            'symptomDiaries': 'Symptom Diaries',
-            'acqs': 'ACQ (Asthma Control)',
-            'activityLogs': 'Physical Activities',
-            'prescriptions': 'Medications',
-            'crisis': 'Crisis Records'
-        }
-        
+    if dados_sexo is not None:
         male_label = t('sections.ativos.male')
         female_label = t('sections.ativos.female')
+        rotulos = {'male': male_label, 'female': female_label}
         
-        for func_key, func_nome in funcionalidades_nomes.items():
-            # Contar usuários por sexo que usaram a funcionalidade
-            masculino_count = df_gender[
-                (df_gender['Sexo'] == male_label) & 
-                (df_gender[func_key].apply(lambda x: len(x) > 0 if isinstance(x, list) else False))
-            ].shape[0]
-            
-            feminino_count = df_gender[
-                (df_gender['Sexo'] == female_label) & 
-                (df_gender[func_key].apply(lambda x: len(x) > 0 if isinstance(x, list) else False))
-            ].shape[0]
-            
-            # Total de usuários por sexo
-            total_masculino = df_gender[df_gender['Sexo'] == male_label].shape[0]
-            total_feminino = df_gender[df_gender['Sexo'] == female_label].shape[0]
-            
-            # Calcular percentuais
-            perc_masculino = (masculino_count / total_masculino * 100) if total_masculino > 0 else 0
-            perc_feminino = (feminino_count / total_feminino * 100) if total_feminino > 0 else 0
-            
-            funcionalidades_sexo[func_nome] = {
-                male_label: {'count': masculino_count, 'total': total_masculino, 'perc': perc_masculino},
-                female_label: {'count': feminino_count, 'total': total_feminino, 'perc': perc_feminino}
-            }
+        # Uso de funcionalidades por sexo, com os rótulos do idioma atual
+        funcionalidades_sexo = {
+            func_nome: {rotulos[sexo]: valores for sexo, valores in dados.items()}
+            for func_nome, dados in dados_sexo['por_funcionalidade'].items()
+        }
         
         # Layout lado a lado: gráficos e tabelas
         col_graficos, col_tabelas = st.columns([3, 2])
@@ -89,7 +59,7 @@ def mostrar_funcionalidades_sexo(df_recorte):
                 legend_title=t('tables.sex'),
                 xaxis=dict(tickangle=45)
             )
-            st.plotly_chart(fig_perc, use_container_width=True, height=400)
+            st.plotly_chart(fig_perc, width='stretch', height=400)
             
             # Gráfico de barras agrupadas - Número absoluto de usuários
             fig_abs = px.bar(
@@ -110,7 +80,7 @@ def mostrar_funcionalidades_sexo(df_recorte):
                 legend_title=t('tables.sex'),
                 xaxis=dict(tickangle=45)
             )
-            st.plotly_chart(fig_abs, use_container_width=True, height=400)
+            st.plotly_chart(fig_abs, width='stretch', height=400)
         
         with col_tabelas:
             # Tabela detalhada
@@ -131,7 +101,7 @@ def mostrar_funcionalidades_sexo(df_recorte):
             
             st.dataframe(
                 df_tabela,
-                use_container_width=True,
+                width='stretch',
                 column_config={
                     "Feature": st.column_config.TextColumn("Feature", width="large"),
                     "Male Users": st.column_config.TextColumn("Male Users", width="small"),
@@ -143,39 +113,25 @@ def mostrar_funcionalidades_sexo(df_recorte):
             
             # Resumo estatístico
             st.markdown(f"**{t('sections.funcionalidades_sexo.summary')}**")
-            total_masc = df_gender[df_gender['Sexo'] == t('sections.ativos.male')].shape[0]
-            total_fem = df_gender[df_gender['Sexo'] == t('sections.ativos.female')].shape[0]
+            total_masc = dados_sexo['totais']['male']
+            total_fem = dados_sexo['totais']['female']
             
             st.markdown(f"• **{t('sections.funcionalidades_sexo.total_male')}:** {total_masc} {t('sections.funcionalidades_geral.patients')}")
             st.markdown(f"• **{t('sections.funcionalidades_sexo.total_female')}:** {total_fem} {t('sections.funcionalidades_geral.patients')}")
             
-            # Identificar funcionalidade com maior diferença de adesão
-            maior_diff = 0
-            func_maior_diff = ""
-            sexo_maior_adesao = ""
-            
-            for func_nome, dados in funcionalidades_sexo.items():
-                diff = abs(dados[male_label]['perc'] - dados[female_label]['perc'])
-                if diff > maior_diff:
-                    maior_diff = diff
-                    func_maior_diff = func_nome
-                    if dados[male_label]['perc'] > dados[female_label]['perc']:
-                        sexo_maior_adesao = male_label
-                    else:
-                        sexo_maior_adesao = female_label
-            
-            if maior_diff > 0:
-                st.markdown(f"• **{t('sections.funcionalidades_sexo.largest_difference')}:** {func_maior_diff}")
-                st.markdown(f"• **{t('sections.funcionalidades_sexo.higher_adoption')}:** {sexo_maior_adesao}")
-                st.markdown(f"• **{t('sections.funcionalidades_sexo.difference')}:** {maior_diff:.1f}%")
+            # Funcionalidade com maior diferença de adesão
+            maior_diferenca = dados_sexo['maior_diferenca']
+            if maior_diferenca is not None:
+                st.markdown(f"• **{t('sections.funcionalidades_sexo.largest_difference')}:** {maior_diferenca['funcionalidade']}")
+                st.markdown(f"• **{t('sections.funcionalidades_sexo.higher_adoption')}:** {rotulos[maior_diferenca['sexo']]}")
+                st.markdown(f"• **{t('sections.funcionalidades_sexo.difference')}:** {maior_diferenca['diferenca']:.1f}%")
             
             # Botão de download
-            csv_sexo = df_tabela.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label=t('sections.funcionalidades_sexo.download_csv'),
-                data=csv_sexo,
-                file_name=f"funcionalidades_por_sexo_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            botao_download(
+                t('sections.funcionalidades_sexo.download_csv'),
+                df_tabela,
+                f"funcionalidades_por_sexo_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+                'funcionalidades_por_sexo'
             )
         
     else:
@@ -1,20 +1,22 @@
 import streamlit as st
 import plotly.express as px
-import numpy as np
+from compute.idade import calcular_idade
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS
 from utils.translations import t
 
 def mostrar_idade(df_recorte):
     st.markdown(t('sections.idade.description'))
     
-    if not df_recorte.empty:
+    dados = memoizar('idade', st.session_state.get('impressao_dados'), (), lambda: calcular_idade(df_recorte))
+    if dados is not None:
         # Layout lado a lado
         col_geral, col_sexo = st.columns(2)
         
         with col_geral:
             # Gráfico de distribuição geral de idade
             fig_idade_geral = px.histogram(
-                df_recorte,
+                dados['idades'],
                 x='age',
                 nbins=15,
                 title=t('sections.idade.general_distribution'),
@@ -27,11 +29,11 @@ def mostrar_idade(df_recorte):
                 xaxis_title=f"{t('charts.labels.age')} ({t('sections.idade.years')})",
                 yaxis_title=f"Number of {t('sections.idade.patients')}"
             )
-            st.plotly_chart(fig_idade_geral, use_container_width=True, height=400)
+            st.plotly_chart(fig_idade_geral, width='stretch', height=400)
         
         with col_sexo:
             # Copiar dados para análise por gênero
-            df_gender = df_recorte.copy()
+            df_gender = dados['idades'].copy()
             
             if not df_gender.empty:
                 # Mapear códigos para nomes completos
@@ -59,36 +61,24 @@ def mostrar_idade(df_recorte):
                     yaxis_title=f"Number of {t('sections.idade.patients')}",
                     legend_title=t('tables.sex')
                 )
-                st.plotly_chart(fig_idade_sexo, use_container_width=True, height=400)
+                st.plotly_chart(fig_idade_sexo, width='stretch', height=400)
                 
                 # Estatísticas por sexo
                 st.markdown(f"**{t('sections.idade.statistics_by_sex')}**")
                 
-                # Calcular estatísticas
-                stats_masculino = df_gender[df_gender['Sexo'] == t('sections.ativos.male')]['age']
-                stats_feminino = df_gender[df_gender['Sexo'] == t('sections.ativos.female')]['age']
-                
                 col_stats_m, col_stats_f = st.columns(2)
                 
-                with col_stats_m:
-                    st.markdown(f"**{t('sections.ativos.male')}:**")
-                    if not stats_masculino.empty:
-                        st.markdown(f"• {t('sections.idade.total')}: {len(stats_masculino)} {t('sections.idade.patients')}")
-                        st.markdown(f"• {t('sections.idade.mean')}: {stats_masculino.mean():.1f} {t('sections.idade.years')}")
-                        st.markdown(f"• {t('sections.idade.median')}: {stats_masculino.median():.1f} {t('sections.idade.years')}")
-                        st.markdown(f"• {t('sections.idade.min_max')}: {stats_masculino.min()}-{stats_masculino.max()} {t('sections.idade.years')}")
-                    else:
-                        st.markdown("• No data")
-                
-                with col_stats_f:
-                    st.markdown(f"**{t('sections.ativos.female')}:**")
-                    if not stats_feminino.empty:
-                        st.markdown(f"• {t('sections.idade.total')}: {len(stats_feminino)} {t('sections.idade.patients')}")
-                        st.markdown(f"• {t('sections.idade.mean')}: {stats_feminino.mean():.1f} {t('sections.idade.years')}")
-                        st.markdown(f"• {t('sections.idade.median')}: {stats_feminino.median():.1f} {t('sections.idade.years')}")
-                        st.markdown(f"• {t('sections.idade.min_max')}: {stats_feminino.min()}-{stats_feminino.max()} {t('sections.idade.years')}")
-                    else:
-                        st.markdown("• No data")
+                for coluna, sexo in [(col_stats_m, 'male'), (col_stats_f, 'female')]:
+                    with coluna:
+                        st.markdown(f"**{t(f'sections.ativos.{sexo}')}:**")
+                        estatisticas = dados['por_sexo'][sexo]
+                        if estatisticas is not None:
+                            st.markdown(f"• {t('sections.idade.total')}: {estatisticas['total']} {t('sections.idade.patients')}")
+                            st.markdown(f"• {t('sections.idade.mean')}: {estatisticas['media']:.1f} {t('sections.idade.years')}")
+                            st.markdown(f"• {t('sections.idade.median')}: {estatisticas['mediana']:.1f} {t('sections.idade.years')}")
+                            st.markdown(f"• {t('sections.idade.min_max')}: {estatisticas['min']}-{estatisticas['max']} {t('sections.idade.years')}")
+                        else:
+                            st.markdown("• No data")
             else:
                 st.warning(t('sections.idade.no_data_sex'))
         
@@ -96,19 +86,18 @@ def mostrar_idade(df_recorte):
         st.markdown("---")
         col_resumo1, col_resumo2, col_resumo3, col_resumo4 = st.columns(4)
         
+        geral = dados['geral']
         with col_resumo1:
-            st.metric(f"Total {t('sections.idade.patients')}", len(df_recorte))
+            st.metric(f"Total {t('sections.idade.patients')}", geral['total'])
         
         with col_resumo2:
-            st.metric(f"{t('sections.idade.mean')} {t('charts.labels.age')}", f"{df_recorte['age'].mean():.1f} {t('sections.idade.years')}")
+            st.metric(f"{t('sections.idade.mean')} {t('charts.labels.age')}", f"{geral['media']:.1f} {t('sections.idade.years')}")
         
         with col_resumo3:
-            st.metric(f"{t('sections.idade.median')} {t('charts.labels.age')}", f"{df_recorte['age'].median():.1f} {t('sections.idade.years')}")
+            st.metric(f"{t('sections.idade.median')} {t('charts.labels.age')}", f"{geral['mediana']:.1f} {t('sections.idade.years')}")
         
         with col_resumo4:
-            idade_min = df_recorte['age'].min()
-            idade_max = df_recorte['age'].max()
-            st.metric(f"{t('charts.labels.age')} {t('sections.idade.min_max')}", f"{idade_min}-{idade_max} {t('sections.idade.years')}")
+            st.metric(f"{t('charts.labels.age')} {t('sections.idade.min_max')}", f"{geral['min']}-{geral['max']} {t('sections.idade.years')}")
         
     else:
         st.warning(t('sections.idade.no_data'))
@@ -2,8 +2,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+from compute.mapa_calor import calcular_mapa_calor
+from utils.cache import memoizar
 from utils.colors import CHART_COLORS, PRIMARY_DARK, PRIMARY_MEDIUM, PRIMARY_DARKER, PRIMARY_DARKEST
 from utils.translations import t
+from components.downloads import botao_download
 
 def mostrar_mapa_calor(df_recorte):
     st.subheader('Heatmap: Correlation between Feature Usage')
@@ -12,19 +15,12 @@ def mostrar_mapa_calor(df_recorte):
 
     st.markdown('Comparative analysis of correlations between features: general view and by gender.')
 
-    funcionalidades_cols = ['symptomDiaries', 'acqs', 'activityLogs', 'prescriptions', 'crisis']
-    funcionalidades_nomes = ['Diaries', 'ACQ', 'Activities', 'Medications', 'Crises']
+    dados = memoizar('mapa_calor', st.session_state.get('impressao_dados'), (), lambda: calcular_mapa_calor(df_recorte))
+    matrizes = dados['matrizes']
+    n_pacientes = dados['pacientes']
 
     # --------- Helpers ---------
 
-    def criar_matriz_correlacao(df_dados: pd.DataFrame) -> pd.DataFrame:
-        """Binariza o uso das funcionalidades e retorna a matriz de correlação."""
-        df_bin = pd.DataFrame()
-        for col in funcionalidades_cols:
-            df_bin[col] = df_dados[col].apply(lambda x: 1 if isinstance(x, list) and len(x) > 0 else 0)
-        df_bin.columns = funcionalidades_nomes
-        return df_bin.corr()
-
     def escolher_paleta(cmin: float, cmax: float):
         """
         Decide paleta e limites:
@@ -98,86 +94,57 @@ def mostrar_mapa_calor(df_recorte):
     # --- Geral
     with col_geral:
         st.markdown(f"**{t('sections.mapa_calor.general_correlation')}**")
-        corr_matrix_geral = criar_matriz_correlacao(df_recorte)
         fig_heatmap_geral = heatmap_plot(
-            corr_matrix_geral,
-            titulo=t('sections.mapa_calor.all_patients', count=len(df_recorte)),
+            matrizes['general'],
+            titulo=t('sections.mapa_calor.all_patients', count=n_pacientes['general']),
             mostrar_escala=True
         )
-        st.plotly_chart(fig_heatmap_geral, use_container_width=True)
+        st.plotly_chart(fig_heatmap_geral, width='stretch')
 
     # --- Masculino
     with col_masculino:
         st.markdown(f"**{t('sections.mapa_calor.correlation_male')}**")
-        df_masculino = df_recorte[df_recorte['gender'] == 'male']
-        if len(df_masculino) > 1:
-            corr_matrix_masc = criar_matriz_correlacao(df_masculino)
+        if matrizes['male'] is not None:
             fig_heatmap_masc = heatmap_plot(
-                corr_matrix_masc,
-                titulo=t('sections.mapa_calor.male_patients', count=len(df_masculino)),
+                matrizes['male'],
+                titulo=t('sections.mapa_calor.male_patients', count=n_pacientes['male']),
                 mostrar_escala=True
             )
-            st.plotly_chart(fig_heatmap_masc, use_container_width=True)
+            st.plotly_chart(fig_heatmap_masc, width='stretch')
         else:
-            corr_matrix_masc = None
             st.warning(t('sections.mapa_calor.insufficient_data', sex=t('sections.mapa_calor.male').lower()))
 
     # --- Feminino
     with col_feminino:
         st.markdown(f"**{t('sections.mapa_calor.correlation_female')}**")
-        df_feminino = df_recorte[df_recorte['gender'] == 'female']
-        if len(df_feminino) > 1:
-            corr_matrix_fem = criar_matriz_correlacao(df_feminino)
+        if matrizes['female'] is not None:
             fig_heatmap_fem = heatmap_plot(
-                corr_matrix_fem,
-                titulo=t('sections.mapa_calor.female_patients', count=len(df_feminino)),
+                matrizes['female'],
+                titulo=t('sections.mapa_calor.female_patients', count=n_pacientes['female']),
                 mostrar_escala=True
             )
-            st.plotly_chart(fig_heatmap_fem, use_container_width=True)
+            st.plotly_chart(fig_heatmap_fem, width='stretch')
         else:
-            corr_matrix_fem = None
             st.warning(t('sections.mapa_calor.insufficient_data', sex=t('sections.mapa_calor.female').lower()))
 
     # --------- Análise comparativa (se houver dados) ---------
     st.markdown("---")
     st.subheader(t('sections.mapa_calor.comparative_analysis_title'))
 
-    if (len(df_masculino) > 1 and len(df_feminino) > 1) and (corr_matrix_masc is not None and corr_matrix_fem is not None):
+    if dados['correlacoes'] is not None:
         col_analise, col_tabela = st.columns([2, 1])
 
         with col_analise:
             st.markdown(f"**{t('sections.mapa_calor.strongest_correlations')}**")
 
-            def encontrar_correlacoes_fortes(matriz, nome_grupo):
-                correlacoes = []
-                for i in range(len(matriz.columns)):
-                    for j in range(i + 1, len(matriz.columns)):
-                        func1 = matriz.columns[i]
-                        func2 = matriz.columns[j]
-                        corr_valor = matriz.iloc[i, j]
-                        correlacoes.append({
-                            'grupo': nome_grupo,
-                            'funcionalidade_1': func1,
-                            'funcionalidade_2': func2,
-                            'correlacao': corr_valor
-                        })
-                return correlacoes
-
-            corr_geral = encontrar_correlacoes_fortes(corr_matrix_geral, t('sections.mapa_calor.general'))
-            corr_masc = encontrar_correlacoes_fortes(corr_matrix_masc, t('sections.mapa_calor.male'))
-            corr_fem = encontrar_correlacoes_fortes(corr_matrix_fem, t('sections.mapa_calor.female'))
-
-            todas_correlacoes = corr_geral + corr_masc + corr_fem
-            df_correlacoes = pd.DataFrame(todas_correlacoes)
-            df_correlacoes['correlacao_abs'] = df_correlacoes['correlacao'].abs()
-            df_correlacoes = df_correlacoes.sort_values('correlacao_abs', ascending=False)
-
-            grupos_traduzidos = {
-                t('sections.mapa_calor.general'): t('sections.mapa_calor.general'),
-                t('sections.mapa_calor.male'): t('sections.mapa_calor.male'),
-                t('sections.mapa_calor.female'): t('sections.mapa_calor.female')
-            }
-            
+            # Nome de cada grupo no idioma atual
+            df_correlacoes = dados['correlacoes'].copy()
+            df_correlacoes['grupo'] = df_correlacoes['grupo'].map({
+                'general': t('sections.mapa_calor.general'),
+                'male': t('sections.mapa_calor.male'),
+                'female': t('sections.mapa_calor.female')
+            })
+
             for grupo_key in [t('sections.mapa_calor.general'), t('sections.mapa_calor.male'), t('sections.mapa_calor.female')]:
                 top_grupo = df_correlacoes[df_correlacoes['grupo'] == grupo_key].head(3)
                 if not top_grupo.empty:
@@ -202,7 +169,7 @@ def mostrar_mapa_calor(df_recorte):
             df_resumo = pd.DataFrame(resumo_correlacoes)
             st.dataframe(
                 df_resumo,
-                use_container_width=True,
+                width='stretch',
                 column_config={
                     "Group": st.column_config.TextColumn(t('sections.mapa_calor.group'), width="small"),
                     "Strongest Correlation": st.column_config.TextColumn(t('sections.mapa_calor.strongest_correlation'), width="large"),
@@ -210,12 +177,11 @@ def mostrar_mapa_calor(df_recorte):
                 }
             )
 
-            csv_correlacoes = df_correlacoes.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label=t('sections.mapa_calor.download_correlations'),
-                data=csv_correlacoes,
-                file_name=f"correlacoes_funcionalidades_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            botao_download(
+                t('sections.mapa_calor.download_correlations'),
+                df_correlacoes,
+                f"correlacoes_funcionalidades_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}",
+                'correlacoes_funcionalidades'
             )
 
             st.markdown(f"**{t('sections.mapa_calor.insights')}:**")
@@ -1,62 +1,32 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from dateutil import parser
+import plotly.express as px
+from compute.recordes import METRICAS_RANKING, calcular_recordes, ranking_top_k
+from utils.cache import memoizar
+from utils.colors import CHART_COLORS
 from utils.translations import t
+from components.downloads import botao_download
 
-def mostrar_recordes(pacientes_recorte):
+K_PADRAO = 10
+K_MAXIMO = 100
+
+def mostrar_recordes(tabelas):
     st.subheader(t('sections.recordes.title'))
     st.markdown(t('sections.recordes.description'))
 
-    # Encontrar paciente mais ativo baseado na média diária de passos
-    paciente_mais_ativo = None
-    melhor_media_diaria = 0
-    paciente_mais_ativo_detalhes = None
-
     # Data final de coleta = hoje (momento do upload do JSON)
     data_coleta = st.session_state.get('data_fim', pd.Timestamp.now(tz='UTC'))
 
-    for paciente in pacientes_recorte:
-        # Data de criação da conta
-        data_cadastro = paciente.get('createdAt')
-        if not data_cadastro:
-            continue
-
-        if isinstance(data_cadastro, str):
-            data_cadastro = parser.parse(data_cadastro)
-
-        # Calcular período em dias
-        periodo_dias = (data_coleta - data_cadastro).days
-        if periodo_dias <= 0:
-            continue
-
-        # Calcular total de passos
-        total_passos = sum([a.get('steps', 0) for a in paciente.get('activityLogs', [])])
-
-        if total_passos > 0:
-            # Calcular média diária
-            media_diaria = total_passos / periodo_dias
-
-            if media_diaria > melhor_media_diaria:
-                melhor_media_diaria = media_diaria
-                paciente_mais_ativo = paciente['id']
-                paciente_mais_ativo_detalhes = {
-                    'id': paciente['id'],
-                    'data_cadastro': data_cadastro,
-                    'total_passos': total_passos,
-                    'periodo_dias': periodo_dias,
-                    'media_diaria': media_diaria
-                }
-
-    # Estatísticas gerais de atividade física
-    todos_passos = []
-    pacientes_ativos = 0
-
-    for paciente in pacientes_recorte:
-        passos = sum([a.get('steps', 0) for a in paciente.get('activityLogs', [])])
-        if passos > 0:
-            todos_passos.append(passos)
-            pacientes_ativos += 1
+    # Paciente mais ativo baseado na média diária de passos e estatísticas gerais
+    recordes = memoizar(
+        'recordes', st.session_state.get('impressao_dados'), (data_coleta,),
+        lambda: calcular_recordes(tabelas, data_coleta),
+        prontos=st.session_state.get('resultados_pacote')
+    )
+    paciente_mais_ativo_detalhes = recordes['mais_ativo']
+    todos_passos = recordes['passos']
+    pacientes_ativos = len(todos_passos)
 
     # Layout principal
     col1, col2 = st.columns([2, 1])
@@ -76,15 +46,87 @@ def mostrar_recordes(pacientes_recorte):
 
     with col2:
         # Estatísticas gerais
-        if todos_passos:
+        if pacientes_ativos > 0:
             st.info(f"""
             **{t('sections.recordes.general_statistics')}**
             - {t('sections.recordes.active_patients')}: {pacientes_ativos}
             - {t('sections.recordes.average_steps')}: {np.mean(todos_passos):,.0f}
-            - {t('sections.recordes.total_steps_all')}: {sum(todos_passos):,}
+            - {t('sections.recordes.total_steps_all')}: {int(todos_passos.sum()):,}
             - {t('sections.recordes.median')}: {np.median(todos_passos):,.0f}
             """)
         else:
             st.info(t('sections.recordes.no_data'))
 
-    st.markdown('---') 
\ No newline at end of file
+    _rankings(recordes['metricas'], data_coleta)
+    st.markdown('---')
+
+@st.fragment
+def _rankings(df_metricas, data_coleta):
+    """Top K por métrica; trocar K ou a métrica reexecuta só este fragmento."""
+    st.markdown(f"### {t('sections.recordes.ranking_title')}")
+    col_metrica, col_k = st.columns([2, 1])
+    with col_metrica:
+        metrica = st.selectbox(
+            t('sections.recordes.ranking_metric'),
+            METRICAS_RANKING,
+            format_func=lambda nome: t(f'sections.recordes.metrics.{nome}')
+        )
+    with col_k:
+        k = st.number_input(
+            t('sections.recordes.ranking_size'),
+            min_value=1,
+            max_value=K_MAXIMO,
+            value=K_PADRAO,
+            step=1,
+            help=t('sections.recordes.ranking_size_help')
+        )
+
+    # Os rankings de todas as métricas saem juntos; trocar só a métrica não recalcula
+    rankings = memoizar(
+        'rankings_recordes', st.session_state.get('impressao_dados'), (data_coleta, int(k)),
+        lambda: ranking_top_k(df_metricas, int(k))
+    )
+    df_ranking = rankings[metrica]
+    if df_ranking.empty:
+        st.info(t('sections.recordes.ranking_empty'))
+        return
+
+    nome_metrica = t(f'sections.recordes.metrics.{metrica}')
+    # Barras horizontais com o primeiro colocado no topo
+    fig_ranking = px.bar(
+        df_ranking.iloc[::-1].astype({'id': str}),
+        x=metrica,
+        y='id',
+        orientation='h',
+        title=t('sections.recordes.ranking_chart', k=len(df_ranking), metric=nome_metrica),
+        color_discrete_sequence=[CHART_COLORS[2]],
+        labels={metrica: nome_metrica, 'id': t('sections.recordes.id')}
+    )
+    fig_ranking.update_layout(
+        height=max(300, 28 * len(df_ranking) + 120),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig_ranking, width='stretch')
+
+    df_exibicao = df_ranking[['posicao', 'id', *METRICAS_RANKING]]
+    st.dataframe(
+        df_exibicao,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            'posicao': st.column_config.NumberColumn(t('sections.recordes.position'), width='small'),
+            'id': st.column_config.TextColumn(t('sections.recordes.id')),
+            'passos_dia': st.column_config.NumberColumn(t('sections.recordes.metrics.passos_dia'), format='%.0f'),
+            'diarios_semana': st.column_config.NumberColumn(t('sections.recordes.metrics.diarios_semana'), format='%.2f'),
+            'administracoes_semana': st.column_config.NumberColumn(t('sections.recordes.metrics.administracoes_semana'), format='%.2f'),
+            'acq_conclusao': st.column_config.NumberColumn(t('sections.recordes.metrics.acq_conclusao'), format='%.1f'),
+            'idade_conta': st.column_config.NumberColumn(t('sections.recordes.metrics.idade_conta'), format='%d'),
+        }
+    )
+    botao_download(
+        t('sections.recordes.download_csv'),
+        df_exibicao,
+        f"ranking_{metrica}_top{int(k)}_{data_coleta.strftime('%Y%m%d')}",
+        'ranking_recordes',
+        parametros=(metrica, int(k))
+    ) 
\ No newline at end of file
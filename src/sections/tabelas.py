@@ -1,30 +1,24 @@
 import streamlit as st
-import pandas as pd
-from dateutil import parser
+from compute.tabelas import faixa_idades, filtrar_por_idade
 from utils.translations import t
 
-def mostrar_tabelas(df_recorte, pacientes_recorte):
+def mostrar_tabelas(df_recorte):
     st.subheader(t('sections.tabelas.title'))
     st.markdown(t('sections.tabelas.description'))
+    _tabela_por_idade(df_recorte)
+    st.markdown('---')
+
+@st.fragment
+def _tabela_por_idade(df_recorte):
+    """Slider de idade e tabela; mover o slider reexecuta só este fragmento."""
+    idade_minima, idade_maxima = faixa_idades(df_recorte)
     idade_min, idade_max = st.slider(
         t('sections.tabelas.age_range'),
-        min_value=int(df_recorte['age'].min()) if not df_recorte.empty else 0,
-        max_value=int(df_recorte['age'].max()) if not df_recorte.empty else 100,
+        min_value=idade_minima,
+        max_value=idade_maxima,
         value=(18, 80)
     )
-    df_idade = df_recorte[df_recorte['age'].between(idade_min, idade_max)].copy()
-    df_idade['total_symptom_diaries'] = df_idade['symptomDiaries'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df_idade['total_acqs'] = df_idade['acqs'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df_idade['total_activity_logs'] = df_idade['activityLogs'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df_idade['total_prescriptions'] = df_idade['prescriptions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df_idade['total_crisis'] = df_idade['crisis'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    colunas_exibicao = [
-        'id', 'age', 'gender', 'height', 'weight', 
-        'total_symptom_diaries', 'total_acqs', 'total_activity_logs', 
-        'total_prescriptions', 'total_crisis'
-    ]
-    colunas_disponiveis = [c for c in colunas_exibicao if c in df_idade.columns]
-    df_exibicao = df_idade[colunas_disponiveis].copy()
+    df_exibicao = filtrar_por_idade(df_recorte, idade_min, idade_max)
     if 'gender' in df_exibicao.columns:
         df_exibicao['gender'] = df_exibicao['gender'].map({
             'male': t('sections.ativos.male'),
@@ -43,5 +37,4 @@ def mostrar_tabelas(df_recorte, pacientes_recorte):
         'total_crisis': t('tables.total_crises')
     }
     df_exibicao = df_exibicao.rename(columns={c: mapeamento_colunas[c] for c in df_exibicao.columns if c in mapeamento_colunas})
-    st.dataframe(df_exibicao, use_container_width=True)
-    st.markdown('---')
+    st.dataframe(df_exibicao, width='stretch')
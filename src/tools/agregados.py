@@ -0,0 +1,259 @@
+"""
+Calcula, sem servidor Streamlit, todos os agregados do dashboard e grava em disco.
+
+Lê o export em streaming (um paciente por vez), aplica o recorte da coorte de cadastro
+e a data de referência como o dashboard faz, e executa os cálculos de cada seção
+(utils.exportacao.CALCULOS) em paralelo, uma seção por processo (com fork no Linux; nos
+demais sistemas os processos leem as tabelas de um snapshot Arrow temporário). Cada tabela vira um
+arquivo CSV ou Parquet no diretório de saída; os valores escalares, os parâmetros do
+cálculo e a lista de arquivos vão para o manifest.json, gravado por último. Com --pacote, grava também o
+pacote de agregados (utils.pacotes) que o dashboard abre no lugar do export.
+
+Uso (a partir de src/):
+    python -m tools.agregados export.json --saida agregados/
+    python -m tools.agregados export.json.gz --data-referencia 2025-10-31 --coorte-inicio 2025-03-01 --formato parquet
+    python -m tools.agregados export.json --pacote agregados.zip
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.cache import impressao_digital_arquivo, impressao_recorte
+from utils.data_processing import (
+    iterar_pacientes_export, construir_tabelas_eventos, fontes_passos, indice_criacao, mascara_intervalo_criacao,
+    recortar_tabelas, DATA_LIMITE_MARCO_2025
+)
+from utils.exportacao import CALCULOS, ARQUIVO_MANIFESTO, VERSAO_AGREGADOS, preparar_tabela, entrada_tabela
+from utils.pacotes import gravar_pacote, separar_resultado, SECOES_PACOTE
+from utils.snapshots import carregar_snapshot, salvar_snapshot
+
+FORMATOS = ('csv', 'parquet')
+
+# Tabelas de eventos do recorte no processo que calcula as seções (ver _executor)
+_TABELAS = None
+# Nome do snapshot do recorte lido pelos processos quando não há fork
+SNAPSHOT_RECORTE = 'recorte'
+
+# --------- Gravação ---------
+
+def _gravar_tabela(df, tipo, diretorio, nome, formato):
+    """Grava a tabela e retorna sua entrada no manifest."""
+    df = preparar_tabela(df)
+    arquivo = f'{nome}.{formato}'
+    caminho = os.path.join(diretorio, arquivo)
+    if formato == 'parquet':
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False, encoding='utf-8')
+    return entrada_tabela(arquivo, tipo, df)
+
+def _inicializar(tabelas):
+    global _TABELAS
+    _TABELAS = tabelas
+
+def _inicializar_de_snapshot(diretorio):
+    """Lê as tabelas do recorte do snapshot Arrow gravado pelo processo principal (memory map)."""
+    _inicializar(carregar_snapshot(SNAPSHOT_RECORTE, diretorio)['tabelas'])
+
+def _executor(processos, tabelas, data_fim, diretorio_temporario):
+    """
+    Pool de processos em que cada processo enxerga as tabelas do recorte.
+
+    No Linux, os processos são criados com fork e herdam as tabelas já em memória, sem
+    serializá-las. Onde fork não existe ou não é seguro (spawn no macOS e no Windows),
+    serializar as tabelas mandaria uma cópia inteira delas para cada processo; em vez disso,
+    elas são gravadas uma vez como snapshot Arrow (utils.snapshots) em diretorio_temporario e
+    cada processo as lê do disco pelo caminho. Sem pyarrow, seguem serializadas.
+    """
+    if sys.platform.startswith('linux') and 'fork' in multiprocessing.get_all_start_methods():
+        _inicializar(tabelas)
+        return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('fork'))
+    dados = {'total_pacientes': len(tabelas['pacientes']), 'data_referencia': data_fim, 'tabelas': tabelas}
+    if salvar_snapshot(SNAPSHOT_RECORTE, dados, diretorio_temporario):
+        return ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_de_snapshot,
+                                   initargs=(diretorio_temporario,))
+    return ProcessPoolExecutor(max_workers=processos, initializer=_inicializar, initargs=(tabelas,))
+
+def _executar_secao(secao, data_inicio, data_fim, diretorio, formato, devolver_resultado):
+    """
+    Calcula uma seção e grava suas tabelas.
+
+    Returns:
+        Tupla (secao, entrada do manifest, resultado do cálculo ou None)
+    """
+    inicio = time.perf_counter()
+    resultado = CALCULOS[secao](_TABELAS, data_inicio, data_fim)
+    tabelas, valores, _ = separar_resultado(resultado)
+    arquivos = {
+        nome: _gravar_tabela(df, tipo, diretorio, f'{secao}.{nome}' if nome else secao, formato)
+        for nome, (tipo, df) in tabelas.items()
+    }
+    entrada = {'valores': valores, 'tabelas': arquivos, 'tempo_s': round(time.perf_counter() - inicio, 4)}
+    return secao, entrada, resultado if devolver_resultado else None
+
+# --------- Execução ---------
+
+def _abrir_export(caminho):
+    if caminho.endswith('.gz'):
+        return gzip.open(caminho, 'rb')
+    return open(caminho, 'rb')
+
+def _data_fim_do_dia(texto):
+    """Fim do dia (UTC) de uma data AAAA-MM-DD, como a data de referência escolhida no dashboard."""
+    return pd.Timestamp(texto, tz='UTC').normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+
+def calcular_agregados(caminho_export, diretorio, data_referencia=None, coorte_inicio=DATA_LIMITE_MARCO_2025,
+                       coorte_fim=None, formato='csv', processos=None, secoes=None, pacote=None):
+    """
+    Ingere o export, aplica o recorte e grava os agregados de todas as seções.
+
+    Args:
+        caminho_export: Export JSON (ou .json.gz)
+        diretorio: Diretório de saída (criado se não existir)
+        data_referencia: Data "as-of" (Timestamp UTC); padrão: o momento da ingestão
+        coorte_inicio: Início do intervalo de criação das contas (padrão: 01/03/2025)
+        coorte_fim: Fim inclusivo do intervalo de criação; padrão: fim do dia do último cadastro,
+            como no controle da coorte do dashboard (a impressao_dados do manifest coincide)
+        formato: 'csv' ou 'parquet'
+        processos: Quantidade de processos (padrão: todos os núcleos)
+        secoes: Seções a calcular (padrão: todas, na ordem do dashboard)
+        pacote: Arquivo .zip do pacote de agregados para o dashboard (opcional; exige todas
+            as seções de SECOES_PACOTE)
+
+    Returns:
+        dict do manifest gravado
+    """
+    secoes = list(secoes or CALCULOS)
+    os.makedirs(diretorio, exist_ok=True)
+
+    inicio = time.perf_counter()
+    with _abrir_export(caminho_export) as arquivo:
+        pacientes = (paciente for paciente in iterar_pacientes_export(arquivo) if isinstance(paciente, dict))
+        tabelas_completas = construir_tabelas_eventos(pacientes)
+    if data_referencia is None:
+        data_referencia = pd.Timestamp.now(tz='UTC')
+    indice = indice_criacao(tabelas_completas['pacientes']['createdAt'])
+    if coorte_fim is None and len(indice['ns']) > 0:
+        ultimo_cadastro = max(pd.Timestamp(indice['ns'][-1], tz='UTC').normalize(), DATA_LIMITE_MARCO_2025)
+        coorte_fim = ultimo_cadastro + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+    tabelas = recortar_tabelas(tabelas_completas, mascara_intervalo_criacao(indice, coorte_inicio, coorte_fim))
+    total_pacientes_export = len(tabelas_completas['pacientes'])
+    tempo_ingestao = time.perf_counter() - inicio
+    print(f'Ingestão: {total_pacientes_export} pacientes, '
+          f'{len(tabelas["pacientes"])} no recorte ({tempo_ingestao:.1f} s)', file=sys.stderr)
+    del tabelas_completas, indice
+
+    # Mesmo período das seções: início fixo em março/2025, fim na data de referência
+    data_inicio = DATA_LIMITE_MARCO_2025
+    data_fim = data_referencia
+    processos = max(1, min(processos or os.cpu_count() or 1, len(secoes)))
+
+    def argumentos(secao):
+        return secao, data_inicio, data_fim, diretorio, formato, pacote is not None and secao in SECOES_PACOTE
+
+    resultados = {}
+    resultados_pacote = {}
+    if processos == 1:
+        _inicializar(tabelas)
+        execucoes = (_executar_secao(*argumentos(secao)) for secao in secoes)
+        for secao, entrada, resultado in execucoes:
+            resultados[secao] = entrada
+            if resultado is not None:
+                resultados_pacote[secao] = resultado
+    else:
+        with tempfile.TemporaryDirectory(prefix='agregados-') as diretorio_temporario, \
+                _executor(processos, tabelas, data_fim, diretorio_temporario) as executor:
+            futuros = [executor.submit(_executar_secao, *argumentos(secao)) for secao in secoes]
+            for futuro in futuros:
+                secao, entrada, resultado = futuro.result()
+                resultados[secao] = entrada
+                if resultado is not None:
+                    resultados_pacote[secao] = resultado
+    for secao in secoes:
+        print(f'  {secao:<28} {resultados[secao]["tempo_s"]:>8.3f} s', file=sys.stderr)
+
+    impressao = impressao_digital_arquivo(caminho_export)
+    relatorio_datas = tabelas['relatorio_datas']
+    manifesto = {
+        'versao': VERSAO_AGREGADOS,
+        'gerado_em': pd.Timestamp.now(tz='UTC').isoformat(),
+        'export': os.path.abspath(caminho_export),
+        'impressao_arquivo': impressao,
+        'impressao_dados': impressao_recorte(impressao, coorte_inicio, coorte_fim),
+        'coorte_inicio': coorte_inicio.isoformat(),
+        'coorte_fim': coorte_fim.isoformat() if coorte_fim is not None else None,
+        'data_inicio': data_inicio.isoformat(),
+        'data_fim': data_fim.isoformat(),
+        'total_pacientes_export': total_pacientes_export,
+        'total_pacientes_recorte': len(tabelas['pacientes']),
+        'datas_fallback': int(relatorio_datas['fallback'].sum()),
+        'datas_falhas': int(relatorio_datas['falhas'].sum()),
+        'fontes_passos': fontes_passos(tabelas['relatorio_passos']),
+    }
+    if pacote is not None:
+        gravar_pacote(pacote, manifesto, tabelas['pacientes'], tabelas['ultimo_evento'], resultados_pacote)
+        print(f'Pacote gravado em {pacote} ({os.path.getsize(pacote) / 1024:.0f} KB)', file=sys.stderr)
+
+    manifesto.update(formato=formato, processos=processos, secoes=resultados)
+    # O manifest é gravado por último e trocado de uma vez: se existir, os arquivos estão completos
+    temporario = os.path.join(diretorio, f'.{ARQUIVO_MANIFESTO}.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, os.path.join(diretorio, ARQUIVO_MANIFESTO))
+    return manifesto
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calcula os agregados do dashboard e grava em CSV/Parquet.')
+    parser.add_argument('export', help='Export JSON do Inspirar (aceita .json.gz)')
+    parser.add_argument('--saida', default='agregados', help='Diretório de saída (padrão: agregados)')
+    parser.add_argument('--data-referencia', help='Data "as-of" AAAA-MM-DD; usa o fim do dia (padrão: agora)')
+    parser.add_argument('--coorte-inicio', default=DATA_LIMITE_MARCO_2025.strftime('%Y-%m-%d'),
+                        help='Contas criadas a partir desta data AAAA-MM-DD (padrão: 2025-03-01)')
+    parser.add_argument('--coorte-fim', help='Contas criadas até o fim desta data AAAA-MM-DD (padrão: último cadastro)')
+    parser.add_argument('--formato', choices=FORMATOS, default='csv', help='Formato das tabelas (padrão: csv)')
+    parser.add_argument('--processos', type=int, help='Quantidade de processos (padrão: todos os núcleos)')
+    parser.add_argument('--secoes', help=f'Seções separadas por vírgula (padrão: todas): {",".join(CALCULOS)}')
+    parser.add_argument('--pacote', help='Grava também o pacote de agregados (.zip) para abrir no dashboard')
+    args = parser.parse_args(argv)
+
+    secoes = [nome.strip() for nome in args.secoes.split(',') if nome.strip()] if args.secoes else None
+    desconhecidas = sorted(set(secoes or []) - set(CALCULOS))
+    if desconhecidas:
+        parser.error(f'seções desconhecidas: {", ".join(desconhecidas)}')
+    if args.pacote and secoes is not None and not set(SECOES_PACOTE) <= set(secoes):
+        parser.error(f'o pacote precisa das seções {", ".join(SECOES_PACOTE)}')
+    if args.formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error('o formato parquet precisa do pyarrow instalado')
+
+    try:
+        manifesto = calcular_agregados(
+            args.export,
+            args.saida,
+            data_referencia=_data_fim_do_dia(args.data_referencia) if args.data_referencia else None,
+            coorte_inicio=pd.Timestamp(args.coorte_inicio, tz='UTC'),
+            coorte_fim=_data_fim_do_dia(args.coorte_fim) if args.coorte_fim else None,
+            formato=args.formato,
+            processos=args.processos,
+            secoes=secoes,
+            pacote=args.pacote,
+        )
+    except (OSError, ValueError) as erro:
+        print(f'Erro: {erro}', file=sys.stderr)
+        return 1
+    total_tabelas = sum(len(entrada['tabelas']) for entrada in manifesto['secoes'].values())
+    print(f'{total_tabelas} tabelas gravadas em {args.saida}', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Benchmark da ingestão e do cálculo de cada seção do dashboard em várias escalas de dados.
+
+Para cada escala, gera um export sintético (tools.gerar_export), mede a ingestão,
+o índice de criação, o recorte da coorte e o cálculo de cada seção (utils.exportacao.CALCULOS,
+as mesmas funções do compute/ com as entradas e parâmetros do dashboard), e grava os
+resultados em JSON. A montagem dos gráficos e tabelas do Streamlit fica de fora: é um custo
+quase fixo e ruidoso que esconderia o tempo do cálculo. O tempo é o menor de várias
+repetições, feitas em rodadas sobre todas as etapas e sem tracemalloc; o pico de memória
+vem de uma execução separada com tracemalloc ligado, para não distorcer o tempo.
+
+Com --baseline, compara cada etapa com um resultado salvo anteriormente e termina com
+código 1 se alguma ficar mais lenta que o limite.
+
+Uso (a partir de src/):
+    python -m tools.benchmark --escalas 1000,10000 --saida bench.json
+    python -m tools.benchmark --escalas 1000,10000 --baseline bench.json --limite 0.2
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from tools.gerar_export import escrever_export, iterar_pacientes, periodo_historico, INICIO_PADRAO, MESES_PADRAO
+from utils.data_processing import (
+    iterar_pacientes_export, construir_tabelas_eventos, indice_criacao, mascara_intervalo_criacao,
+    recortar_tabelas, DATA_LIMITE_MARCO_2025
+)
+from utils.exportacao import CALCULOS
+
+LIMITE_PADRAO = 0.2
+REPETICOES_PADRAO = 7
+# Diferenças absolutas abaixo disso são ruído de medição, não regressão
+TOLERANCIA_ABSOLUTA_S = 0.005
+
+def cronometrar(funcao):
+    """Resultado e tempo de parede de uma chamada, com o coletor de lixo desligado (como no timeit)."""
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        return resultado, time.perf_counter() - inicio
+    finally:
+        if gc_ativo:
+            gc.enable()
+
+def pico_memoria(funcao):
+    """Pico de memória alocada (MB) durante uma execução com tracemalloc."""
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+def executar_escala(n_pacientes, semente, repeticoes, diretorio):
+    """
+    Gera o export da escala e mede todas as etapas; retorna a lista de resultados.
+
+    As repetições são feitas em rodadas (cada rodada executa todas as etapas uma vez), e
+    não seguidas, para que um período de interferência na máquina não atinja todas as
+    amostras de uma mesma etapa; vale o menor tempo de cada etapa.
+    """
+    caminho = os.path.join(diretorio, f'export_{n_pacientes}.json')
+    with open(caminho, 'w', encoding='utf-8') as saida:
+        escrever_export(saida, iterar_pacientes(n_pacientes, semente))
+    tamanho_arquivo = os.path.getsize(caminho)
+
+    def ingerir():
+        with open(caminho, 'rb') as arquivo:
+            return construir_tabelas_eventos(iterar_pacientes_export(arquivo))
+
+    etapas = []
+
+    def primeira_rodada(etapa, funcao, linhas):
+        # A primeira rodada também produz as entradas das etapas seguintes
+        resultado, tempo = cronometrar(funcao)
+        etapas.append({'etapa': etapa, 'funcao': funcao, 'linhas': linhas, 'tempos': [tempo]})
+        return resultado
+
+    tabelas_completas = primeira_rodada('ingestao', ingerir, tamanho_arquivo)
+    pacientes = tabelas_completas['pacientes']
+    indice = primeira_rodada('indice_criacao', lambda: indice_criacao(pacientes['createdAt']), len(pacientes))
+    tabelas = primeira_rodada(
+        'recorte',
+        lambda: recortar_tabelas(tabelas_completas, mascara_intervalo_criacao(indice, DATA_LIMITE_MARCO_2025)),
+        sum(len(df) for df in tabelas_completas.values())
+    )
+
+    # Mesmo período das seções, com a data de referência no fim do histórico
+    _, fim_ns = periodo_historico(INICIO_PADRAO, MESES_PADRAO)
+    data_fim = pd.Timestamp(fim_ns, tz='UTC')
+    linhas = sum(len(df) for df in tabelas.values())
+    for secao, calcular in CALCULOS.items():
+        primeira_rodada(secao, functools.partial(calcular, tabelas, DATA_LIMITE_MARCO_2025, data_fim), linhas)
+
+    for _ in range(repeticoes - 1):
+        for etapa in etapas:
+            etapa['tempos'].append(cronometrar(etapa['funcao'])[1])
+
+    resultados = []
+    for etapa in etapas:
+        tempo = min(etapa['tempos'])
+        pico = pico_memoria(etapa['funcao'])
+        resultados.append({
+            'escala': n_pacientes,
+            'etapa': etapa['etapa'],
+            'tempo_s': round(tempo, 6),
+            'pico_mb': round(pico, 3),
+            'linhas_entrada': etapa['linhas'],
+        })
+        print(f"  {etapa['etapa']:<32} {tempo:>9.4f} s {pico:>9.1f} MB", file=sys.stderr)
+    return resultados
+
+def comparar(resultados, baseline, limite):
+    """
+    Compara os tempos com a baseline.
+
+    Returns:
+        Lista de regressões: dicts com escala, etapa, tempo_s, baseline_s e razao
+    """
+    referencia = {(r['escala'], r['etapa']): r['tempo_s'] for r in baseline['resultados']}
+    regressoes = []
+    for r in resultados:
+        base = referencia.get((r['escala'], r['etapa']))
+        if base is None:
+            continue
+        razao = r['tempo_s'] / base if base > 0 else float('inf')
+        r['baseline_s'] = base
+        r['razao'] = round(razao, 3)
+        if r['tempo_s'] > base * (1 + limite) and r['tempo_s'] - base > TOLERANCIA_ABSOLUTA_S:
+            regressoes.append(r)
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark da ingestão e do cálculo das seções do dashboard.')
+    parser.add_argument('--escalas', default='1000,10000', help='Quantidades de pacientes, separadas por vírgula')
+    parser.add_argument('--semente', type=int, default=0, help='Semente dos exports sintéticos')
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO,
+                        help=f'Repetições por etapa; vale o menor tempo (padrão: {REPETICOES_PADRAO})')
+    parser.add_argument('--saida', default='benchmark.json', help='Arquivo JSON com os resultados')
+    parser.add_argument('--baseline', help='Resultado anterior para comparação')
+    parser.add_argument('--limite', type=float, default=LIMITE_PADRAO,
+                        help=f'Aumento relativo de tempo tolerado antes de acusar regressão (padrão: {LIMITE_PADRAO})')
+    args = parser.parse_args(argv)
+
+    escalas = [int(valor) for valor in args.escalas.split(',') if valor.strip()]
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for n_pacientes in escalas:
+            print(f'Escala: {n_pacientes} pacientes', file=sys.stderr)
+            resultados.extend(executar_escala(n_pacientes, args.semente, args.repeticoes, diretorio))
+
+    regressoes = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.limite)
+
+    relatorio = {
+        'meta': {
+            'momento': pd.Timestamp.now(tz='UTC').isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'semente': args.semente,
+            'repeticoes': args.repeticoes,
+        },
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2)
+    print(f'Resultados gravados em {args.saida}', file=sys.stderr)
+
+    for r in regressoes:
+        print(f"REGRESSÃO {r['etapa']} ({r['escala']} pacientes): {r['tempo_s']:.4f} s vs {r['baseline_s']:.4f} s "
+              f"(x{r['razao']:.2f})", file=sys.stderr)
+    return 1 if regressoes else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
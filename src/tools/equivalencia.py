@@ -0,0 +1,243 @@
+"""
+Verificação diferencial entre os laços originais (tools.referencia_legado) e os caminhos vetorizados.
+
+A cada rodada, gera um export sintético com semente própria, desloca parte das datas
+para os limites das semanas (segunda 00:00, domingo 23:59:59.999, domingo seguinte
+00:00) e compara, com a mesma data de referência sorteada:
+
+- totais semanais e usuários ativos de diários, atividades (com passos), prescrições e administrações
+- tabelas paciente x semana de administrações e prescrições (gerar_tabela_*_semana)
+- marcação de pacientes ativos, primeiro ACQ, duração das crises e passos por paciente
+
+Quando uma verificação falha, a lista de pacientes é reduzida (delta debugging) até um
+conjunto mínimo que ainda reproduz a diferença, gravado em JSON para investigação.
+
+Uso (a partir de src/):
+    python -m tools.equivalencia --rodadas 20 --pacientes 60
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from tools import referencia_legado as legado
+from tools.gerar_export import gerar_paciente, periodo_historico, INICIO_PADRAO, MESES_PADRAO
+from utils.data_processing import construir_tabelas_eventos, mascara_recorte, recortar_tabelas, DATA_LIMITE_MARCO_2025
+from utils.semanas import agregar_por_semana, NS_DIA, NS_SEMANA, inicio_semana_zero
+from compute.ativos import pacientes_com_registro_recente
+from compute.prescricoes_semanais import gerar_tabela_administrations_semana, gerar_tabela_prescriptions_semana
+from compute.status_acq import primeiros_acqs
+
+DATA_INICIO = DATA_LIMITE_MARCO_2025
+TAXA_LIMITES = 0.05
+
+def _comparar_tabelas(legado_df, rapido_df):
+    """Mensagem com a primeira diferença entre duas tabelas, ou None se forem iguais."""
+    legado_df = legado_df.reset_index(drop=True)
+    rapido_df = rapido_df.reset_index(drop=True)
+    if legado_df.empty and rapido_df.empty:
+        return None
+    try:
+        pd.testing.assert_frame_equal(legado_df, rapido_df, check_dtype=False, check_exact=False, rtol=1e-9)
+    except AssertionError as erro:
+        return str(erro)
+    return None
+
+def _tabelas_rapidas(pacientes):
+    """Caminho vetorizado: tabelas de eventos de todos os pacientes, recortadas pela máscara de cadastro."""
+    completas = construir_tabelas_eventos(pacientes)
+    return recortar_tabelas(completas, mascara_recorte(completas['pacientes']['createdAt'], DATA_INICIO))
+
+def _verificar_semanas(tipo, tabela, com_soma=False):
+    def verificar(pacientes, data_fim):
+        recorte = legado.filtrar_pacientes_legado(pacientes)
+        esperado = legado.totais_semanais_legado(recorte, tipo, DATA_INICIO, data_fim)
+        obtido = agregar_por_semana(
+            _tabelas_rapidas(pacientes)[tabela], DATA_INICIO, data_fim, coluna_soma='steps' if com_soma else None
+        )
+        if not com_soma:
+            esperado = esperado.drop(columns='soma')
+        return _comparar_tabelas(esperado, obtido)
+    return verificar
+
+def _verificar_tabela_semana(tipo, tabela, coluna_total, gerar_tabela):
+    def verificar(pacientes, data_fim):
+        recorte = legado.filtrar_pacientes_legado(pacientes)
+        esperado = legado.tabela_paciente_semana_legado(recorte, tipo, DATA_INICIO, data_fim, coluna_total)
+        obtido = gerar_tabela(_tabelas_rapidas(pacientes)[tabela], DATA_INICIO, data_fim)
+        return _comparar_tabelas(esperado, obtido)
+    return verificar
+
+def _verificar_ativos(pacientes, data_fim):
+    recorte = legado.filtrar_pacientes_legado(pacientes)
+    esperado = pd.DataFrame({'ativo': legado.pacientes_ativos_legado(recorte, data_fim)})
+    data_limite = data_fim - pd.Timedelta(days=legado.DIAS_ATIVIDADE_RECENTE)
+    obtido = pd.DataFrame({'ativo': pacientes_com_registro_recente(_tabelas_rapidas(pacientes), data_limite)})
+    return _comparar_tabelas(esperado, obtido)
+
+def _verificar_primeiro_acq(pacientes, data_fim):
+    esperado = legado.primeiros_acqs_legado(legado.filtrar_pacientes_legado(pacientes))
+    primeiros = primeiros_acqs(_tabelas_rapidas(pacientes)['acqs'])
+    status = primeiros['control_status'].fillna('N/A').astype(str).str.strip()
+    obtido = pd.DataFrame({
+        'patient_id': primeiros['patient_id'],
+        'average': primeiros['average'],
+        'control_status': status.where(status != '', 'N/A'),
+    })
+    return _comparar_tabelas(esperado, obtido)
+
+def _verificar_crises(pacientes, data_fim):
+    esperado = legado.duracoes_crises_legado(legado.filtrar_pacientes_legado(pacientes))
+    crises = _tabelas_rapidas(pacientes)['crises'].dropna(subset=['ts', 'final_ts'])
+    obtido = pd.DataFrame({
+        'patient_id': crises['patient_id'],
+        'duracao': (crises['final_ts'] - crises['ts']).dt.days,
+    })
+    return _comparar_tabelas(esperado, obtido)
+
+def _verificar_passos(pacientes, data_fim):
+    esperado = pd.DataFrame({'passos': legado.passos_por_paciente_legado(legado.filtrar_pacientes_legado(pacientes))})
+    tabelas = _tabelas_rapidas(pacientes)
+    passos = np.bincount(
+        tabelas['atividades']['patient_idx'].to_numpy(),
+        weights=tabelas['atividades']['steps'].to_numpy(),
+        minlength=len(tabelas['pacientes'])
+    ).astype('int64')
+    return _comparar_tabelas(esperado, pd.DataFrame({'passos': passos}))
+
+VERIFICACOES = {
+    'semanas_diarios': _verificar_semanas('diarios', 'diarios'),
+    'semanas_atividades': _verificar_semanas('atividades', 'atividades', com_soma=True),
+    'semanas_prescricoes': _verificar_semanas('prescricoes', 'prescricoes'),
+    'semanas_administracoes': _verificar_semanas('administracoes', 'administracoes'),
+    'tabela_administracoes_semana': _verificar_tabela_semana(
+        'administracoes', 'administracoes', 'total_administrations', gerar_tabela_administrations_semana),
+    'tabela_prescricoes_semana': _verificar_tabela_semana(
+        'prescricoes', 'prescricoes', 'total_prescriptions', gerar_tabela_prescriptions_semana),
+    'pacientes_ativos': _verificar_ativos,
+    'primeiro_acq': _verificar_primeiro_acq,
+    'duracao_crises': _verificar_crises,
+    'passos_por_paciente': _verificar_passos,
+}
+
+def _data_limite_semana(rng):
+    """Um instante nos limites de alguma semana do período analisado."""
+    inicio = inicio_semana_zero(DATA_INICIO).value + int(rng.integers(0, 40)) * NS_SEMANA
+    opcoes = [inicio, inicio + 6 * NS_DIA, inicio + 7 * NS_DIA - 10**6, inicio + 7 * NS_DIA, inicio - 1]
+    return opcoes[int(rng.integers(len(opcoes)))]
+
+def _forcar_limites(rng, pacientes, taxa=TAXA_LIMITES):
+    """Desloca uma fração das datas de eventos para limites de semana, onde os erros de borda aparecem."""
+    def talvez(registro, campo):
+        if campo in registro and rng.random() < taxa:
+            instante = np.datetime64(_data_limite_semana(rng), 'ns')
+            registro[campo] = f"{np.datetime_as_string(instante, unit='ms')}Z"
+
+    for paciente in pacientes:
+        for registro in paciente['symptomDiaries'] + paciente['activityLogs'] + paciente['acqs']:
+            talvez(registro, 'createdAt')
+        for presc in paciente['prescriptions']:
+            talvez(presc, 'createdAt')
+            for admin in presc['administrations']:
+                talvez(admin, 'date')
+        for crise in paciente['crisis']:
+            talvez(crise, 'initialUsageDate')
+            talvez(crise, 'finalUsageDate')
+    return pacientes
+
+def gerar_caso(semente, max_pacientes, taxa_datas_invalidas=0.0):
+    """Pacientes e data de referência de uma rodada, determinísticos pela semente."""
+    rng = np.random.default_rng(semente)
+    inicio_ns, fim_ns = periodo_historico(INICIO_PADRAO, MESES_PADRAO)
+    n_pacientes = int(rng.integers(1, max_pacientes + 1))
+    pacientes = [gerar_paciente(pos, semente, inicio_ns, fim_ns, taxa_datas_invalidas) for pos in range(n_pacientes)]
+    _forcar_limites(rng, pacientes)
+    data_fim = pd.Timestamp(int(rng.integers(DATA_INICIO.value, fim_ns)), tz='UTC')
+    return pacientes, data_fim
+
+def reduzir(pacientes, falha):
+    """
+    Delta debugging sobre a lista de pacientes: o menor subconjunto encontrado em que falha() ainda é verdadeira.
+
+    Args:
+        pacientes: Lista de pacientes que reproduz a falha
+        falha: Função(lista) -> bool
+    """
+    particoes = 2
+    while len(pacientes) >= 2:
+        tamanho = -(-len(pacientes) // particoes)
+        blocos = [pacientes[i:i + tamanho] for i in range(0, len(pacientes), tamanho)]
+        reduziu = False
+        for i, bloco in enumerate(blocos):
+            complemento = [p for j, outro in enumerate(blocos) if j != i for p in outro]
+            if falha(bloco):
+                pacientes, particoes, reduziu = bloco, 2, True
+                break
+            if len(blocos) > 2 and falha(complemento):
+                pacientes, particoes, reduziu = complemento, max(particoes - 1, 2), True
+                break
+        if not reduziu:
+            if particoes >= len(pacientes):
+                break
+            particoes = min(particoes * 2, len(pacientes))
+    return pacientes
+
+def executar(rodadas, max_pacientes, semente, taxa_datas_invalidas, diretorio_falhas, verificacoes=None):
+    """
+    Roda as verificações em `rodadas` casos aleatórios.
+
+    Returns:
+        Lista de falhas: dicts com verificação, semente, data_fim, diferença e o caso reduzido
+    """
+    nomes = verificacoes or list(VERIFICACOES)
+    falhas = []
+    for rodada in range(rodadas):
+        semente_caso = semente + rodada
+        pacientes, data_fim = gerar_caso(semente_caso, max_pacientes, taxa_datas_invalidas)
+        for nome in nomes:
+            verificar = VERIFICACOES[nome]
+            diferenca = verificar(pacientes, data_fim)
+            if diferenca is None:
+                continue
+            minimo = reduzir(pacientes, lambda lista: verificar(lista, data_fim) is not None)
+            falha = {
+                'verificacao': nome,
+                'semente': semente_caso,
+                'data_fim': data_fim.isoformat(),
+                'diferenca': verificar(minimo, data_fim),
+                'pacientes': minimo,
+            }
+            falhas.append(falha)
+            if diretorio_falhas:
+                os.makedirs(diretorio_falhas, exist_ok=True)
+                caminho = os.path.join(diretorio_falhas, f'{nome}_{semente_caso}.json')
+                with open(caminho, 'w', encoding='utf-8') as arquivo:
+                    json.dump(falha, arquivo, ensure_ascii=False, indent=2)
+            print(f'FALHA {nome} (semente {semente_caso}): reduzido a {len(minimo)} paciente(s)', file=sys.stderr)
+        print(f'rodada {rodada + 1}/{rodadas}: {len(pacientes)} pacientes, data_fim {data_fim:%d/%m/%Y}', file=sys.stderr)
+    return falhas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara os laços originais com os caminhos vetorizados.')
+    parser.add_argument('--rodadas', type=int, default=20, help='Quantidade de casos aleatórios')
+    parser.add_argument('--pacientes', type=int, default=60, help='Máximo de pacientes por caso')
+    parser.add_argument('--semente', type=int, default=0, help='Semente do primeiro caso')
+    parser.add_argument('--taxa-datas-invalidas', type=float, default=0.0,
+                        help='Fração de datas fora do padrão ISO nos exports gerados')
+    parser.add_argument('--verificacoes', help=f"Subconjunto separado por vírgula ({', '.join(VERIFICACOES)})")
+    parser.add_argument('--falhas', default='equivalencia_falhas', help='Diretório dos casos reduzidos que falharam')
+    args = parser.parse_args(argv)
+
+    verificacoes = args.verificacoes.split(',') if args.verificacoes else None
+    falhas = executar(args.rodadas, args.pacientes, args.semente, args.taxa_datas_invalidas, args.falhas, verificacoes)
+    if falhas:
+        print(f'{len(falhas)} verificação(ões) divergiram; casos reduzidos em {args.falhas}/', file=sys.stderr)
+        return 1
+    print('Todas as verificações coincidiram.', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
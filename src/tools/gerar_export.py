@@ -0,0 +1,208 @@
+"""
+Gerador determinístico de exports sintéticos do Inspirar, no formato {"data": {"result": [...]}}.
+
+Cada paciente é gerado a partir de uma semente própria (semente global + posição), então
+o mesmo comando produz sempre o mesmo arquivo e qualquer trecho pode ser regerado sem
+os anteriores. O arquivo é escrito em streaming, um paciente por vez, e pode passar de
+vários GB sem manter o conteúdo em memória.
+
+Uso (a partir de src/):
+    python -m tools.gerar_export --pacientes 100000 --saida ../data/sintetico_100k.json
+    python -m tools.gerar_export --pacientes 1000000 --meses 18 --taxa-datas-invalidas 0.01 --saida export.json.gz
+"""
+import argparse
+import gzip
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+INICIO_PADRAO = '2025-01-01'
+MESES_PADRAO = 12
+NS_DIA = 86_400 * 10**9
+
+# Datas fora do padrão ISO do export: interpretáveis pelo fallback (dateutil) ou inválidas
+DATAS_FORA_DO_PADRAO = ['March 20, 2025 08:15', 'Tue, 15 Apr 2025 10:00:00 GMT', '2025/05/02 14:30']
+DATAS_INVALIDAS = ['invalid-date', '2025-02-30T10:00:00Z', 'N/A', '']
+
+STATUS_ACQ = [(0.75, 'Controlada'), (1.5, 'Parcialmente controlada'), (np.inf, 'Não controlada')]
+
+def _datas_iso(ns):
+    """Converte nanossegundos UTC em strings ISO com milissegundos e sufixo Z, como no export real."""
+    if len(ns) == 0:
+        return []
+    return [f'{texto}Z' for texto in np.datetime_as_string(np.asarray(ns, dtype='datetime64[ns]'), unit='ms')]
+
+def _estragar_datas(rng, datas, taxa):
+    """Substitui uma fração `taxa` das datas por valores fora do padrão ISO ou inválidos."""
+    if taxa <= 0 or not datas:
+        return datas
+    for pos in np.flatnonzero(rng.random(len(datas)) < taxa):
+        opcoes = DATAS_FORA_DO_PADRAO if rng.random() < 0.5 else DATAS_INVALIDAS
+        datas[pos] = opcoes[rng.integers(len(opcoes))]
+    return datas
+
+def _instantes(rng, inicio_ns, fim_ns, quantidade):
+    """`quantidade` instantes uniformes e ordenados em [inicio_ns, fim_ns)."""
+    if quantidade <= 0 or fim_ns <= inicio_ns:
+        return np.empty(0, dtype='int64')
+    return np.sort(rng.integers(inicio_ns, fim_ns, size=quantidade))
+
+def gerar_paciente(posicao, semente, inicio_ns, fim_ns, taxa_datas_invalidas=0.0):
+    """
+    Gera um paciente sintético.
+
+    O cadastro cresce ao longo do período (mais contas recentes), cada paciente tem um
+    nível de engajamento (Beta) e um tempo de uso antes de abandonar o app (exponencial),
+    e os registros de cada funcionalidade seguem taxas diárias proporcionais a esse engajamento.
+
+    Args:
+        posicao: Posição do paciente no export (também compõe a semente)
+        semente: Semente global do export
+        inicio_ns: Início do histórico (ns UTC)
+        fim_ns: Fim do histórico (ns UTC), equivalente à data da extração
+        taxa_datas_invalidas: Fração das datas substituídas por valores fora do padrão ISO
+
+    Returns:
+        dict no formato de um item de data.result
+    """
+    rng = np.random.default_rng([semente, posicao])
+    cadastro = inicio_ns + int((fim_ns - inicio_ns) * np.sqrt(rng.random()))
+    engajamento = rng.beta(1.2, 2.5)
+    dias_uso = rng.exponential(120 * (0.3 + engajamento))
+    fim_uso = min(fim_ns, cadastro + int(dias_uso * NS_DIA))
+    dias_ativos = max((fim_uso - cadastro) / NS_DIA, 0)
+
+    def quantidade(taxa_diaria):
+        return int(rng.poisson(taxa_diaria * engajamento * dias_ativos))
+
+    def datas(ns):
+        return _estragar_datas(rng, _datas_iso(ns), taxa_datas_invalidas)
+
+    # Diários de sintomas: quase diários nos pacientes mais engajados
+    diarios = [{'createdAt': data} for data in datas(_instantes(rng, cadastro, fim_uso, quantidade(1.2)))]
+
+    # ACQ: questionário semanal/quinzenal, com escore entre 0 e 6
+    acqs = []
+    ns_acqs = _instantes(rng, cadastro, fim_uso, quantidade(0.15))
+    medias = np.clip(rng.normal(rng.uniform(0.5, 3.0), 0.6, size=len(ns_acqs)), 0, 6).round(2)
+    for data, media in zip(datas(ns_acqs), medias):
+        status = next(rotulo for limite, rotulo in STATUS_ACQ if media <= limite)
+        acqs.append({'createdAt': data, 'average': float(media), 'controlStatus': status})
+
+    # Registros de atividade física com passos (log-normal); alguns modelos usam outras chaves
+    atividades = []
+    ns_atividades = _instantes(rng, cadastro, fim_uso, quantidade(1.5))
+    passos = rng.lognormal(8.6, 0.55, size=len(ns_atividades)).astype('int64')
+    datas_atividades = datas(ns_atividades)
+    dias_atividades = _datas_iso((ns_atividades // NS_DIA) * NS_DIA)
+    formatos = rng.random(len(ns_atividades))
+    for data, dia, total, formato in zip(datas_atividades, dias_atividades, passos, formatos):
+        registro = {'createdAt': data, 'date': dia}
+        if formato < 0.9:
+            registro['steps'] = int(total)
+        elif formato < 0.95:
+            registro['stepCount'] = int(total)
+        else:
+            registro['data'] = {'steps': int(total)}
+        atividades.append(registro)
+
+    # Prescrições com administrações (adesão variável ao longo da prescrição)
+    prescricoes = []
+    ns_prescricoes = _instantes(rng, cadastro, fim_uso, min(rng.poisson(1.2), 5))
+    for numero, (ns_prescricao, data) in enumerate(zip(ns_prescricoes, datas(ns_prescricoes))):
+        adesao = rng.beta(2, 2)
+        dias_prescricao = max((fim_uso - ns_prescricao) / NS_DIA, 0)
+        ns_administracoes = _instantes(rng, ns_prescricao, fim_uso, int(rng.poisson(1.5 * adesao * dias_prescricao)))
+        prescricoes.append({
+            'id': f'rx-{posicao:07d}-{numero}',
+            'createdAt': data,
+            'administrations': [{'date': data_admin} for data_admin in datas(ns_administracoes)],
+        })
+
+    # Crises: poucas por paciente, com duração log-normal em horas
+    crises = []
+    ns_crises = _instantes(rng, cadastro, fim_uso, int(rng.poisson(0.01 * dias_ativos)))
+    ns_finais = ns_crises + (rng.lognormal(3.5, 1.0, size=len(ns_crises)) * 3600 * 10**9).astype('int64')
+    for inicio_crise, fim_crise, atualizacao in zip(datas(ns_crises), datas(ns_finais), _datas_iso(ns_finais)):
+        crises.append({'initialUsageDate': inicio_crise, 'finalUsageDate': fim_crise, 'updatedAt': atualizacao})
+
+    return {
+        'id': f'pac-{semente}-{posicao:07d}',
+        'age': int(rng.integers(18, 86)),
+        'gender': 'female' if rng.random() < 0.58 else 'male',
+        'height': round(float(rng.normal(1.66, 0.09)), 2),
+        'weight': int(rng.normal(74, 14)),
+        'createdAt': _estragar_datas(rng, _datas_iso([cadastro]), taxa_datas_invalidas)[0],
+        'symptomDiaries': diarios,
+        'acqs': acqs,
+        'activityLogs': atividades,
+        'prescriptions': prescricoes,
+        'crisis': crises,
+    }
+
+def periodo_historico(inicio=INICIO_PADRAO, meses=MESES_PADRAO):
+    """Início e fim (ns UTC) do histórico gerado."""
+    data_inicio = pd.Timestamp(inicio, tz='UTC')
+    return data_inicio.value, (data_inicio + pd.DateOffset(months=meses)).value
+
+def iterar_pacientes(n_pacientes, semente=0, inicio=INICIO_PADRAO, meses=MESES_PADRAO, taxa_datas_invalidas=0.0):
+    """Gera os pacientes do export um a um."""
+    inicio_ns, fim_ns = periodo_historico(inicio, meses)
+    for posicao in range(n_pacientes):
+        yield gerar_paciente(posicao, semente, inicio_ns, fim_ns, taxa_datas_invalidas)
+
+def escrever_export(saida, pacientes, progresso=None):
+    """
+    Escreve o export em streaming no formato {"data": {"result": [...]}}.
+
+    Args:
+        saida: Arquivo de texto aberto para escrita
+        pacientes: Iterável de pacientes (ex.: iterar_pacientes)
+        progresso: Função opcional chamada com a quantidade de pacientes já escritos
+
+    Returns:
+        Quantidade de pacientes escritos
+    """
+    saida.write('{"data": {"result": [\n')
+    total = 0
+    for paciente in pacientes:
+        if total:
+            saida.write(',\n')
+        saida.write(json.dumps(paciente, ensure_ascii=False, separators=(',', ':')))
+        total += 1
+        if progresso is not None and total % 10_000 == 0:
+            progresso(total)
+    saida.write('\n]}}\n')
+    return total
+
+def _abrir_saida(caminho):
+    if caminho == '-':
+        return sys.stdout
+    if caminho.endswith('.gz'):
+        return gzip.open(caminho, 'wt', encoding='utf-8')
+    return open(caminho, 'w', encoding='utf-8')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera um export sintético do Inspirar.')
+    parser.add_argument('--pacientes', type=int, default=1000, help='Quantidade de pacientes (padrão: 1000)')
+    parser.add_argument('--semente', type=int, default=0, help='Semente do gerador (padrão: 0)')
+    parser.add_argument('--inicio', default=INICIO_PADRAO, help=f'Início do histórico (padrão: {INICIO_PADRAO})')
+    parser.add_argument('--meses', type=int, default=MESES_PADRAO, help=f'Duração do histórico em meses (padrão: {MESES_PADRAO})')
+    parser.add_argument('--taxa-datas-invalidas', type=float, default=0.0,
+                        help='Fração das datas fora do padrão ISO ou inválidas (padrão: 0)')
+    parser.add_argument('--saida', default='-', help="Arquivo de saída (.json ou .json.gz); '-' para stdout")
+    args = parser.parse_args(argv)
+
+    pacientes = iterar_pacientes(args.pacientes, args.semente, args.inicio, args.meses, args.taxa_datas_invalidas)
+    saida = _abrir_saida(args.saida)
+    try:
+        total = escrever_export(saida, pacientes, progresso=lambda n: print(f'{n} pacientes...', file=sys.stderr))
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    print(f'{total} pacientes escritos em {args.saida}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Implementações de referência com os laços originais das seções, sobre a lista de pacientes do JSON.
+
+São cópias da lógica que as seções usavam antes das tabelas colunares (um laço por
+semana, por paciente e por registro, com dateutil em cada data), mantidas apenas para
+a verificação de equivalência (tools.equivalencia). Diferenças deliberadas, que seguem a
+política das tabelas de eventos: datas que o dateutil não interpreta são ignoradas e
+datas sem fuso são tratadas como UTC (os laços originais interrompiam a seção), e o
+primeiro ACQ é escolhido pela data interpretada, e não pelo texto da data.
+"""
+import pandas as pd
+from dateutil import parser
+
+from utils.data_processing import DATA_LIMITE_MARCO_2025
+from utils.semanas import MAX_SEMANAS, formatar_periodo_semana
+
+DIAS_ATIVIDADE_RECENTE = 45
+
+def data_legado(valor):
+    """Interpreta uma data como os laços originais (dateutil), ou None se não for possível."""
+    if not valor or not isinstance(valor, str):
+        return None
+    try:
+        data = pd.Timestamp(parser.parse(valor))
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return data.tz_localize('UTC') if data.tzinfo is None else data
+
+def filtrar_pacientes_legado(pacientes, data_limite=DATA_LIMITE_MARCO_2025):
+    """Recorte de cadastro paciente a paciente."""
+    filtrados = []
+    for paciente in pacientes:
+        data = data_legado(paciente.get('createdAt'))
+        if data is not None and data >= data_limite:
+            filtrados.append(paciente)
+    return filtrados
+
+def extrair_passos_legado(activity):
+    """Sondagem de chaves de passos da seção de atividades original."""
+    candidatas = ['steps', 'stepCount', 'totalSteps', 'passos', 'total_passos', 'quantity', 'count']
+    for k in candidatas:
+        v = activity.get(k)
+        if isinstance(v, (int, float)):
+            return int(v)
+    for cont_key in ['data', 'attributes', 'payload']:
+        cont = activity.get(cont_key)
+        if isinstance(cont, dict):
+            for k in candidatas:
+                v = cont.get(k)
+                if isinstance(v, (int, float)):
+                    return int(v)
+    return 0
+
+def semanas_legado(data_inicio, data_fim):
+    """Semanas do período como nos laços originais: (número, início, fim inclusivo)."""
+    semanas = []
+    for semana in range(MAX_SEMANAS):
+        semana_data = data_inicio + pd.Timedelta(weeks=semana)
+        if semana_data > data_fim:
+            break
+        inicio_semana = semana_data - pd.Timedelta(days=semana_data.weekday())
+        fim_semana = inicio_semana + pd.Timedelta(days=6)
+        semanas.append((semana, inicio_semana, fim_semana))
+    return semanas
+
+# Registros de cada tipo de evento: (lista de registros do paciente, campo de data, valor somado)
+def _diarios(paciente):
+    return [(d.get('createdAt'), 0) for d in paciente.get('symptomDiaries', []) or []]
+
+def _atividades(paciente):
+    return [(a.get('createdAt'), extrair_passos_legado(a)) for a in paciente.get('activityLogs', []) or []]
+
+def _prescricoes(paciente):
+    return [(p.get('createdAt'), 0) for p in paciente.get('prescriptions', []) or []]
+
+def _administracoes(paciente):
+    return [
+        (admin.get('date'), 0)
+        for presc in paciente.get('prescriptions', []) or []
+        for admin in presc.get('administrations', []) or []
+    ]
+
+EVENTOS_LEGADO = {
+    'diarios': _diarios,
+    'atividades': _atividades,
+    'prescricoes': _prescricoes,
+    'administracoes': _administracoes,
+}
+
+def totais_semanais_legado(pacientes, tipo, data_inicio, data_fim):
+    """
+    Laço semanal original: total de eventos, usuários ativos e soma (passos) por semana.
+
+    Returns:
+        DataFrame com week_number, total, active_users, soma (uma linha por semana do período)
+    """
+    registros = EVENTOS_LEGADO[tipo]
+    linhas = []
+    for semana, inicio_semana, fim_semana in semanas_legado(data_inicio, data_fim):
+        total = 0
+        usuarios_ativos = 0
+        soma = 0
+        for paciente in pacientes:
+            na_semana = 0
+            soma_paciente = 0
+            for valor_data, valor in registros(paciente):
+                data = data_legado(valor_data)
+                if data is not None and inicio_semana <= data <= fim_semana:
+                    na_semana += 1
+                    soma_paciente += valor
+            if na_semana > 0:
+                total += na_semana
+                usuarios_ativos += 1
+                soma += soma_paciente
+        linhas.append({'week_number': semana, 'total': total, 'active_users': usuarios_ativos, 'soma': soma})
+    return pd.DataFrame(linhas, columns=['week_number', 'total', 'active_users', 'soma'])
+
+def tabela_paciente_semana_legado(pacientes, tipo, data_inicio, data_fim, coluna_total):
+    """Laço original de gerar_tabela_administrations_semana / gerar_tabela_prescriptions_semana."""
+    registros = EVENTOS_LEGADO[tipo]
+    registros_detalhados = []
+    for semana, inicio_semana, fim_semana in semanas_legado(data_inicio, data_fim):
+        for paciente in pacientes:
+            total = 0
+            for valor_data, _ in registros(paciente):
+                data = data_legado(valor_data)
+                if data is not None and inicio_semana <= data <= fim_semana:
+                    total += 1
+            if total > 0:
+                registros_detalhados.append({
+                    'patient_id': paciente.get('id', 'N/A'),
+                    'week_period': formatar_periodo_semana(semana, data_inicio),
+                    'week_number': semana,
+                    coluna_total: total
+                })
+    return pd.DataFrame(registros_detalhados)
+
+def _tem_registro_recente(registros, campos_data, data_limite):
+    """Verifica se algum registro tem data >= data_limite (cópia da seção de ativos original)."""
+    if not isinstance(registros, list) or not registros:
+        return False
+    for item in registros:
+        if not isinstance(item, dict):
+            continue
+        for campo in campos_data:
+            data = data_legado(item.get(campo))
+            if data is not None and data >= data_limite:
+                return True
+    return False
+
+def pacientes_ativos_legado(pacientes, data_fim):
+    """Marcação original de paciente ativo (algum uso nos últimos DIAS_ATIVIDADE_RECENTE dias)."""
+    data_limite = data_fim - pd.Timedelta(days=DIAS_ATIVIDADE_RECENTE)
+    ativos = []
+    for paciente in pacientes:
+        prescricoes = [p for p in paciente.get('prescriptions', []) or [] if isinstance(p, dict)]
+        ativos.append(any([
+            _tem_registro_recente(paciente.get('symptomDiaries', []), ['createdAt'], data_limite),
+            _tem_registro_recente(paciente.get('acqs', []), ['createdAt', 'answeredAt'], data_limite),
+            _tem_registro_recente(paciente.get('activityLogs', []), ['createdAt', 'date'], data_limite),
+            _tem_registro_recente(prescricoes, ['createdAt'], data_limite),
+            any(_tem_registro_recente(p.get('administrations', []), ['date'], data_limite) for p in prescricoes),
+            _tem_registro_recente(paciente.get('crisis', []), ['initialUsageDate', 'finalUsageDate', 'updatedAt'], data_limite),
+        ]))
+    return ativos
+
+def _chave_acq(acq):
+    for campo in ['createdAt', 'answeredAt', 'date']:
+        data = data_legado(acq.get(campo))
+        if data is not None:
+            return (0, data.value)
+    return (1, 0)
+
+def primeiros_acqs_legado(pacientes):
+    """
+    Primeiro ACQ de cada paciente: o mais antigo pela primeira data interpretável entre
+    createdAt, answeredAt e date; ACQs sem data válida ficam por último.
+
+    Returns:
+        DataFrame com patient_id, average e control_status dos primeiros ACQs com escore entre 0 e 6
+    """
+    linhas = []
+    for paciente in pacientes:
+        acqs = paciente.get('acqs', [])
+        if not acqs:
+            continue
+        primeiro = sorted(acqs, key=_chave_acq)[0]
+        try:
+            score = float(primeiro.get('average'))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= score <= 6:
+            status = str(primeiro.get('controlStatus', 'N/A')).strip()
+            linhas.append({
+                'patient_id': paciente.get('id', 'N/A'),
+                'average': score,
+                'control_status': status if status and status != 'None' else 'N/A',
+            })
+    return pd.DataFrame(linhas, columns=['patient_id', 'average', 'control_status'])
+
+def duracoes_crises_legado(pacientes):
+    """Duração em dias de cada crise com início e fim válidos, como na seção de crises original."""
+    linhas = []
+    for paciente in pacientes:
+        for crise in paciente.get('crisis', []):
+            ini = data_legado(crise.get('initialUsageDate'))
+            fim = data_legado(crise.get('finalUsageDate'))
+            if ini is None or fim is None:
+                continue
+            linhas.append({'patient_id': paciente.get('id', 'N/A'), 'duracao': (fim - ini).days})
+    return pd.DataFrame(linhas, columns=['patient_id', 'duracao'])
+
+def passos_por_paciente_legado(pacientes):
+    """Total de passos de cada paciente com a sondagem de chaves original."""
+    return [
+        sum(extrair_passos_legado(a) for a in paciente.get('activityLogs', []) or [] if isinstance(a, dict))
+        for paciente in pacientes
+    ]
@@ -0,0 +1,110 @@
+"""
+Mapa diário de pacientes ativos, em bitmaps por funcionalidade.
+
+O mapa é montado uma vez a partir das tabelas de eventos, com as colunas de data de
+CAMPOS_DATA_ATIVIDADE (a mesma definição de uso da seção de pacientes ativos). Cada
+funcionalidade tem uma matriz uint8 com uma linha por dia (UTC) do período e os pacientes
+empacotados 8 por byte na ordem de patient_idx (bit mais significativo primeiro, como o
+np.packbits). Os pacientes distintos de uma janela qualquer são a união (OR) das linhas
+dos dias e uma contagem de bits, sem voltar aos eventos.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import CAMPOS_DATA_ATIVIDADE
+from utils.datas import NAT_NS
+from utils.semanas import NS_DIA
+
+# Quantidade de bits 1 de cada valor de byte
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+def construir_mapa_atividade(tabelas, data_inicio, data_fim):
+    """
+    Bitmaps diários de uso de cada funcionalidade entre data_inicio e data_fim.
+
+    Args:
+        tabelas: Tabelas de eventos de construir_tabelas_eventos (já recortadas)
+        data_inicio: Primeiro dia do mapa (Timestamp UTC; vale o dia da data)
+        data_fim: Último dia do mapa (inclusivo)
+
+    Returns:
+        dict com dia_zero (Timestamp UTC do primeiro dia), n_pacientes e funcionalidades
+        (tabela de eventos -> np.ndarray uint8 de forma (dias, ceil(n_pacientes / 8)))
+    """
+    n_pacientes = len(tabelas['pacientes'])
+    dia_zero = data_inicio.normalize()
+    n_dias = max(0, (data_fim.normalize() - dia_zero).days + 1)
+    n_bytes = (n_pacientes + 7) // 8
+
+    funcionalidades = {}
+    for nome_tabela, colunas in CAMPOS_DATA_ATIVIDADE.items():
+        df_eventos = tabelas[nome_tabela]
+        patient_idx = np.tile(df_eventos['patient_idx'].to_numpy(), len(colunas))
+        ns = np.concatenate([df_eventos[coluna].dt.as_unit('ns').array.asi8 for coluna in colunas])
+        dias = (ns - dia_zero.value) // NS_DIA
+        dentro = (ns != NAT_NS) & (dias >= 0) & (dias < n_dias)
+        dias, patient_idx = dias[dentro], patient_idx[dentro]
+
+        mapa = np.zeros((n_dias, n_bytes), dtype=np.uint8)
+        bits = (0x80 >> (patient_idx & 7)).astype(np.uint8)
+        np.bitwise_or.at(mapa, (dias, patient_idx >> 3), bits)
+        funcionalidades[nome_tabela] = mapa
+    return {'dia_zero': dia_zero, 'n_pacientes': n_pacientes, 'funcionalidades': funcionalidades}
+
+def dias_do_mapa(mapa):
+    """Datas (DatetimeIndex UTC, meia-noite) das linhas do mapa."""
+    n_dias = len(next(iter(mapa['funcionalidades'].values())))
+    return pd.date_range(mapa['dia_zero'], periods=n_dias, freq='D', unit='ns')
+
+def uniao_funcionalidades(mapa, funcionalidades=None):
+    """Bitmap diário de quem usou alguma das funcionalidades (padrão: todas)."""
+    nomes = funcionalidades or list(mapa['funcionalidades'])
+    return functools.reduce(np.bitwise_or, (mapa['funcionalidades'][nome] for nome in nomes))
+
+def contar_bits(bitmaps):
+    """Quantidade de pacientes marcados em cada bitmap (soma na última dimensão)."""
+    return _BITS_POR_BYTE[bitmaps].sum(axis=-1, dtype='int64')
+
+def uniao_janelas(bitmap, janela):
+    """
+    União móvel: a linha d passa a conter os pacientes ativos em algum dia de [d - janela + 1, d].
+
+    Dias anteriores ao início do mapa contam como vazios. Usa blocos de tamanho 2^k (cada
+    passada dobra o bloco com um OR deslocado) e junta dois blocos sobrepostos no final,
+    então custa log2(janela) passadas sobre o mapa em vez de uma por dia da janela.
+    """
+    def deslocar(matriz, dias):
+        deslocada = np.zeros_like(matriz)
+        if dias < len(matriz):
+            deslocada[dias:] = matriz[:len(matriz) - dias]
+        return deslocada
+
+    bloco, tamanho = bitmap, 1
+    while tamanho * 2 <= janela:
+        bloco = bloco | deslocar(bloco, tamanho)
+        tamanho *= 2
+    if tamanho == janela:
+        return bloco
+    return bloco | deslocar(bloco, janela - tamanho)
+
+def pacientes_ativos_intervalo(mapa, inicio, fim, funcionalidades=None):
+    """
+    Pacientes distintos com uso entre os dias inicio e fim (inclusive), limitados ao período do mapa.
+
+    Args:
+        mapa: Mapa de construir_mapa_atividade
+        inicio: Primeiro dia da janela (Timestamp UTC)
+        fim: Último dia da janela (Timestamp UTC)
+        funcionalidades: Tabelas de eventos consideradas (padrão: todas)
+
+    Returns:
+        np.ndarray bool com uma posição por paciente (ordem de patient_idx)
+    """
+    n_dias = len(next(iter(mapa['funcionalidades'].values())))
+    primeiro = max(0, (inicio.normalize() - mapa['dia_zero']).days)
+    ultimo = min(n_dias - 1, (fim.normalize() - mapa['dia_zero']).days)
+    bitmap = uniao_funcionalidades(mapa, funcionalidades)[primeiro:ultimo + 1]
+    uniao = np.bitwise_or.reduce(bitmap, axis=0) if len(bitmap) else np.zeros(bitmap.shape[1], dtype=np.uint8)
+    return np.unpackbits(uniao, count=mapa['n_pacientes']).astype(bool)
@@ -0,0 +1,137 @@
+"""
+Cache de processamento por conteúdo do arquivo, compartilhado entre reruns do Streamlit.
+
+Cada interação com um widget reexecuta o dashboard.py do início. Os resultados caros
+(dados ingeridos e agregados das seções, que não dependem do idioma) ficam guardados
+aqui, identificados pela impressão digital dos bytes enviados mais os parâmetros do
+cálculo. O cache vive no nível do módulo, então sobrevive aos reruns e é compartilhado
+entre sessões do mesmo processo. A remoção segue a ordem LRU, limitada por um
+orçamento de memória configurável pela variável de ambiente INSPIRAR_CACHE_MB.
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+ORCAMENTO_PADRAO_MB = 1024
+
+def impressao_digital(conteudo):
+    """Impressão digital (hash BLAKE2b) dos bytes do arquivo enviado."""
+    return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+
+def impressao_digital_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Mesma impressão digital de impressao_digital, lendo o arquivo em blocos."""
+    hash_arquivo = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            hash_arquivo.update(bloco)
+    return hash_arquivo.hexdigest()
+
+def impressao_recorte(impressao, coorte_inicio, coorte_fim):
+    """
+    Impressão digital dos dados vistos pelas seções: arquivo + intervalo da coorte.
+
+    É a chave dos agregados das seções no cache e nos pacotes pré-calculados.
+    """
+    fim = coorte_fim.value if coorte_fim is not None else ''
+    return impressao_digital(f"{impressao}|{coorte_inicio.value}|{fim}".encode())
+
+def estimar_tamanho(valor):
+    """Estimativa em bytes da memória ocupada por um resultado guardado no cache."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(v) for v in valor)
+    return sys.getsizeof(valor)
+
+class CacheLRU:
+    """Dicionário LRU limitado pelo total estimado de bytes dos valores guardados."""
+
+    def __init__(self, orcamento_bytes):
+        self.orcamento_bytes = orcamento_bytes
+        self.bytes_usados = 0
+        self._itens = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._itens:
+                return padrao
+            self._itens.move_to_end(chave)
+            return self._itens[chave][0]
+
+    def guardar(self, chave, valor):
+        tamanho = estimar_tamanho(valor)
+        with self._lock:
+            self.remover(chave)
+            # Um resultado maior que o orçamento inteiro não é guardado
+            if tamanho > self.orcamento_bytes:
+                return
+            self._itens[chave] = (valor, tamanho)
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.orcamento_bytes:
+                _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                self.bytes_usados -= tamanho_antigo
+
+    def remover(self, chave):
+        with self._lock:
+            if chave in self._itens:
+                _, tamanho = self._itens.pop(chave)
+                self.bytes_usados -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes_usados = 0
+
+def _orcamento_configurado():
+    try:
+        megabytes = float(os.environ.get('INSPIRAR_CACHE_MB', ORCAMENTO_PADRAO_MB))
+    except ValueError:
+        megabytes = ORCAMENTO_PADRAO_MB
+    return int(megabytes * 1024 * 1024)
+
+CACHE = CacheLRU(_orcamento_configurado())
+
+def memoizar(nome, impressao, parametros, calcular, prontos=None):
+    """
+    Devolve o resultado guardado para (nome, impressao, parametros) ou calcula e guarda.
+
+    Os resultados são compartilhados: quem os recebe não deve alterá-los no lugar.
+
+    Args:
+        nome: Identificador do cálculo (ex.: 'diarios_semanais')
+        impressao: Impressão digital dos dados; se None, calcula sem usar o cache
+        parametros: Tupla hashable com os demais parâmetros do cálculo
+        calcular: Função sem argumentos que produz o resultado
+        prontos: Resultados pré-calculados da sessão (nome do cálculo -> valor, ver
+            utils.pacotes.SECOES_PACOTE); se nome estiver nele, o valor é devolvido como está,
+            pois os parâmetros do pacote já são fixos. Não passam pelo cache compartilhado
+    """
+    if prontos is not None and nome in prontos:
+        return prontos[nome]
+    if impressao is None:
+        return calcular()
+    chave = (nome, impressao, parametros)
+    ausente = object()
+    valor = CACHE.obter(chave, ausente)
+    if valor is ausente:
+        valor = calcular()
+        CACHE.guardar(chave, valor)
+    return valor
@@ -1,82 +1,443 @@
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from dateutil import parser
+from utils.datas import NAT_NS, converter_iso_ns, ns_para_datas
+
+try:
+    import ijson
+except ImportError:  # sem ijson, a leitura em streaming recorre ao json.load
+    ijson = None
 
 # Constante para data limite: pacientes criados a partir de 01/03/2025
 DATA_LIMITE_MARCO_2025 = pd.Timestamp('2025-03-01').tz_localize('UTC')
 
+# Listas de registros de cada paciente e a coluna de contagem correspondente na tabela de pacientes
+COLUNAS_TOTAIS = {
+    'symptomDiaries': 'total_symptom_diaries',
+    'acqs': 'total_acqs',
+    'activityLogs': 'total_activity_logs',
+    'prescriptions': 'total_prescriptions',
+    'crisis': 'total_crisis',
+}
+
+# Colunas de data de cada tabela de eventos que contam como uso da funcionalidade
+CAMPOS_DATA_ATIVIDADE = {
+    'diarios': ['ts'],
+    'acqs': ['created_at', 'answered_at'],
+    'atividades': ['ts', 'date'],
+    'prescricoes': ['ts'],
+    'administracoes': ['ts'],
+    'crises': ['ts', 'final_ts', 'updated_at'],
+}
+
+# Tabelas com uma linha por paciente, na mesma ordem (posição = patient_idx)
+TABELAS_POR_PACIENTE = ('pacientes', 'ultimo_evento')
+
+# Chaves candidatas para o total de passos de um registro de atividade
+CHAVES_PASSOS = ['steps', 'stepCount', 'totalSteps', 'passos', 'total_passos', 'quantity', 'count']
+CONTAINERS_PASSOS = ['data', 'attributes', 'payload']
+# Fontes em ordem de prioridade: (container ou None para o próprio registro, chave)
+FONTES_PASSOS = [(None, chave) for chave in CHAVES_PASSOS] + [
+    (container, chave) for container in CONTAINERS_PASSOS for chave in CHAVES_PASSOS
+]
+SEM_FONTE_PASSOS = 'nenhuma'
+
 def carregar_json(uploaded_file):
     data = json.load(uploaded_file)
     return data
 
+def iterar_pacientes_export(arquivo):
+    """
+    Percorre data.result[] do export um paciente por vez.
+    
+    Com o ijson instalado, o JSON é lido de forma incremental e só o paciente atual fica
+    em memória como objeto Python; sem ele, o arquivo é carregado inteiro com json.load.
+    
+    Args:
+        arquivo: Arquivo binário (ex.: o UploadedFile do Streamlit)
+    
+    Yields:
+        dict de cada paciente, na ordem do export
+    
+    Raises:
+        ValueError: Se o JSON não tiver a lista data.result
+    """
+    if ijson is None:
+        data = carregar_json(arquivo)
+        if not isinstance(data, dict) or not isinstance(data.get('data'), dict) or 'result' not in data['data']:
+            raise ValueError("Invalid structure")
+        yield from data['data']['result']
+        return
+    
+    encontrou_result = False
+    
+    def eventos():
+        nonlocal encontrou_result
+        for prefixo, evento, valor in ijson.parse(arquivo, use_float=True):
+            if prefixo == 'data.result' and evento == 'start_array':
+                encontrou_result = True
+            yield prefixo, evento, valor
+    
+    yield from ijson.items(eventos(), 'data.result.item')
+    if not encontrou_result:
+        raise ValueError("Invalid structure")
+
 def processar_datas(df, col):
-    df[col] = pd.to_datetime(df[col], errors='coerce')
+    df[col] = converter_datas_utc(df[col])
     return df
 
-def filtrar_pacientes_marco_2025(pacientes, col_created_at='createdAt'):
+def mascara_recorte(datas_criacao, data_limite=DATA_LIMITE_MARCO_2025):
+    """
+    Máscara booleana dos pacientes criados a partir de data_limite.
+    
+    Args:
+        datas_criacao: Coluna 'createdAt' já convertida (datetime64 UTC)
+        data_limite: Início do recorte (padrão: 01/03/2025)
+    
+    Returns:
+        np.ndarray bool; datas ausentes ou inválidas ficam de fora
+    """
+    ns = pd.Series(datas_criacao).dt.as_unit('ns').array.asi8
+    return (ns != NAT_NS) & (ns >= data_limite.value)
+
+def indice_criacao(datas_criacao):
+    """
+    Índice dos pacientes ordenados por data de criação, para recortes por intervalo com busca binária.
+    
+    Args:
+        datas_criacao: Coluna 'createdAt' já convertida (datetime64 UTC)
+    
+    Returns:
+        dict com:
+        - 'ns': datas de criação ordenadas (int64 em ns, sem as ausentes)
+        - 'posicoes': posição de cada uma dessas datas na tabela de pacientes
+        - 'total': quantidade total de pacientes (inclusive sem data)
+    """
+    ns = pd.Series(datas_criacao).dt.as_unit('ns').array.asi8
+    validos = np.flatnonzero(ns != NAT_NS)
+    ordem = validos[np.argsort(ns[validos], kind='stable')]
+    return {'ns': ns[ordem], 'posicoes': ordem, 'total': len(ns)}
+
+def mascara_intervalo_criacao(indice, data_inicio, data_fim=None):
+    """
+    Máscara dos pacientes com data_inicio <= createdAt <= data_fim, via searchsorted no índice.
+    
+    Args:
+        indice: Resultado de indice_criacao
+        data_inicio: Início do intervalo (Timestamp UTC, inclusivo)
+        data_fim: Fim do intervalo (Timestamp UTC, inclusivo); None = sem limite superior
+    
+    Returns:
+        np.ndarray bool com uma posição por paciente, pronto para recortar_tabelas
+    """
+    inicio = np.searchsorted(indice['ns'], data_inicio.value, side='left')
+    fim = len(indice['ns']) if data_fim is None else np.searchsorted(indice['ns'], data_fim.value, side='right')
+    mascara = np.zeros(indice['total'], dtype=bool)
+    mascara[indice['posicoes'][inicio:fim]] = True
+    return mascara
+
+def filtrar_pacientes_marco_2025(pacientes, col_created_at='createdAt', data_limite=DATA_LIMITE_MARCO_2025):
     """
     Filtra pacientes criados a partir de março de 2025 (01/03/2025).
     
     CRÍTICO: Esta função garante que apenas pacientes com contas criadas a partir
     de 01/03/2025 sejam incluídos nas análises e gráficos do dashboard.
     
+    Lista e DataFrame passam pela mesma máscara (mascara_recorte), calculada uma única
+    vez sobre as datas convertidas.
+    
     Args:
         pacientes: Lista de dicionários de pacientes OU DataFrame pandas
         col_created_at: Nome da coluna com data de criação (padrão: 'createdAt')
+        data_limite: Início do recorte (padrão: 01/03/2025), para reutilizar com outras coortes
     
     Returns:
         - Se entrada for DataFrame: DataFrame filtrado
         - Se entrada for lista: Lista filtrada de dicionários
-        - Apenas pacientes com createdAt >= 2025-03-01 são retornados
+        - Apenas pacientes com createdAt >= data_limite são retornados
     """
     if isinstance(pacientes, pd.DataFrame):
-        # Se for DataFrame
         df = pacientes.copy()
-        if col_created_at in df.columns:
-            # Garantir que a coluna está como datetime
-            if not pd.api.types.is_datetime64_any_dtype(df[col_created_at]):
-                df[col_created_at] = pd.to_datetime(df[col_created_at], errors='coerce')
-            # Filtrar pacientes criados a partir de março/2025
-            df_filtrado = df[df[col_created_at] >= DATA_LIMITE_MARCO_2025]
-            return df_filtrado
-        return df
-    else:
-        # Se for lista de dicionários
-        pacientes_filtrados = []
-        for paciente in pacientes:
-            data_cadastro = paciente.get(col_created_at)
-            if data_cadastro:
-                # Converter string para datetime se necessário
-                if isinstance(data_cadastro, str):
-                    try:
-                        data_cadastro = parser.parse(data_cadastro)
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Converter para Timestamp com timezone UTC se necessário
-                if isinstance(data_cadastro, pd.Timestamp):
-                    data_ts = data_cadastro
-                elif hasattr(data_cadastro, 'tzinfo'):
-                    # datetime com ou sem timezone
-                    if data_cadastro.tzinfo is None:
-                        data_ts = pd.Timestamp(data_cadastro).tz_localize('UTC')
-                    else:
-                        data_ts = pd.Timestamp(data_cadastro)
-                else:
-                    # Tentar converter para Timestamp
-                    try:
-                        data_ts = pd.Timestamp(data_cadastro)
-                        if data_ts.tzinfo is None:
-                            data_ts = data_ts.tz_localize('UTC')
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Verificar se data é >= 01/03/2025
-                if data_ts >= DATA_LIMITE_MARCO_2025:
-                    pacientes_filtrados.append(paciente)
+        if col_created_at not in df.columns:
+            return df
+        # Garantir que a coluna está como datetime UTC
+        if not pd.api.types.is_datetime64_any_dtype(df[col_created_at]):
+            df[col_created_at] = converter_datas_utc(df[col_created_at]).set_axis(df.index)
+        elif df[col_created_at].dt.tz is None:
+            df[col_created_at] = df[col_created_at].dt.tz_localize('UTC')
+        return df[mascara_recorte(df[col_created_at], data_limite)]
+    
+    # Lista de dicionários: converter todas as datas de cadastro em lote
+    datas = converter_datas_utc([paciente.get(col_created_at) for paciente in pacientes])
+    indices = np.flatnonzero(mascara_recorte(datas, data_limite))
+    return [pacientes[i] for i in indices]
+
+def recortar_tabelas(tabelas, mascara):
+    """
+    Aplica uma máscara de pacientes a todas as tabelas de eventos de uma vez.
+    
+    Args:
+        tabelas: Resultado de construir_tabelas_eventos
+        mascara: np.ndarray bool com uma posição por linha de tabelas['pacientes']
+    
+    Returns:
+        dict no mesmo formato, com os pacientes selecionados (também nas demais tabelas de
+        TABELAS_POR_PACIENTE), os eventos apenas desses
+        pacientes e 'patient_idx' renumerado para a nova posição de cada paciente
+        (a posição original de cada paciente é np.flatnonzero(mascara))
+    """
+    mascara = np.asarray(mascara, dtype=bool)
+    indices = np.flatnonzero(mascara)
+    # Nova posição de cada paciente selecionado (-1 para os demais)
+    nova_posicao = np.full(len(mascara), -1, dtype='int64')
+    nova_posicao[indices] = np.arange(len(indices))
+    
+    recorte = {}
+    for nome, df in tabelas.items():
+        if nome in TABELAS_POR_PACIENTE:
+            df = df.iloc[indices].reset_index(drop=True)
+        elif 'patient_idx' in df.columns:
+            posicoes = nova_posicao[df['patient_idx'].to_numpy()]
+            manter = posicoes >= 0
+            df = df.loc[manter].reset_index(drop=True)
+            df['patient_idx'] = posicoes[manter]
+        recorte[nome] = df
+    return recorte
+
+def resolver_passos(valores_steps, sem_steps):
+    """
+    Total de passos de cada registro de atividade, resolvido uma fonte por vez.
+
+    'steps' (primeira fonte de FONTES_PASSOS) é a de quase todos os registros: seus valores
+    são coletados na ingestão e convertidos de uma vez. Só os registros em que 'steps' não é
+    numérico, guardados à parte para não manter todos os registros em memória, passam pelas
+    demais fontes, em ordem de prioridade e numa passada por fonte sobre os que ainda não
+    têm valor. Vale a primeira fonte com valor int ou float (truncado; não finito vira 0);
+    registros sem nenhuma ficam com 0.
+
+    Args:
+        valores_steps: Valor de 'steps' de cada registro (0 nos registros de sem_steps)
+        sem_steps: dict posição -> registro, dos registros cujo 'steps' não é int ou float
+
+    Returns:
+        Tupla (passos, relatorio): np.ndarray int64 com os passos de cada registro e
+        DataFrame com as colunas fonte e registros (quantos registros vieram de cada fonte,
+        só as usadas, e SEM_FONTE_PASSOS para os sem valor)
+    """
+    passos = np.zeros(len(valores_steps), dtype='int64')
+    relatorio = []
+
+    def atribuir(fonte, posicoes, valores):
+        numeros = np.asarray(valores, dtype='float64')
+        finitos = np.isfinite(numeros) & (np.abs(numeros) < 2.0**63)
+        passos[posicoes[finitos]] = np.trunc(numeros[finitos]).astype('int64')
+        relatorio.append({'fonte': fonte, 'registros': len(posicoes)})
+
+    com_steps = np.ones(len(valores_steps), dtype=bool)
+    com_steps[list(sem_steps)] = False
+    if com_steps.any():
+        atribuir(CHAVES_PASSOS[0], np.flatnonzero(com_steps), np.asarray(valores_steps, dtype='float64')[com_steps])
+
+    pendentes = list(sem_steps.items())
+    for container, chave in FONTES_PASSOS[1:]:
+        if not pendentes:
+            break
+        origens = (registro if container is None else registro.get(container) for _, registro in pendentes)
+        valores = [origem.get(chave) if isinstance(origem, dict) else None for origem in origens]
+        numericos = [isinstance(valor, (int, float)) for valor in valores]
+        if not any(numericos):
+            continue
+        atribuir(
+            chave if container is None else f'{container}.{chave}',
+            np.array([posicao for (posicao, _), numerico in zip(pendentes, numericos) if numerico], dtype='int64'),
+            [valor for valor, numerico in zip(valores, numericos) if numerico]
+        )
+        pendentes = [item for item, numerico in zip(pendentes, numericos) if not numerico]
+    if pendentes:
+        relatorio.append({'fonte': SEM_FONTE_PASSOS, 'registros': len(pendentes)})
+    return passos, pd.DataFrame(relatorio, columns=['fonte', 'registros'])
+
+def fontes_passos(relatorio_passos):
+    """Relatório de resolver_passos como dict fonte -> registros (para manifests e sessão)."""
+    return {fonte: int(registros) for fonte, registros in zip(relatorio_passos['fonte'], relatorio_passos['registros'])}
+
+def converter_datas_utc(valores, relatorio=None, nome=None):
+    """
+    Converte uma sequência de datas ISO (strings) para datetime64[ns, UTC].
+    
+    Valores ausentes, que não sejam string ou que não possam ser interpretados viram NaT.
+    Se `relatorio` for uma lista, acrescenta a ela as contagens da conversão (ver
+    utils.datas.converter_iso_ns) identificadas por `nome`.
+    """
+    ns, contagens = converter_iso_ns(valores)
+    if relatorio is not None:
+        relatorio.append({'campo': nome, **contagens})
+    return ns_para_datas(ns)
+
+def _registros(paciente, campo):
+    registros = paciente.get(campo)
+    if not isinstance(registros, list):
+        return []
+    return [r for r in registros if isinstance(r, dict)]
+
+def tabela_ultimo_evento(tabelas, n_pacientes):
+    """
+    Data do último registro de cada paciente em cada funcionalidade.
+
+    Uma única passada pelas colunas de CAMPOS_DATA_ATIVIDADE (máximo por patient_idx); com
+    ela, saber quem está ativo numa janela qualquer é uma comparação vetorizada.
+
+    Args:
+        tabelas: Tabelas de eventos de construir_tabelas_eventos
+        n_pacientes: Quantidade de linhas da tabela de pacientes
+
+    Returns:
+        DataFrame com uma linha por paciente (ordem de 'pacientes') e uma coluna
+        datetime64[ns, UTC] por tabela de CAMPOS_DATA_ATIVIDADE (NaT sem registro com data)
+    """
+    ultimo = {}
+    for nome_tabela, colunas in CAMPOS_DATA_ATIVIDADE.items():
+        df_eventos = tabelas[nome_tabela]
+        patient_idx = df_eventos['patient_idx'].to_numpy()
+        maximo = np.full(n_pacientes, NAT_NS, dtype='int64')
+        for coluna in colunas:
+            # NaT é o menor int64, então não altera o máximo
+            np.maximum.at(maximo, patient_idx, df_eventos[coluna].dt.as_unit('ns').array.asi8)
+        ultimo[nome_tabela] = ns_para_datas(maximo)
+    return pd.DataFrame(ultimo)
+
+def construir_tabelas_eventos(pacientes):
+    """
+    Achata os registros aninhados de cada paciente em tabelas colunares, uma única vez por upload.
+    
+    As datas são convertidas para datetime64[ns, UTC] aqui, de modo que as seções não precisam
+    mais percorrer os dicionários nem interpretar strings ISO novamente.
+    
+    Args:
+        pacientes: Lista ou iterável de dicionários de pacientes (data.result do export);
+            é percorrido uma única vez, então pode ser um gerador em streaming
+    
+    Returns:
+        dict de DataFrames:
+        - 'pacientes': uma linha por paciente com os campos escalares, 'createdAt' convertido e as
+          contagens de COLUNAS_TOTAIS (a posição da linha é o 'patient_idx' das demais tabelas)
+        - 'diarios': patient_idx, patient_id, ts
+        - 'acqs': patient_idx, patient_id, ts, created_at, answered_at, average, control_status
+        - 'atividades': patient_idx, patient_id, ts, date, steps
+        - 'prescricoes': patient_idx, patient_id, ts, prescription_id, n_administrations
+        - 'administracoes': patient_idx, patient_id, ts
+        - 'crises': patient_idx, patient_id, ts, final_ts, updated_at
+        - 'ultimo_evento': uma linha por paciente com a data do último registro em cada
+          funcionalidade (ver tabela_ultimo_evento)
+        - 'relatorio_datas': uma linha por campo de data com as contagens de conversão
+          (total, iso, fallback, falhas)
+        - 'relatorio_passos': quantos registros de atividade tiveram os passos lidos de cada
+          fonte (ver resolver_passos)
+    """
+    linhas_pacientes = []
+    relatorio_datas = []
+    diarios = {'patient_idx': [], 'createdAt': []}
+    acqs = {'patient_idx': [], 'createdAt': [], 'answeredAt': [], 'date': [], 'average': [], 'control_status': []}
+    atividades = {'patient_idx': [], 'createdAt': [], 'date': []}
+    passos_atividades = []
+    atividades_sem_steps = {}
+    prescricoes = {'patient_idx': [], 'createdAt': [], 'prescription_id': [], 'n_administrations': []}
+    administracoes = {'patient_idx': [], 'date': []}
+    crises = {'patient_idx': [], 'initialUsageDate': [], 'finalUsageDate': [], 'updatedAt': []}
+    
+    for idx, paciente in enumerate(pacientes):
+        linha = {k: v for k, v in paciente.items() if k not in COLUNAS_TOTAIS}
+        for campo, coluna_total in COLUNAS_TOTAIS.items():
+            registros = paciente.get(campo)
+            linha[coluna_total] = len(registros) if isinstance(registros, list) else 0
+        linhas_pacientes.append(linha)
+        
+        for diary in _registros(paciente, 'symptomDiaries'):
+            diarios['patient_idx'].append(idx)
+            diarios['createdAt'].append(diary.get('createdAt'))
         
-        return pacientes_filtrados
+        for acq in _registros(paciente, 'acqs'):
+            acqs['patient_idx'].append(idx)
+            acqs['createdAt'].append(acq.get('createdAt'))
+            acqs['answeredAt'].append(acq.get('answeredAt'))
+            acqs['date'].append(acq.get('date'))
+            acqs['average'].append(acq.get('average'))
+            acqs['control_status'].append(acq.get('controlStatus'))
+        
+        for activity in _registros(paciente, 'activityLogs'):
+            atividades['patient_idx'].append(idx)
+            atividades['createdAt'].append(activity.get('createdAt'))
+            atividades['date'].append(activity.get('date'))
+            passos = activity.get('steps')
+            if not isinstance(passos, (int, float)):
+                # As demais fontes de passos são lidas depois, só para estes registros
+                atividades_sem_steps[len(passos_atividades)] = activity
+                passos = 0
+            passos_atividades.append(passos)
+        
+        for presc in _registros(paciente, 'prescriptions'):
+            admins = _registros(presc, 'administrations')
+            prescricoes['patient_idx'].append(idx)
+            prescricoes['createdAt'].append(presc.get('createdAt'))
+            prescricoes['prescription_id'].append(presc.get('id', 'N/A'))
+            prescricoes['n_administrations'].append(len(admins))
+            for admin in admins:
+                administracoes['patient_idx'].append(idx)
+                administracoes['date'].append(admin.get('date'))
+        
+        for crise in _registros(paciente, 'crisis'):
+            crises['patient_idx'].append(idx)
+            crises['initialUsageDate'].append(crise.get('initialUsageDate'))
+            crises['finalUsageDate'].append(crise.get('finalUsageDate'))
+            crises['updatedAt'].append(crise.get('updatedAt'))
+    
+    df_pacientes = pd.DataFrame(linhas_pacientes)
+    for coluna_total in COLUNAS_TOTAIS.values():
+        if coluna_total not in df_pacientes.columns:
+            df_pacientes[coluna_total] = pd.Series(dtype='int64')
+    if 'createdAt' in df_pacientes.columns:
+        df_pacientes['createdAt'] = converter_datas_utc(df_pacientes['createdAt'], relatorio_datas, 'createdAt')
+    else:
+        # Sem data de cadastro nenhum paciente entra no recorte (ver mascara_recorte)
+        df_pacientes['createdAt'] = ns_para_datas(np.full(len(df_pacientes), NAT_NS, dtype='int64'))
+    ids = df_pacientes['id'].to_numpy() if 'id' in df_pacientes.columns else np.full(len(df_pacientes), 'N/A', dtype=object)
+    
+    def tabela(campo, colunas, datas):
+        """Monta a tabela de um tipo de registro convertendo as colunas de data indicadas."""
+        patient_idx = np.asarray(colunas.pop('patient_idx'), dtype='int64')
+        df = pd.DataFrame({'patient_idx': patient_idx, 'patient_id': ids[patient_idx]})
+        for origem, destino in datas.items():
+            df[destino] = converter_datas_utc(colunas.pop(origem), relatorio_datas, f'{campo}.{origem}')
+        for coluna, valores in colunas.items():
+            df[coluna] = valores
+        return df
+    
+    df_acqs = tabela('acqs', acqs, {'createdAt': 'created_at', 'answeredAt': 'answered_at', 'date': 'date'})
+    # Data de referência do ACQ: createdAt, depois answeredAt, depois date
+    df_acqs.insert(2, 'ts', df_acqs['created_at'].fillna(df_acqs['answered_at']).fillna(df_acqs['date']))
+    df_acqs = df_acqs.drop(columns='date')
+    df_acqs['average'] = pd.to_numeric(pd.Series(df_acqs['average'], dtype=object), errors='coerce').astype('float64')
+    
+    df_atividades = tabela('activityLogs', atividades, {'createdAt': 'ts', 'date': 'date'})
+    df_atividades['steps'], relatorio_passos = resolver_passos(passos_atividades, atividades_sem_steps)
+    
+    df_prescricoes = tabela('prescriptions', prescricoes, {'createdAt': 'ts'})
+    df_prescricoes['n_administrations'] = df_prescricoes['n_administrations'].astype('int64')
+    
+    tabelas = {
+        'pacientes': df_pacientes,
+        'diarios': tabela('symptomDiaries', diarios, {'createdAt': 'ts'}),
+        'acqs': df_acqs,
+        'atividades': df_atividades,
+        'prescricoes': df_prescricoes,
+        'administracoes': tabela('prescriptions.administrations', administracoes, {'date': 'ts'}),
+        'crises': tabela('crisis', crises, {'initialUsageDate': 'ts', 'finalUsageDate': 'final_ts', 'updatedAt': 'updated_at'}),
+    }
+    tabelas['ultimo_evento'] = tabela_ultimo_evento(tabelas, len(df_pacientes))
+    tabelas['relatorio_datas'] = pd.DataFrame(relatorio_datas, columns=['campo', 'total', 'iso', 'fallback', 'falhas'])
+    tabelas['relatorio_passos'] = relatorio_passos
+    return tabelas
 
 def obter_periodo_dados(df, col_data='createdAt'):
     """
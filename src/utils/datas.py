@@ -0,0 +1,57 @@
+"""
+Conversão em lote de datas ISO-8601 do export para nanossegundos UTC.
+
+O caminho rápido é um único pd.to_datetime(format='ISO8601', utc=True) sobre o array
+inteiro; só os valores que ele não reconhece são enviados, um a um, ao dateutil.
+Cada conversão devolve também um relatório com quantos valores precisaram do
+fallback e quantos não puderam ser interpretados.
+"""
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+NAT_NS = np.iinfo('int64').min
+
+def converter_iso_ns(valores):
+    """
+    Converte uma sequência de datas (strings ISO) para int64 em nanossegundos UTC.
+
+    Valores ausentes ou que não sejam string são tratados como ausentes (NAT_NS).
+    Datas sem fuso horário são consideradas UTC.
+
+    Args:
+        valores: Sequência de valores de data (ex.: coluna 'createdAt' do export)
+
+    Returns:
+        Tupla (ns, relatorio):
+        - ns: np.ndarray int64 com NAT_NS nas posições ausentes ou inválidas
+        - relatorio: dict com 'total' (strings não vazias), 'iso' (caminho rápido),
+          'fallback' (interpretadas pelo dateutil) e 'falhas' (não interpretadas)
+    """
+    textos = pd.Series([v if isinstance(v, str) and v else None for v in valores], dtype=object)
+    datas = pd.to_datetime(textos, utc=True, errors='coerce', format='ISO8601')
+    ns = np.array(datas.dt.as_unit('ns').array.asi8, dtype='int64')
+
+    presentes = textos.notna().to_numpy()
+    pendentes = np.flatnonzero(presentes & (ns == NAT_NS))
+    falhas = 0
+    for pos in pendentes:
+        try:
+            data = pd.Timestamp(parser.parse(textos.iat[pos]))
+            data = data.tz_localize('UTC') if data.tzinfo is None else data.tz_convert('UTC')
+            ns[pos] = data.as_unit('ns').value
+        except (ValueError, TypeError, OverflowError):
+            falhas += 1
+
+    total = int(presentes.sum())
+    relatorio = {
+        'total': total,
+        'iso': total - len(pendentes),
+        'fallback': len(pendentes) - falhas,
+        'falhas': falhas,
+    }
+    return ns, relatorio
+
+def ns_para_datas(ns):
+    """Converte int64 em nanossegundos (NAT_NS = ausente) para uma Série datetime64[ns, UTC]."""
+    return pd.Series(pd.to_datetime(np.asarray(ns, dtype='int64'), unit='ns', utc=True))
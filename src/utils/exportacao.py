@@ -0,0 +1,253 @@
+"""
+Cálculo das tabelas de todas as seções e exportação completa em ZIP.
+
+CALCULOS reúne, por seção, o cálculo do compute/ com as mesmas entradas e parâmetros que
+o dashboard usa; é compartilhado pelo tools.agregados (arquivos em disco, em paralelo) e
+pela exportação do dashboard, que monta um ZIP numa thread separada do rerun. O ZIP é
+gravado tabela por tabela direto no arquivo, sem manter todos os CSVs em memória, e
+termina com um manifest.json (linhas e colunas de cada tabela e data de referência).
+"""
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+
+from compute.ativos import calcular_ativos
+from compute.atividades_semanais import calcular_atividades_semanais
+from compute.barplot_metricas import preparar_metricas, calcular_distribuicao
+from compute.crises import calcular_crises
+from compute.diarios_semanais import calcular_diarios_semanais
+from compute.engajamento import calcular_engajamento
+from compute.funcionalidades_geral import calcular_funcionalidades_geral
+from compute.funcionalidades_sexo import calcular_funcionalidades_sexo
+from compute.idade import calcular_idade
+from compute.mapa_calor import calcular_mapa_calor
+from compute.metricas import calcular_metricas
+from compute.prescricoes_semanais import calcular_prescricoes_semanais
+from compute.recordes import calcular_recordes, passos_por_paciente
+from compute.status_acq import calcular_status_acq
+from compute.tabelas import faixa_idades, filtrar_por_idade
+from utils.atividade_diaria import construir_mapa_atividade
+from utils.pacotes import separar_resultado
+
+# Mudanças na estrutura dos arquivos ou do manifest devem incrementar a versão
+VERSAO_AGREGADOS = 1
+ARQUIVO_MANIFESTO = 'manifest.json'
+
+# --------- Cálculo de cada seção ---------
+# Mesmas entradas e parâmetros que as seções usam no dashboard. As seções de SECOES_PACOTE
+# mantêm a estrutura do resultado do compute/ (o dashboard recebe esses objetos do pacote);
+# os dados por paciente ganham tabelas com o id do paciente para serem úteis fora do dashboard
+
+def _metricas(tabelas, data_inicio, data_fim):
+    return calcular_metricas(tabelas['pacientes'])
+
+def _ativos(tabelas, data_inicio, data_fim):
+    ativos = calcular_ativos(tabelas, data_fim)
+    # A seção não usa o array por paciente
+    ativos['is_ativo'] = pd.DataFrame({'id': tabelas['pacientes']['id'], 'ativo': ativos['is_ativo']})
+    # Último registro por funcionalidade, para recalcular outras janelas fora do dashboard
+    ativos['ultimo_evento'] = tabelas['ultimo_evento'].assign(id=tabelas['pacientes']['id'].to_numpy())[
+        ['id', *tabelas['ultimo_evento'].columns]
+    ]
+    return ativos
+
+def _engajamento(tabelas, data_inicio, data_fim):
+    return calcular_engajamento(construir_mapa_atividade(tabelas, data_inicio, data_fim))
+
+def _idade(tabelas, data_inicio, data_fim):
+    dados = calcular_idade(tabelas['pacientes'])
+    if dados is None:
+        return {}
+    # As idades de cada paciente já estão na tabela da seção tabelas
+    del dados['idades']
+    return dados
+
+def _barplot_metricas(tabelas, data_inicio, data_fim):
+    df_metricas, metricas = preparar_metricas(tabelas['pacientes'])
+    distribuicoes = {}
+    for nome, coluna in metricas.items():
+        distribuicao = calcular_distribuicao(df_metricas, coluna, nome)
+        # Os valores brutos estão na tabela individual
+        del distribuicao['valores']
+        distribuicoes[coluna] = distribuicao
+    return distribuicoes
+
+def _crises(tabelas, data_inicio, data_fim):
+    return calcular_crises(tabelas)
+
+def _prescricoes_semanais(tabelas, data_inicio, data_fim):
+    return calcular_prescricoes_semanais(tabelas, data_inicio, data_fim)
+
+def _status_acq(tabelas, data_inicio, data_fim):
+    return calcular_status_acq(tabelas)
+
+def _diarios_semanais(tabelas, data_inicio, data_fim):
+    return calcular_diarios_semanais(tabelas['diarios'], data_inicio, data_fim)
+
+def _atividades_semanais(tabelas, data_inicio, data_fim):
+    return calcular_atividades_semanais(tabelas['atividades'], data_inicio, data_fim)
+
+def _recordes(tabelas, data_inicio, data_fim):
+    recordes = calcular_recordes(tabelas, data_fim)
+    passos = passos_por_paciente(tabelas['pacientes'], tabelas['atividades'])
+    recordes['passos_paciente'] = pd.DataFrame({'id': tabelas['pacientes']['id'], 'passos': passos})[passos > 0]
+    return recordes
+
+def _funcionalidades_geral(tabelas, data_inicio, data_fim):
+    return calcular_funcionalidades_geral(tabelas['pacientes'])
+
+def _funcionalidades_sexo(tabelas, data_inicio, data_fim):
+    return calcular_funcionalidades_sexo(tabelas['pacientes']) or {}
+
+def _mapa_calor(tabelas, data_inicio, data_fim):
+    return calcular_mapa_calor(tabelas['pacientes'])
+
+def _tabelas(tabelas, data_inicio, data_fim):
+    df_pacientes = tabelas['pacientes']
+    return {'pacientes': filtrar_por_idade(df_pacientes, *faixa_idades(df_pacientes))}
+
+# Seções na ordem do dashboard
+CALCULOS = {
+    'metricas': _metricas,
+    'ativos': _ativos,
+    'engajamento': _engajamento,
+    'idade': _idade,
+    'barplot_metricas': _barplot_metricas,
+    'crises': _crises,
+    'prescricoes_semanais': _prescricoes_semanais,
+    'status_acq': _status_acq,
+    'diarios_semanais': _diarios_semanais,
+    'atividades_semanais': _atividades_semanais,
+    'recordes': _recordes,
+    'funcionalidades_geral': _funcionalidades_geral,
+    'funcionalidades_sexo': _funcionalidades_sexo,
+    'mapa_calor': _mapa_calor,
+    'tabelas': _tabelas,
+}
+
+# --------- Gravação ---------
+
+def preparar_tabela(df):
+    """Tabela pronta para gravar: índices com significado (matrizes, value_counts) viram colunas."""
+    manter_indice = not isinstance(df.index, pd.RangeIndex)
+    df = df.reset_index() if manter_indice else df
+    return df.rename(columns=str)
+
+def entrada_tabela(arquivo, tipo, df):
+    """Entrada de uma tabela gravada (já preparada) no manifest."""
+    return {'arquivo': arquivo, 'tipo': tipo, 'linhas': len(df), 'colunas': list(df.columns)}
+
+def gravar_zip_agregados(caminho, tabelas, data_inicio, data_fim, manifesto, resultados_prontos=None, progresso=None):
+    """
+    Calcula as tabelas de todas as seções e grava um ZIP com um CSV por tabela.
+
+    Cada CSV é escrito direto na entrada do ZIP, seção por seção: só o resultado da seção
+    atual fica em memória. O manifest.json é a última entrada.
+
+    Args:
+        caminho: Arquivo .zip de destino
+        tabelas: Tabelas de eventos do recorte (num pacote, só as de pacientes e de último evento)
+        data_inicio: Início do período das seções semanais
+        data_fim: Data de referência (as-of)
+        manifesto: dict com os parâmetros do recorte (impressao_dados, data_fim, etc.),
+            completado com a versão, a data de geração e as tabelas de cada seção
+        resultados_prontos: dict seção -> resultado já calculado (ex.: agregados de um pacote)
+        progresso: Função chamada com (secao, concluidas, total) antes de cada seção
+
+    Returns:
+        dict do manifest gravado
+    """
+    resultados_prontos = resultados_prontos or {}
+    secoes = {}
+    with zipfile.ZipFile(caminho, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for posicao, (secao, calcular) in enumerate(CALCULOS.items()):
+            if progresso is not None:
+                progresso(secao, posicao, len(CALCULOS))
+            inicio = time.perf_counter()
+            if secao in resultados_prontos:
+                resultado = resultados_prontos[secao]
+            else:
+                resultado = calcular(tabelas, data_inicio, data_fim)
+            partes, valores, _ = separar_resultado(resultado)
+            entradas = {}
+            for nome, (tipo, df) in partes.items():
+                df = preparar_tabela(df)
+                arquivo = f'{secao}.{nome}.csv' if nome else f'{secao}.csv'
+                # force_zip64: o tamanho da entrada só é conhecido no fim da escrita
+                with arquivo_zip.open(arquivo, 'w', force_zip64=True) as destino:
+                    with io.TextIOWrapper(destino, encoding='utf-8', newline='') as texto:
+                        df.to_csv(texto, index=False)
+                entradas[nome] = entrada_tabela(arquivo, tipo, df)
+            secoes[secao] = {'valores': valores, 'tabelas': entradas, 'tempo_s': round(time.perf_counter() - inicio, 4)}
+            del resultado, partes
+        manifesto = {'versao': VERSAO_AGREGADOS, 'gerado_em': pd.Timestamp.now(tz='UTC').isoformat(),
+                     **manifesto, 'formato': 'csv', 'secoes': secoes}
+        arquivo_zip.writestr(ARQUIVO_MANIFESTO, json.dumps(manifesto, ensure_ascii=False, indent=2))
+    if progresso is not None:
+        progresso(None, len(CALCULOS), len(CALCULOS))
+    return manifesto
+
+# --------- Exportação em segundo plano ---------
+# Tarefas por chave (impressão digital dos dados + data de referência), no nível do módulo
+# como o cache: sobrevivem aos reruns e são compartilhadas entre sessões. Só as tarefas mais
+# recentes são mantidas; os ZIPs das antigas são apagados
+
+MAX_EXPORTACOES = 4
+_EXPORTACOES = OrderedDict()
+_LOCK_EXPORTACOES = threading.Lock()
+
+def tarefa_exportacao(chave):
+    """Estado da exportação da chave (dict com estado, concluidas, total, secao, caminho, erro) ou None."""
+    with _LOCK_EXPORTACOES:
+        return _EXPORTACOES.get(chave)
+
+def iniciar_exportacao(chave, tabelas, data_inicio, data_fim, manifesto, resultados_prontos=None):
+    """
+    Inicia (se ainda não houver) a exportação completa numa thread e devolve seu estado.
+
+    O estado é atualizado pela thread: 'executando' com o progresso por seção, depois
+    'concluido' (caminho do ZIP e manifesto) ou 'erro' (mensagem em erro).
+    """
+    with _LOCK_EXPORTACOES:
+        tarefa = _EXPORTACOES.get(chave)
+        if tarefa is not None and tarefa['estado'] != 'erro':
+            return tarefa
+        descritor, caminho = tempfile.mkstemp(prefix='inspirar_agregados_', suffix='.zip')
+        os.close(descritor)
+        tarefa = {'estado': 'executando', 'concluidas': 0, 'total': len(CALCULOS), 'secao': None,
+                  'caminho': caminho, 'manifesto': None, 'erro': None}
+        _EXPORTACOES[chave] = tarefa
+        _EXPORTACOES.move_to_end(chave)
+        _descartar_antigas()
+
+    def progresso(secao, concluidas, total):
+        tarefa.update(secao=secao, concluidas=concluidas, total=total)
+
+    def executar():
+        try:
+            tarefa['manifesto'] = gravar_zip_agregados(
+                caminho, tabelas, data_inicio, data_fim, manifesto, resultados_prontos, progresso
+            )
+            tarefa['estado'] = 'concluido'
+        except Exception as erro:
+            tarefa.update(estado='erro', erro=str(erro))
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    threading.Thread(target=executar, name=f'exportacao-{caminho}', daemon=True).start()
+    return tarefa
+
+def _descartar_antigas():
+    # Tarefas em execução não são descartadas; a thread ainda escreve no arquivo
+    antigas = [chave for chave, tarefa in _EXPORTACOES.items() if tarefa['estado'] != 'executando']
+    while len(_EXPORTACOES) > MAX_EXPORTACOES and antigas:
+        tarefa = _EXPORTACOES.pop(antigas.pop(0))
+        if tarefa['caminho'] and os.path.exists(tarefa['caminho']):
+            os.remove(tarefa['caminho'])
@@ -0,0 +1,110 @@
+"""
+Instrumentação opcional do dashboard: tempo, CPU e memória de cada etapa de um rerun.
+
+Ativada pelo parâmetro de URL ?perfil=1 ou pela variável de ambiente INSPIRAR_PERFIL=1.
+Cada etapa medida (ingestão, recorte e cada seção mostrar_*) gera um registro com
+tempo de parede, tempo de CPU do processo, pico de memória alocada (tracemalloc) e o
+tamanho das entradas. Os registros do rerun aparecem num painel recolhível da sidebar
+e, se INSPIRAR_PERFIL_LOG apontar para um arquivo, são acrescentados a ele em JSONL.
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from utils.translations import t
+
+VALORES_ATIVOS = ('1', 'true', 'sim', 'yes')
+
+def instrumentacao_ativa():
+    """Indica se a instrumentação foi pedida pela URL (?perfil=1) ou pelo ambiente (INSPIRAR_PERFIL)."""
+    valor = st.query_params.get('perfil') or os.environ.get('INSPIRAR_PERFIL', '')
+    return str(valor).strip().lower() in VALORES_ATIVOS
+
+def tamanho_entrada(valor):
+    """Quantidade de linhas de uma entrada: DataFrame, dict de tabelas ou sequência."""
+    if isinstance(valor, pd.DataFrame):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(tamanho_entrada(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return len(valor)
+    return 0
+
+class Medidor:
+    """Coleta os registros de desempenho de um rerun; sem efeito quando inativo."""
+
+    def __init__(self, ativo):
+        self.ativo = ativo
+        self.registros = []
+
+    @contextmanager
+    def medir(self, etapa, **entradas):
+        """
+        Mede o bloco como uma etapa.
+
+        Args:
+            etapa: Nome da etapa (ex.: 'ingestao', 'mostrar_ativos')
+            **entradas: Tamanhos das entradas a registrar (ex.: linhas=1200)
+        """
+        if not self.ativo:
+            yield
+            return
+        iniciou_tracemalloc = not tracemalloc.is_tracing()
+        if iniciou_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            pico = tracemalloc.get_traced_memory()[1]
+            self.registros.append({
+                'etapa': etapa,
+                'momento': pd.Timestamp.now(tz='UTC').isoformat(),
+                'tempo_s': round(time.perf_counter() - inicio, 6),
+                'cpu_s': round(time.process_time() - inicio_cpu, 6),
+                'pico_mb': round(max(pico - memoria_inicial, 0) / 1024 ** 2, 3),
+                **entradas,
+            })
+            if iniciou_tracemalloc:
+                tracemalloc.stop()
+
+    def executar(self, funcao, *args):
+        """Chama uma seção mostrar_* medindo-a, com o tamanho dos argumentos como entrada."""
+        with self.medir(funcao.__name__, linhas_entrada=sum(tamanho_entrada(a) for a in args)):
+            return funcao(*args)
+
+    def gravar_jsonl(self, caminho, **contexto):
+        """Acrescenta os registros do rerun ao arquivo JSONL, com os campos de contexto em cada linha."""
+        if not self.registros:
+            return
+        with open(caminho, 'a', encoding='utf-8') as arquivo:
+            for registro in self.registros:
+                arquivo.write(json.dumps({**contexto, **registro}, ensure_ascii=False) + '\n')
+
+    def mostrar_painel(self, **contexto):
+        """Painel recolhível na sidebar com os registros do rerun (e gravação no log, se configurado)."""
+        if not self.ativo or not self.registros:
+            return
+        caminho_log = os.environ.get('INSPIRAR_PERFIL_LOG')
+        if caminho_log:
+            self.gravar_jsonl(caminho_log, **contexto)
+
+        df_registros = pd.DataFrame(self.registros).drop(columns='momento')
+        st.sidebar.markdown("---")
+        with st.sidebar.expander(f"⏱️ {t('dashboard.profiling_title')}", expanded=False):
+            st.caption(t('dashboard.profiling_total', tempo=f"{df_registros['tempo_s'].sum():.2f}"))
+            st.dataframe(
+                df_registros.sort_values('tempo_s', ascending=False),
+                hide_index=True,
+                width='stretch'
+            )
+            if caminho_log:
+                st.caption(t('dashboard.profiling_log', caminho=caminho_log))
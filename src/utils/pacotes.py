@@ -0,0 +1,215 @@
+"""
+Pacotes de agregados pré-calculados, que o dashboard exibe sem o export bruto.
+
+Um pacote é um ZIP gerado por tools.agregados --pacote. Ele contém o manifest.json, um
+resumo por paciente com as colunas que as seções usam (sem os registros de cada paciente),
+a data do último registro de cada paciente por funcionalidade (para a janela de pacientes
+ativos) e os resultados dos cálculos das seções que dependem das tabelas de eventos
+(engajamento, semanais, ACQ, crises e recordes). As tabelas são gravadas em JSON no formato
+"table" do pandas, que preserva os tipos (datas UTC, categorias, textos e índices), então
+as seções recebem os mesmos objetos que o cálculo sobre o export produziria.
+"""
+import io
+import json
+import math
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from compute.barplot_metricas import METRICAS_OPCIONAIS
+from utils.data_processing import COLUNAS_TOTAIS
+
+# Mudanças no conteúdo ou no formato do pacote devem incrementar a versão
+VERSAO_PACOTE = 5
+ARQUIVO_MANIFESTO = 'manifest.json'
+ARQUIVO_PACIENTES = 'pacientes.json'
+ARQUIVO_ULTIMO_EVENTO = 'ultimo_evento.json'
+
+# Seções pré-calculadas no pacote -> nome do cálculo no cache (utils.cache.memoizar)
+# As demais seções usam apenas a tabela de pacientes (e a de último evento) e são
+# calculadas a partir do resumo
+SECOES_PACOTE = {
+    'engajamento': 'engajamento',
+    'crises': 'crises',
+    'prescricoes_semanais': 'prescricoes_semanais',
+    'status_acq': 'status_acq',
+    'diarios_semanais': 'diarios_semanais',
+    'atividades_semanais': 'atividades_semanais',
+    'recordes': 'recordes',
+}
+
+# Colunas do resumo por paciente; outros campos pessoais do export ficam de fora
+COLUNAS_RESUMO_PACIENTES = ['id', 'age', 'gender', 'height', 'weight', 'createdAt', *COLUNAS_TOTAIS.values(), *METRICAS_OPCIONAIS]
+
+def resumo_pacientes(df_pacientes):
+    """Colunas da tabela de pacientes que vão para o pacote (as que existirem)."""
+    return df_pacientes[[coluna for coluna in COLUNAS_RESUMO_PACIENTES if coluna in df_pacientes.columns]]
+
+def _valor_json(valor):
+    """
+    Converte um escalar em valor JSON.
+
+    Returns:
+        Tupla (valor, tipo): tipo é 'timestamp' ou 'float' quando o valor original não pode
+        ser reconstruído só pelo JSON (datas, NaN e infinitos viram texto ou null)
+    """
+    if valor is None or valor is pd.NA:
+        return None, None
+    if valor is pd.NaT:
+        return None, 'timestamp'
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat(), 'timestamp'
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None, 'float'
+    return valor, None
+
+def _restaurar_valor(valor, tipo):
+    if tipo == 'timestamp':
+        return pd.Timestamp(valor) if valor is not None else pd.NaT
+    if tipo == 'float':
+        return float('nan') if valor is None else float(valor)
+    return valor
+
+def separar_resultado(resultado, caminho=()):
+    """
+    Separa o resultado de um cálculo em tabelas e valores escalares, com nomes pontuados
+    pelo caminho no dict (ex.: 'duracao.media'). Um resultado que já é uma tabela fica com o nome ''.
+
+    Returns:
+        Tupla (tabelas, valores, tipos): tabelas é nome -> (tipo, DataFrame), com tipo
+        'dataframe', 'series' ou 'array'; valores é nome -> valor JSON; tipos guarda o tipo
+        dos valores que precisam ser reconstruídos (ver _valor_json)
+    """
+    tabelas, valores, tipos = {}, {}, {}
+    if isinstance(resultado, dict):
+        for chave, item in resultado.items():
+            sub_tabelas, sub_valores, sub_tipos = separar_resultado(item, caminho + (str(chave),))
+            tabelas.update(sub_tabelas)
+            valores.update(sub_valores)
+            tipos.update(sub_tipos)
+        return tabelas, valores, tipos
+    nome = '.'.join(caminho)
+    coluna = caminho[-1] if caminho else 'valor'
+    if isinstance(resultado, pd.DataFrame):
+        tabelas[nome] = ('dataframe', resultado)
+    elif isinstance(resultado, pd.Series):
+        tabelas[nome] = ('series', resultado.to_frame(resultado.name if resultado.name is not None else coluna))
+    elif isinstance(resultado, np.ndarray):
+        tabelas[nome] = ('array', pd.DataFrame({coluna: resultado}))
+    else:
+        valores[nome], tipo = _valor_json(resultado)
+        if tipo is not None:
+            tipos[nome] = tipo
+    return tabelas, valores, tipos
+
+def montar_resultado(tabelas, valores, tipos):
+    """Operação inversa de separar_resultado."""
+    objetos = {}
+    for nome, (tipo, df) in tabelas.items():
+        if tipo == 'series':
+            objetos[nome] = df.iloc[:, 0]
+        elif tipo == 'array':
+            objetos[nome] = df.iloc[:, 0].to_numpy()
+        else:
+            objetos[nome] = df
+    if '' in objetos:
+        return objetos['']
+    for nome, valor in valores.items():
+        objetos[nome] = _restaurar_valor(valor, tipos.get(nome))
+
+    resultado = {}
+    for nome, objeto in objetos.items():
+        *pais, chave = nome.split('.')
+        destino = resultado
+        for pai in pais:
+            destino = destino.setdefault(pai, {})
+        destino[chave] = objeto
+    return resultado
+
+def _tabela_json(df):
+    conteudo = json.loads(df.to_json(orient='table', date_format='iso', date_unit='ns'))
+    # O to_json arredonda os floats (no máximo 15 dígitos); o json do Python grava o valor exato
+    for coluna in df.columns:
+        if pd.api.types.is_float_dtype(df[coluna]):
+            for linha, valor in zip(conteudo['data'], df[coluna].tolist()):
+                linha[str(coluna)] = valor if math.isfinite(valor) else None
+    return json.dumps(conteudo, ensure_ascii=False)
+
+def gravar_pacote(caminho, manifesto, pacientes, ultimo_evento, resultados):
+    """
+    Grava o pacote de agregados.
+
+    O ZIP é montado num arquivo temporário e só renomeado para o destino no final.
+
+    Args:
+        caminho: Arquivo .zip de destino
+        manifesto: dict com os parâmetros do cálculo (impressao_dados, data_fim, etc.)
+        pacientes: Tabela de pacientes do recorte (só o resumo vai para o pacote)
+        ultimo_evento: Tabela 'ultimo_evento' do recorte (mesma ordem de pacientes)
+        resultados: dict seção -> resultado do cálculo, para as seções de SECOES_PACOTE
+    """
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    try:
+        with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+            pacote.writestr(ARQUIVO_PACIENTES, _tabela_json(resumo_pacientes(pacientes)))
+            pacote.writestr(ARQUIVO_ULTIMO_EVENTO, _tabela_json(ultimo_evento))
+            secoes = {}
+            for secao, resultado in resultados.items():
+                tabelas, valores, tipos = separar_resultado(resultado)
+                entradas = {}
+                for nome, (tipo, df) in tabelas.items():
+                    arquivo = f'{secao}.{nome}.json' if nome else f'{secao}.json'
+                    pacote.writestr(arquivo, _tabela_json(df))
+                    entradas[nome] = {'arquivo': arquivo, 'tipo': tipo, 'linhas': len(df)}
+                secoes[secao] = {'valores': valores, 'tipos_valores': tipos, 'tabelas': entradas}
+            conteudo = dict(manifesto, versao_pacote=VERSAO_PACOTE, secoes=secoes)
+            pacote.writestr(ARQUIVO_MANIFESTO, json.dumps(conteudo, ensure_ascii=False, indent=2))
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def eh_pacote(arquivo):
+    """Indica se o arquivo enviado é um ZIP (pacote de agregados) em vez do export JSON."""
+    arquivo.seek(0)
+    eh_zip = zipfile.is_zipfile(arquivo)
+    arquivo.seek(0)
+    return eh_zip
+
+def carregar_pacote(arquivo):
+    """
+    Lê um pacote de agregados.
+
+    Args:
+        arquivo: Arquivo binário do ZIP (ex.: o UploadedFile do Streamlit) ou caminho
+
+    Returns:
+        dict com manifesto, pacientes (resumo por paciente), ultimo_evento (data do último
+        registro por funcionalidade, mesma ordem de pacientes) e agregados (seção ->
+        resultado do cálculo, como o compute/ devolveria)
+
+    Raises:
+        ValueError: Se o arquivo não for um pacote válido desta versão
+    """
+    try:
+        with zipfile.ZipFile(arquivo) as pacote:
+            manifesto = json.loads(pacote.read(ARQUIVO_MANIFESTO))
+            if manifesto.get('versao_pacote') != VERSAO_PACOTE:
+                raise ValueError(f"Unsupported aggregate bundle version: {manifesto.get('versao_pacote')}")
+
+            def ler(nome):
+                return pd.read_json(io.StringIO(pacote.read(nome).decode('utf-8')), orient='table', precise_float=True)
+
+            pacientes = ler(ARQUIVO_PACIENTES)
+            ultimo_evento = ler(ARQUIVO_ULTIMO_EVENTO)
+            agregados = {}
+            for secao, entrada in manifesto['secoes'].items():
+                tabelas = {nome: (tabela['tipo'], ler(tabela['arquivo'])) for nome, tabela in entrada['tabelas'].items()}
+                agregados[secao] = montar_resultado(tabelas, entrada['valores'], entrada['tipos_valores'])
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as erro:
+        raise ValueError(f"Invalid aggregate bundle: {erro}") from erro
+    return {'manifesto': manifesto, 'pacientes': pacientes, 'ultimo_evento': ultimo_evento, 'agregados': agregados}
@@ -0,0 +1,127 @@
+"""
+Agrupamento semanal vetorizado dos eventos das tabelas de ingestão.
+
+Cada timestamp é mapeado para o índice da sua semana com aritmética inteira sobre
+o valor epoch em nanossegundos, e os totais por semana saem de um único np.bincount.
+Mantém a mesma definição de semana usada pelas seções: a semana N começa na
+segunda-feira da semana que contém data_inicio + N semanas, vai até o domingo
+seguinte (fim_semana = início + 6 dias, inclusivo) e as semanas param quando
+data_inicio + N semanas ultrapassa data_fim (no máximo MAX_SEMANAS).
+"""
+import numpy as np
+import pandas as pd
+
+MAX_SEMANAS = 53
+NS_DIA = 86_400 * 10**9
+NS_SEMANA = 7 * NS_DIA
+
+def numero_semanas(data_inicio, data_fim, max_semanas=MAX_SEMANAS):
+    """Quantidade de semanas analisadas entre data_inicio e data_fim."""
+    if data_fim < data_inicio:
+        return 0
+    return min(max_semanas, (data_fim - data_inicio) // pd.Timedelta(weeks=1) + 1)
+
+def inicio_semana_zero(data_inicio):
+    """Segunda-feira (mesmo horário de data_inicio) que abre a semana 0."""
+    return data_inicio - pd.Timedelta(days=data_inicio.weekday())
+
+def para_epoch_ns(datas):
+    """Converte uma coluna datetime64[ns, UTC] em int64 (ns desde epoch); NaT vira o mínimo de int64."""
+    datas = pd.Series(datas)
+    if len(datas) == 0:
+        return np.empty(0, dtype='int64')
+    return datas.dt.as_unit('ns').array.asi8
+
+def indices_semana(datas, data_inicio, data_fim, max_semanas=MAX_SEMANAS):
+    """
+    Índice da semana de cada data, ou -1 se a data não cair em nenhuma semana do período.
+
+    Args:
+        datas: Série datetime64[ns, UTC] (ex.: coluna 'ts' de uma tabela de eventos)
+        data_inicio: Início do período de análise (Timestamp UTC)
+        data_fim: Fim do período de análise (Timestamp UTC)
+
+    Returns:
+        np.ndarray int64 com o número da semana de cada evento
+    """
+    n_semanas = numero_semanas(data_inicio, data_fim, max_semanas)
+    ns = para_epoch_ns(datas)
+    deslocamento = ns - inicio_semana_zero(data_inicio).value
+    semana = deslocamento // NS_SEMANA
+    dentro = (
+        (ns != np.iinfo('int64').min)
+        & (deslocamento >= 0)
+        & (deslocamento % NS_SEMANA <= 6 * NS_DIA)
+        & (semana < n_semanas)
+    )
+    return np.where(dentro, semana, -1)
+
+def formatar_periodo_semana(semana_num, data_inicio):
+    """Período legível da semana, ex.: 'Mar 3-9' ou 'Mar 31 - Apr 6'."""
+    semana_data = data_inicio + pd.Timedelta(weeks=semana_num)
+    inicio_semana = semana_data - pd.Timedelta(days=semana_data.weekday())
+    fim_semana = inicio_semana + pd.Timedelta(days=6)
+    mes_inicio = inicio_semana.strftime('%b')
+    mes_fim = fim_semana.strftime('%b')
+    if mes_inicio == mes_fim:
+        return f"{mes_inicio} {inicio_semana.day}-{fim_semana.day}"
+    else:
+        return f"{mes_inicio} {inicio_semana.day} - {mes_fim} {fim_semana.day}"
+
+def agregar_por_semana(df_eventos, data_inicio, data_fim, coluna_soma=None, max_semanas=MAX_SEMANAS):
+    """
+    Totais semanais de uma tabela de eventos.
+
+    Args:
+        df_eventos: Tabela de eventos com patient_idx e ts
+        data_inicio: Início do período de análise
+        data_fim: Fim do período de análise
+        coluna_soma: Coluna numérica opcional somada por semana (ex.: 'steps')
+
+    Returns:
+        DataFrame com uma linha por semana do período: week_number, total (eventos),
+        active_users (pacientes com ao menos um evento) e, se pedido, soma
+    """
+    n_semanas = numero_semanas(data_inicio, data_fim, max_semanas)
+    semana = indices_semana(df_eventos['ts'], data_inicio, data_fim, max_semanas)
+    validos = semana >= 0
+    semana = semana[validos]
+    patient_idx = df_eventos['patient_idx'].to_numpy()[validos]
+
+    # Pares (semana, paciente) distintos dão os usuários ativos de cada semana
+    n_pacientes = int(patient_idx.max()) + 1 if len(patient_idx) else 1
+    pares = np.unique(semana * n_pacientes + patient_idx)
+
+    resultado = pd.DataFrame({
+        'week_number': np.arange(n_semanas, dtype='int64'),
+        'total': np.bincount(semana, minlength=n_semanas).astype('int64'),
+        'active_users': np.bincount(pares // n_pacientes, minlength=n_semanas).astype('int64'),
+    })
+    if coluna_soma is not None:
+        valores = df_eventos[coluna_soma].to_numpy()[validos]
+        resultado['soma'] = np.bincount(semana, weights=valores, minlength=n_semanas).astype(valores.dtype)
+    return resultado
+
+def contagem_paciente_semana(df_eventos, data_inicio, data_fim, max_semanas=MAX_SEMANAS):
+    """
+    Quantidade de eventos de cada paciente em cada semana (apenas pares com eventos).
+
+    Returns:
+        DataFrame ordenado por semana e depois pela ordem dos pacientes, com as colunas
+        patient_idx, patient_id, week_number, count
+    """
+    semana = indices_semana(df_eventos['ts'], data_inicio, data_fim, max_semanas)
+    validos = semana >= 0
+    patient_idx = df_eventos['patient_idx'].to_numpy()[validos]
+    patient_id = df_eventos['patient_id'].to_numpy()[validos]
+
+    n_pacientes = int(patient_idx.max()) + 1 if len(patient_idx) else 1
+    chaves, primeira_ocorrencia, contagens = np.unique(
+        semana[validos] * n_pacientes + patient_idx, return_index=True, return_counts=True
+    )
+    return pd.DataFrame({
+        'patient_idx': chaves % n_pacientes,
+        'patient_id': patient_id[primeira_ocorrencia],
+        'week_number': chaves // n_pacientes,
+        'count': contagens.astype('int64'),
+    })
@@ -0,0 +1,109 @@
+"""
+Snapshots locais do conjunto de dados já normalizado, em Arrow IPC, identificados pela impressão digital do export.
+
+Quando o mesmo export é aberto de novo (em outra sessão ou depois de reiniciar o
+servidor), as tabelas de eventos são lidas do snapshot com memory map, sem refazer
+a leitura do JSON nem a conversão das datas. Cada snapshot é um diretório
+<impressao>/ com um arquivo .arrow por tabela e um manifest.json. O diretório
+base pode ser trocado pela variável de ambiente INSPIRAR_SNAPSHOT_DIR.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # sem pyarrow, os snapshots ficam desativados
+    pa = None
+
+# Mudanças no formato das tabelas de eventos devem incrementar a versão, invalidando snapshots antigos
+VERSAO_SNAPSHOT = 5
+DIRETORIO_PADRAO = os.path.join(os.path.expanduser('~'), '.cache', 'inspirar', 'snapshots')
+ARQUIVO_MANIFESTO = 'manifest.json'
+
+def snapshots_disponiveis():
+    """Indica se o pyarrow está instalado."""
+    return pa is not None
+
+def diretorio_snapshots():
+    """Diretório base dos snapshots (INSPIRAR_SNAPSHOT_DIR ou ~/.cache/inspirar/snapshots)."""
+    return os.environ.get('INSPIRAR_SNAPSHOT_DIR', DIRETORIO_PADRAO)
+
+def _caminho_snapshot(impressao, diretorio=None):
+    return os.path.join(diretorio or diretorio_snapshots(), f'v{VERSAO_SNAPSHOT}', impressao)
+
+def salvar_snapshot(impressao, dados, diretorio=None):
+    """
+    Grava o resultado da ingestão como snapshot Arrow IPC.
+
+    A gravação acontece num diretório temporário que só é renomeado para o destino no
+    final, então um snapshot incompleto nunca é lido.
+
+    Args:
+        impressao: Impressão digital do export (utils.cache.impressao_digital)
+        dados: dict com 'total_pacientes', 'data_referencia' e 'tabelas' (dict de DataFrames)
+        diretorio: Diretório base (padrão: diretorio_snapshots())
+
+    Returns:
+        True se o snapshot foi gravado, False se o pyarrow não estiver disponível ou
+        alguma tabela não puder ser convertida para Arrow
+    """
+    if pa is None:
+        return False
+    destino = _caminho_snapshot(impressao, diretorio)
+    if os.path.isdir(destino):
+        return True
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix=f'.{impressao}-', dir=os.path.dirname(destino))
+    try:
+        for nome, df in dados['tabelas'].items():
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            with ipc.new_file(os.path.join(temporario, f'{nome}.arrow'), tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        manifesto = {
+            'versao': VERSAO_SNAPSHOT,
+            'total_pacientes': dados['total_pacientes'],
+            'data_referencia': dados['data_referencia'].isoformat(),
+            'tabelas': list(dados['tabelas']),
+        }
+        with open(os.path.join(temporario, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo)
+        os.replace(temporario, destino)
+        return True
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, OSError):
+        return False
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+def carregar_snapshot(impressao, diretorio=None):
+    """
+    Lê um snapshot gravado por salvar_snapshot usando leitura com memory map.
+
+    Returns:
+        dict com 'total_pacientes', 'data_referencia' e 'tabelas', ou None se não houver
+        snapshot para a impressão
+    """
+    if pa is None:
+        return None
+    origem = _caminho_snapshot(impressao, diretorio)
+    try:
+        with open(os.path.join(origem, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+        tabelas = {}
+        for nome in manifesto['tabelas']:
+            # O mapeamento fica aberto enquanto houver colunas apontando para ele
+            fonte = pa.memory_map(os.path.join(origem, f'{nome}.arrow'))
+            tabelas[nome] = ipc.open_file(fonte).read_all().to_pandas()
+    except (OSError, ValueError, KeyError, pa.ArrowInvalid):
+        return None
+    return {
+        'total_pacientes': manifesto['total_pacientes'],
+        # A data de referência da primeira ingestão acompanha o snapshot, então quem reabre
+        # o mesmo export vê os mesmos números
+        'data_referencia': pd.Timestamp(manifesto['data_referencia']),
+        'tabelas': tabelas,
+    }
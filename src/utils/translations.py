@@ -9,15 +9,33 @@ TRANSLATIONS = {
             'title': 'Dashboard Insights Avançados - Usuários do app Inspirar',
             'subtitle': 'Visualize, explore e compare dados de pacientes de forma interativa.',
             'upload_file': 'Carregue o arquivo JSON de pacientes',
+            'upload_file_help': 'Também aceita um pacote de agregados (.zip) gerado por tools.agregados --pacote: o painel exibe os números pré-calculados sem processar os registros dos pacientes.',
+            'bundle_loaded': 'Pacote de agregados pré-calculados, gerado em {data}.',
             'total_patients': 'Total de pacientes analisados',
-            'accounts_from': 'contas criadas a partir de março de 2025',
+            'accounts_between': 'contas criadas de {inicio} a {fim}',
+            'cohort_title': 'Coorte de Cadastro',
+            'cohort_range': 'Contas criadas entre',
+            'cohort_help': 'Restringe todas as análises aos pacientes cujas contas foram criadas no intervalo escolhido. O padrão é o recorte do estudo (a partir de 01/03/2025).',
             'period_extraction': 'Período de Extração dos Dados',
             'period': 'Período',
-            'data_extracted': 'Dados extraídos de 01/03/2025 a 06/02/2026',
+            'data_extracted': 'Dados extraídos de 01/03/2025 a {fim}',
+            'profiling_title': 'Desempenho das Seções',
+            'profiling_total': 'Tempo total medido neste rerun: {tempo} s',
+            'profiling_log': 'Registros acrescentados a {caminho}',
+            'as_of_title': 'Data de Referência',
+            'as_of_captured': 'Capturada no carregamento do arquivo: {data}',
+            'as_of_override': 'Usar outra data de referência',
+            'as_of_help': 'Data usada como "hoje" em todas as análises (pacientes ativos, recordes e semanas). Por padrão é o momento em que o arquivo foi carregado; escolha uma data para reproduzir os números de outra análise.',
             'info': 'Dashboard personalizado para análise de dados de pacientes usuários do app Inspirar',
             'contact': 'Dúvidas, sugestões, críticas, elogios: aline.dev@proton.me',
             'no_file': 'Faça upload do arquivo JSON para visualizar os insights.',
             'error_processing': 'Erro ao processar o arquivo JSON: {error}\n\nVerifique se o arquivo segue o formato correto. Consulte o exemplo em data/README.md.',
+            'dates_quality': 'Qualidade das Datas',
+            'dates_fallback': '{count} data(s) fora do formato ISO foram interpretadas pelo parser alternativo.',
+            'dates_failed': '{count} data(s) não puderam ser interpretadas e foram ignoradas.',
+            'use_snapshots': 'Salvar snapshot local para reabrir rápido',
+            'use_snapshots_help': 'Grava as tabelas já processadas deste arquivo em disco (formato Arrow). Ao reabrir o mesmo arquivo, o painel carrega o snapshot em vez de reprocessar o JSON.',
+            'snapshot_loaded': 'Dados carregados do snapshot local.',
             'tabs': {
                 'overview': '📊 Visão Geral',
                 'demographics': '👥 Demografia',
@@ -47,7 +65,9 @@ TRANSLATIONS = {
             'ativos': {
                 'title': 'Distribuição de Pacientes Ativos vs Inativos',
                 'description': 'Mostra a proporção de pacientes que utilizaram pelo menos uma funcionalidade versus os inativos.',
-                'note_active_45_days': '**Nota:** Considera-se paciente ativo aquele que fez uso de pelo menos uma funcionalidade nos últimos 45 dias.',
+                'note_active_days': '**Nota:** Considera-se paciente ativo aquele que fez uso de pelo menos uma funcionalidade nos últimos {dias} dias.',
+                'window_days': 'Janela de atividade (dias)',
+                'window_days_help': 'Quantidade de dias antes da data de referência em que o paciente precisa ter usado alguma funcionalidade para ser considerado ativo.',
                 'note_personal_data': '**Nota sobre dados pessoais:** Pacientes que solicitaram exclusão de conta e dados pessoais têm seus dados de saúde mantidos para fins médicos, mas todos os dados pessoais (incluindo sexo) são removidos. Nestes casos, o sexo é registrado como "INDEFINIDO (I)" e estes pacientes não são representados no gráfico de distribuição por sexo dos pacientes ativos.',
                 'active': 'Ativo',
                 'inactive': 'Inativo',
@@ -60,6 +80,36 @@ TRANSLATIONS = {
                 'no_active_sex': 'Nenhum paciente ativo com sexo definido disponível para análise.',
                 'no_active': 'Nenhum paciente ativo disponível para análise de distribuição por sexo.'
             },
+            'engajamento': {
+                'title': 'Curvas de Engajamento (DAU/WAU/MAU)',
+                'description': 'Pacientes distintos com uso de alguma funcionalidade em cada dia (DAU), nos 7 dias (WAU) e nos 30 dias (MAU) terminados nesse dia, desde março/2025. A stickiness (DAU/MAU) indica a fração dos usuários do mês que voltam a cada dia.',
+                'feature': 'Funcionalidade',
+                'feature_help': 'Considera apenas os registros da funcionalidade escolhida.',
+                'features': {
+                    'todas': 'Todas as funcionalidades',
+                    'diarios': 'Diários de sintomas',
+                    'acqs': 'Questionários ACQ',
+                    'atividades': 'Atividades físicas',
+                    'prescricoes': 'Prescrições',
+                    'administracoes': 'Administrações de medicamentos',
+                    'crises': 'Crises'
+                },
+                'dau': 'DAU (dia)',
+                'wau': 'WAU (7 dias)',
+                'mau': 'MAU (30 dias)',
+                'stickiness': 'Stickiness (DAU/MAU)',
+                'stickiness_average': 'Stickiness média',
+                'date': 'Data',
+                'users': 'Pacientes ativos',
+                'curves_title': 'Pacientes Ativos por Dia, Semana e Mês',
+                'stickiness_title': 'Stickiness Diária (DAU/MAU, %)',
+                'range_title': 'Pacientes distintos num intervalo',
+                'range_label': 'Intervalo',
+                'range_help': 'Conta cada paciente uma vez, se usou a funcionalidade escolhida em algum dia do intervalo.',
+                'range_result': 'Pacientes ativos no intervalo',
+                'range_unavailable': 'A contagem em intervalos livres precisa dos registros de cada paciente e não está disponível em pacotes de agregados. Envie o export JSON para usá-la.',
+                'download_csv': '📥 Baixar curvas (CSV)'
+            },
             'status_acq': {
                 'title': 'Status de Controle da Asma (ACQ) - Primeira Semana',
                 'description': 'Análise do ACQ (Asthma Control Questionnaire) considerando apenas a **primeira conclusão temporal** de cada paciente (ordenada por data de criação/resposta). Isso fornece uma visão mais precisa do controle inicial da asma, garantindo consistência para análise médica.',
@@ -169,13 +219,19 @@ TRANSLATIONS = {
                 'detailed_daily_data': 'Dados Diários Detalhados',
                 'no_activity_patient': 'Nenhuma atividade registrada para o paciente {patient} em {month}.',
                 'no_patient_found': 'Nenhum paciente encontrado com ID válido.',
+                'individual_unavailable': 'A análise individual precisa dos registros de cada paciente e não está disponível em pacotes de agregados. Envie o export JSON para usá-la.',
                 'data_by_period': 'Dados por Período - Atividades Físicas',
                 'total_periods': 'Total de períodos analisados',
                 'overall_average': 'Média geral de registros',
                 'peak_active_users': 'Pico de usuários ativos',
                 'highest_steps': 'Maior total de passos em uma semana',
                 'download_csv': '📥 Baixar Dados por Período (CSV)',
-                'no_data': 'Nenhum dado de atividades encontrado para o período selecionado.'
+                'no_data': 'Nenhum dado de atividades encontrado para o período selecionado.',
+                'steps_sources': 'Origem dos passos no export',
+                'steps_sources_help': 'Os passos de cada registro de atividade são lidos uma vez, no carregamento, da primeira chave numérica encontrada (ex.: steps, stepCount ou data.steps). Semanas, análise individual e recordes usam esse mesmo valor.',
+                'steps_source': 'Chave',
+                'steps_records': 'Registros',
+                'steps_no_source': 'Sem passos (contam como 0)'
             },
             'funcionalidades_geral': {
                 'title': 'Visão Geral de Funcionalidades',
@@ -281,7 +337,22 @@ TRANSLATIONS = {
                 'average_steps': 'Média de passos',
                 'total_steps_all': 'Total de passos',
                 'median': 'Mediana',
-                'no_data': 'Nenhum dado de atividade física encontrado'
+                'no_data': 'Nenhum dado de atividade física encontrado',
+                'ranking_title': 'Rankings de Engajamento',
+                'ranking_metric': 'Métrica do ranking',
+                'ranking_size': 'Quantidade de pacientes (K)',
+                'ranking_size_help': 'Os K pacientes com os maiores valores da métrica. Taxas são normalizadas pelo tempo de conta até a data de referência; pacientes sem nenhum registro da métrica ficam de fora.',
+                'ranking_chart': 'Top {k} - {metric}',
+                'ranking_empty': 'Nenhum paciente com registros desta métrica',
+                'position': 'Posição',
+                'download_csv': '📥 Baixar ranking (CSV)',
+                'metrics': {
+                    'passos_dia': 'Passos por dia',
+                    'diarios_semana': 'Diários por semana',
+                    'administracoes_semana': 'Administrações por semana',
+                    'acq_conclusao': 'Conclusão do ACQ (%)',
+                    'idade_conta': 'Idade da conta (dias)'
+                }
             },
             'barplot_metricas': {
                 'title': 'Análise Descritiva e Distribuição de Métricas Numéricas',
@@ -379,6 +450,17 @@ TRANSLATIONS = {
             'average_records': 'Média de Registros',
             'active_users': 'Usuários Ativos',
             'total_steps': 'Total de Passos'
+        },
+        'downloads': {
+            'parquet': '📥 Baixar em Parquet',
+            'parquet_help': 'Formato colunar que preserva os tipos das colunas; menor e mais rápido de abrir em Python ou R que o CSV',
+            'export_all_title': 'Exportar Tudo',
+            'export_all': 'Gerar ZIP com todas as tabelas',
+            'export_all_help': 'Gera em segundo plano um ZIP com um CSV para cada tabela de todas as seções e um manifest.json com as linhas de cada tabela e a data de referência. O painel continua disponível durante a geração.',
+            'export_all_progress': 'Gerando ZIP: {secao} ({atual}/{total})',
+            'export_all_ready': 'ZIP pronto: {tabelas} tabelas, data de referência {data}.',
+            'export_all_download': '📥 Baixar ZIP',
+            'export_all_error': 'Falha ao gerar o ZIP: {erro}'
         }
     },
     'en': {
@@ -386,15 +468,33 @@ TRANSLATIONS = {
             'title': 'Dashboard Insights Avançados - Usuários do app Inspirar',
             'subtitle': 'Visualize, explore and compare patient data interactively.',
             'upload_file': 'Upload patient JSON file',
+            'upload_file_help': 'Also accepts an aggregate bundle (.zip) created by tools.agregados --pacote: the dashboard shows the precomputed numbers without processing the patient records.',
+            'bundle_loaded': 'Precomputed aggregate bundle, generated on {data}.',
             'total_patients': 'Total patients analyzed',
-            'accounts_from': 'accounts created from March 2025 onwards',
+            'accounts_between': 'accounts created from {inicio} to {fim}',
+            'cohort_title': 'Signup Cohort',
+            'cohort_range': 'Accounts created between',
+            'cohort_help': 'Restricts every analysis to patients whose accounts were created in the chosen range. The default is the study window (from 01/03/2025 onwards).',
             'period_extraction': 'Data Extraction Period',
             'period': 'Period',
-            'data_extracted': 'Data extracted from 01/03/2025 to 06/02/2026',
+            'data_extracted': 'Data extracted from 01/03/2025 to {fim}',
+            'profiling_title': 'Section Performance',
+            'profiling_total': 'Total measured time in this rerun: {tempo} s',
+            'profiling_log': 'Records appended to {caminho}',
+            'as_of_title': 'Reference Date',
+            'as_of_captured': 'Captured when the file was loaded: {data}',
+            'as_of_override': 'Use another reference date',
+            'as_of_help': 'Date used as "today" in every analysis (active patients, records and weeks). By default it is the moment the file was loaded; pick a date to reproduce the numbers of another analysis.',
             'info': 'Customized dashboard for analyzing patient data from Inspirar app users',
             'contact': 'Questions, suggestions, criticism, praise: aline.dev@proton.me',
             'no_file': 'Upload the JSON file to view insights.',
             'error_processing': 'Error processing JSON file: {error}\n\nCheck if the file follows the correct format. See example in data/README.md.',
+            'dates_quality': 'Date Quality',
+            'dates_fallback': '{count} date(s) outside the ISO format were read by the fallback parser.',
+            'dates_failed': '{count} date(s) could not be parsed and were ignored.',
+            'use_snapshots': 'Save local snapshot for fast reopening',
+            'use_snapshots_help': 'Writes the processed tables of this file to disk (Arrow format). When the same file is opened again, the dashboard loads the snapshot instead of reprocessing the JSON.',
+            'snapshot_loaded': 'Data loaded from the local snapshot.',
             'tabs': {
                 'overview': '📊 Overview',
                 'demographics': '👥 Demographics',
@@ -424,7 +524,9 @@ TRANSLATIONS = {
             'ativos': {
                 'title': 'Active vs Inactive Patients Distribution',
                 'description': 'Shows the proportion of patients who used at least one feature versus inactive ones.',
-                'note_active_45_days': '**Note:** An active patient is considered one who has used at least one feature in the last 45 days.',
+                'note_active_days': '**Note:** An active patient is considered one who has used at least one feature in the last {dias} days.',
+                'window_days': 'Activity window (days)',
+                'window_days_help': 'Number of days before the reference date in which a patient must have used some feature to be considered active.',
                 'note_personal_data': '**Note on personal data:** Patients who requested account and personal data deletion have their health data kept for medical purposes, but all personal data (including sex) is removed. In these cases, sex is recorded as "UNDEFINED (I)" and these patients are not represented in the sex distribution chart of active users.',
                 'active': 'Active',
                 'inactive': 'Inactive',
@@ -437,6 +539,36 @@ TRANSLATIONS = {
                 'no_active_sex': 'No active patients with defined sex available for analysis.',
                 'no_active': 'No active patients available for sex distribution analysis.'
             },
+            'engajamento': {
+                'title': 'Engagement Curves (DAU/WAU/MAU)',
+                'description': 'Distinct patients who used some feature on each day (DAU), in the 7 days (WAU) and in the 30 days (MAU) ending on that day, since March 2025. Stickiness (DAU/MAU) shows the share of the month\'s users who come back each day.',
+                'feature': 'Feature',
+                'feature_help': 'Only counts records of the selected feature.',
+                'features': {
+                    'todas': 'All features',
+                    'diarios': 'Symptom diaries',
+                    'acqs': 'ACQ questionnaires',
+                    'atividades': 'Physical activities',
+                    'prescricoes': 'Prescriptions',
+                    'administracoes': 'Medication administrations',
+                    'crises': 'Crises'
+                },
+                'dau': 'DAU (day)',
+                'wau': 'WAU (7 days)',
+                'mau': 'MAU (30 days)',
+                'stickiness': 'Stickiness (DAU/MAU)',
+                'stickiness_average': 'Average stickiness',
+                'date': 'Date',
+                'users': 'Active patients',
+                'curves_title': 'Active Patients per Day, Week and Month',
+                'stickiness_title': 'Daily Stickiness (DAU/MAU, %)',
+                'range_title': 'Distinct patients in a date range',
+                'range_label': 'Date range',
+                'range_help': 'Counts each patient once if they used the selected feature on any day of the range.',
+                'range_result': 'Active patients in the range',
+                'range_unavailable': 'Counting over free date ranges needs each patient\'s records and is not available in aggregate bundles. Upload the JSON export to use it.',
+                'download_csv': '📥 Download curves (CSV)'
+            },
             'status_acq': {
                 'title': 'Asthma Control Status (ACQ) - First Week',
                 'description': 'Analysis of ACQ (Asthma Control Questionnaire) considering only the **first temporal completion** of each patient (ordered by creation/answer date). This provides a more accurate view of initial asthma control, ensuring consistency for medical analysis.',
@@ -546,13 +678,19 @@ TRANSLATIONS = {
                 'detailed_daily_data': 'Detailed Daily Data',
                 'no_activity_patient': 'No activity recorded for patient {patient} in {month}.',
                 'no_patient_found': 'No patient found with valid ID.',
+                'individual_unavailable': 'The individual analysis needs each patient\'s records and is not available in aggregate bundles. Upload the JSON export to use it.',
                 'data_by_period': 'Data by Period - Physical Activities',
                 'total_periods': 'Total periods analyzed',
                 'overall_average': 'Overall average records',
                 'peak_active_users': 'Peak active users',
                 'highest_steps': 'Highest total steps in a week',
                 'download_csv': '📥 Download Data by Period (CSV)',
-                'no_data': 'No activity data found for the selected period.'
+                'no_data': 'No activity data found for the selected period.',
+                'steps_sources': 'Step sources in the export',
+                'steps_sources_help': 'The steps of each activity record are read once, at load time, from the first numeric key found (e.g. steps, stepCount or data.steps). Weeks, the individual analysis and records all use this same value.',
+                'steps_source': 'Key',
+                'steps_records': 'Records',
+                'steps_no_source': 'No steps (counted as 0)'
             },
             'funcionalidades_geral': {
                 'title': 'Global Feature Usage Overview',
@@ -658,7 +796,22 @@ TRANSLATIONS = {
                 'average_steps': 'Average steps',
                 'total_steps_all': 'Total steps (all)',
                 'median': 'Median',
-                'no_data': '📊 No physical activity data found'
+                'no_data': '📊 No physical activity data found',
+                'ranking_title': 'Engagement Leaderboards',
+                'ranking_metric': 'Leaderboard metric',
+                'ranking_size': 'Number of patients (K)',
+                'ranking_size_help': 'The K patients with the highest values of the metric. Rates are normalized by account age up to the reference date; patients without any record of the metric are left out.',
+                'ranking_chart': 'Top {k} - {metric}',
+                'ranking_empty': 'No patient with records for this metric',
+                'position': 'Rank',
+                'download_csv': '📥 Download leaderboard (CSV)',
+                'metrics': {
+                    'passos_dia': 'Steps per day',
+                    'diarios_semana': 'Diaries per week',
+                    'administracoes_semana': 'Administrations per week',
+                    'acq_conclusao': 'ACQ completion (%)',
+                    'idade_conta': 'Account age (days)'
+                }
             },
             'barplot_metricas': {
                 'title': 'Descriptive Analysis and Distribution of Numerical Metrics',
@@ -756,6 +909,17 @@ TRANSLATIONS = {
             'average_records': 'Average Records',
             'active_users': 'Active Users',
             'total_steps': 'Total Steps'
+        },
+        'downloads': {
+            'parquet': '📥 Download as Parquet',
+            'parquet_help': 'Columnar format that keeps column types; smaller and faster to open in Python or R than CSV',
+            'export_all_title': 'Export Everything',
+            'export_all': 'Build ZIP with all tables',
+            'export_all_help': 'Builds, in the background, a ZIP with one CSV per table of every section and a manifest.json with each table\'s row count and the as-of date. The dashboard stays available while it runs.',
+            'export_all_progress': 'Building ZIP: {secao} ({atual}/{total})',
+            'export_all_ready': 'ZIP ready: {tabelas} tables, as-of date {data}.',
+            'export_all_download': '📥 Download ZIP',
+            'export_all_error': 'Failed to build the ZIP: {erro}'
         }
     }
 }
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from utils.datas import NAT_NS, converter_iso_ns, ns_para_datas
+
+def _ns(texto):
+    return pd.Timestamp(texto).value
+
+def test_iso_pelo_caminho_rapido():
+    ns, relatorio = converter_iso_ns(['2025-03-01T10:00:00Z', '2025-03-01T10:00:00.123+02:00'])
+    assert ns.tolist() == [_ns('2025-03-01T10:00:00Z'), _ns('2025-03-01T08:00:00.123Z')]
+    assert relatorio == {'total': 2, 'iso': 2, 'fallback': 0, 'falhas': 0}
+
+def test_fallback_do_dateutil():
+    ns, relatorio = converter_iso_ns([
+        '2025-03-01T10:00:00Z',
+        '01 Mar 2025 10:00 -0300',  # fora do ISO, com fuso
+        'March 1, 2025',           # sem fuso: lida como UTC
+        'não é data',
+    ])
+    assert ns.tolist() == [
+        _ns('2025-03-01T10:00:00Z'),
+        _ns('2025-03-01T13:00:00Z'),
+        _ns('2025-03-01T00:00:00Z'),
+        NAT_NS,
+    ]
+    assert relatorio == {'total': 4, 'iso': 1, 'fallback': 2, 'falhas': 1}
+
+def test_ausentes_e_valores_que_nao_sao_texto():
+    ns, relatorio = converter_iso_ns([None, '', 5, float('nan')])
+    assert ns.tolist() == [NAT_NS] * 4
+    assert relatorio == {'total': 0, 'iso': 0, 'fallback': 0, 'falhas': 0}
+
+def test_ns_para_datas():
+    datas = ns_para_datas([_ns('2025-03-01T10:00:00Z'), NAT_NS])
+    assert str(datas.dtype) == 'datetime64[ns, UTC]'
+    assert datas.iloc[0] == pd.Timestamp('2025-03-01T10:00:00Z')
+    assert pd.isna(datas.iloc[1])
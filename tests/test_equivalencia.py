@@ -0,0 +1,15 @@
+import pytest
+
+from tools import equivalencia
+
+@pytest.mark.parametrize('semente, taxa_datas_invalidas', [(0, 0.0), (100, 0.15)])
+def test_caminhos_vetorizados_coincidem_com_os_lacos_originais(semente, taxa_datas_invalidas):
+    falhas = equivalencia.executar(
+        rodadas=3, max_pacientes=25, semente=semente,
+        taxa_datas_invalidas=taxa_datas_invalidas, diretorio_falhas=None
+    )
+    assert not falhas, [(falha['verificacao'], falha['semente'], falha['diferenca']) for falha in falhas]
+
+def test_reduzir_encontra_o_paciente_que_reproduz_a_falha():
+    pacientes = list(range(40))
+    assert equivalencia.reduzir(pacientes, lambda lista: 17 in lista) == [17]
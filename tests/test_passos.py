@@ -0,0 +1,31 @@
+import numpy as np
+
+from utils.data_processing import SEM_FONTE_PASSOS, fontes_passos, resolver_passos
+
+def test_steps_numerico_e_truncado():
+    passos, relatorio = resolver_passos([10, 2.9, 0], {})
+    assert passos.tolist() == [10, 2, 0]
+    assert fontes_passos(relatorio) == {'steps': 3}
+
+def test_fontes_alternativas_em_ordem_de_prioridade():
+    sem_steps = {
+        1: {'steps': '5', 'stepCount': 7, 'data': {'steps': 99}},  # stepCount vem antes de data.steps
+        3: {'data': {'steps': 8.7}},
+        4: {'steps': None, 'attributes': {'count': 12}},
+    }
+    passos, relatorio = resolver_passos([10, 0, 3, 0, 0], sem_steps)
+    assert passos.tolist() == [10, 7, 3, 8, 12]
+    assert fontes_passos(relatorio) == {'steps': 2, 'stepCount': 1, 'data.steps': 1, 'attributes.count': 1}
+
+def test_sem_nenhuma_fonte_e_valores_nao_finitos():
+    sem_steps = {0: {'steps': 'muitos'}, 1: {'data': 'texto'}}
+    passos, relatorio = resolver_passos([0, 0, float('inf'), float('nan')], sem_steps)
+    assert passos.tolist() == [0, 0, 0, 0]
+    assert passos.dtype == np.int64
+    assert fontes_passos(relatorio) == {'steps': 2, SEM_FONTE_PASSOS: 2}
+
+def test_sem_registros():
+    passos, relatorio = resolver_passos([], {})
+    assert len(passos) == 0
+    assert relatorio.empty
+    assert list(relatorio.columns) == ['fonte', 'registros']
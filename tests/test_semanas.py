@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from utils.semanas import agregar_por_semana, numero_semanas
+
+# Sábado: a semana 0 começa na segunda-feira anterior (24/02/2025)
+DATA_INICIO = pd.Timestamp('2025-03-01', tz='UTC')
+DATA_FIM = pd.Timestamp('2025-03-20', tz='UTC')
+
+def _eventos(linhas):
+    patient_idx, datas, passos = zip(*linhas)
+    return pd.DataFrame({
+        'patient_idx': np.array(patient_idx, dtype='int64'),
+        'ts': pd.to_datetime(list(datas), utc=True, format='ISO8601'),
+        'steps': np.array(passos, dtype='int64'),
+    })
+
+def test_numero_semanas():
+    assert numero_semanas(DATA_INICIO, DATA_FIM) == 3
+    assert numero_semanas(DATA_INICIO, DATA_INICIO) == 1
+    assert numero_semanas(DATA_INICIO, DATA_INICIO - pd.Timedelta(days=1)) == 0
+
+def test_limites_de_semana_e_domingo():
+    df = _eventos([
+        (0, '2025-02-22T12:00:00Z', 1),       # antes da segunda-feira da semana 0
+        (0, '2025-02-24T00:00:00Z', 10),      # segunda-feira 00:00: semana 0
+        (1, '2025-03-02T00:00:00Z', 20),      # domingo 00:00: último instante da semana 0
+        (1, '2025-03-02T00:00:00.001Z', 30),  # domingo depois do horário de início: fora, como nos laços originais
+        (0, '2025-03-03T00:00:00Z', 40),      # segunda-feira seguinte: semana 1
+        (1, '2025-03-09T00:00:00Z', 50),      # domingo 00:00: semana 1
+        (2, '2025-03-09T23:59:59.999Z', 60),  # fim do domingo: fora
+        (2, '2025-03-10T08:00:00Z', 70),      # semana 2
+        (0, '2025-03-17T00:00:00Z', 80),      # depois da última semana do período
+        (1, None, 90),                        # sem data
+    ])
+    resultado = agregar_por_semana(df, DATA_INICIO, DATA_FIM, coluna_soma='steps')
+
+    assert resultado['week_number'].tolist() == [0, 1, 2]
+    assert resultado['total'].tolist() == [2, 2, 1]
+    assert resultado['active_users'].tolist() == [2, 2, 1]
+    assert resultado['soma'].tolist() == [30, 90, 70]
+
+def test_usuarios_ativos_contam_pacientes_distintos():
+    df = _eventos([
+        (3, '2025-03-04T10:00:00Z', 5),
+        (3, '2025-03-05T10:00:00Z', 5),
+        (3, '2025-03-06T10:00:00Z', 5),
+        (0, '2025-03-06T11:00:00Z', 7),
+    ])
+    resultado = agregar_por_semana(df, DATA_INICIO, DATA_FIM, coluna_soma='steps')
+
+    assert resultado['total'].tolist() == [0, 4, 0]
+    assert resultado['active_users'].tolist() == [0, 2, 0]
+    assert resultado['soma'].tolist() == [0, 22, 0]
+    assert 'soma' not in agregar_por_semana(df, DATA_INICIO, DATA_FIM).columns
+
+def test_sem_eventos_e_periodo_vazio():
+    vazio = _eventos([(0, None, 0)]).iloc[:0]
+    resultado = agregar_por_semana(vazio, DATA_INICIO, DATA_FIM)
+    assert resultado['total'].tolist() == [0, 0, 0]
+    assert resultado['active_users'].tolist() == [0, 0, 0]
+
+    assert agregar_por_semana(vazio, DATA_INICIO, DATA_INICIO - pd.Timedelta(days=1)).empty